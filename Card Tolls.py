@@ -1,21 +1,48 @@
 import os
-import shutil
 import sys
 import time
-import glob
-import re
+import threading
+
+# 启动计时：各阶段名称及结束时间，使用 --profile-startup 启动时打印
+STARTUP_STARTED = time.perf_counter()
+startup_marks = []
+
+
+def mark_startup(name):
+    startup_marks.append((name, time.perf_counter()))
+
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QLineEdit, 
                             QFileDialog, QMessageBox, QTextEdit, QListWidget,
                             QInputDialog, QFrame, QStyledItemDelegate, QSpinBox,
-                            QProgressDialog)
-from PyQt5.QtCore import Qt, QEvent, QSize, QPoint, QRect
-from PyQt5.QtGui import QFont, QMouseEvent, QPainter, QColor, QBrush, QPen, QDrag, QPixmap, QCursor
+                            QProgressDialog, QComboBox, QCheckBox, QListView, QShortcut)
+from PyQt5.QtCore import (Qt, QEvent, QSize, QPoint, QRect, QThread, QTimer, pyqtSignal,
+                          QAbstractListModel, QModelIndex)
+from PyQt5.QtGui import (QFont, QMouseEvent, QPainter, QColor, QBrush, QPen, QDrag, QPixmap, QCursor,
+                         QKeySequence)
+mark_startup('导入 PyQt5')
+
+# card_watch 只在监视文件夹时使用，NumPy 由 card_roster 在批量校验时才导入
+import card_engine
+import card_roster
+import card_archive
+import card_image
+from card_log import LogStore, session_log_path, DEFAULT_LOG_LIMIT
+from card_hash import HashCache
+from card_config import ConfigStore
+from card_history import EditHistory
+from card_engine import normalize_path, BatchError
+from card_copy import COPY_MODES, DEFAULT_COPY_MODE
+from card_style import APP_STYLE_SHEET
+mark_startup('导入程序模块')
 
 class DragDropLineEdit(QLineEdit):
-    def __init__(self):
+    def __init__(self, multiple=False):
         super().__init__()
         self.setAcceptDrops(True)
+        # multiple 为 True 时可一次拖入多个文件夹，以 card_engine.SOURCE_SEPARATOR 分隔
+        self.multiple = multiple
     
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
@@ -23,6 +50,12 @@ class DragDropLineEdit(QLineEdit):
     
     def dropEvent(self, event):
         urls = event.mimeData().urls()
+        if self.multiple and len(urls) > 1:
+            paths = [normalize_path(url.toLocalFile()) for url in urls
+                     if os.path.isdir(url.toLocalFile())]
+            if paths:
+                self.setText(card_engine.SOURCE_SEPARATOR.join(paths))
+            return
         if urls:
             path = urls[0].toLocalFile()
             if os.path.exists(path):
@@ -111,33 +144,8 @@ class NumberedListWidget(QListWidget):
         self.delegate = NumberedItemDelegate(self)
         self.setItemDelegate(self.delegate)
         
-        # 设置样式，为行号留出空间
-        self.setStyleSheet("""
-            QListWidget {
-                border: 1px solid #E5E5EA;
-                border-radius: 10px;
-                background-color: white;
-                padding: 10px;
-                font-family: SimSun;
-                font-size: 14pt;
-            }
-            QListWidget::item {
-                height: 35px;
-                padding-left: 40px;  /* 为行号留出空间 */
-                border-radius: 5px;
-                border: 1px solid transparent;
-                margin: 2px 0px;
-                background-color: #F7F7F7;
-            }
-            QListWidget::item:hover:!selected {
-                background-color: #E5E5EA;
-            }
-            QListWidget::item:selected {
-                background-color: #007AFF;
-                color: white;
-                border: 1px solid #007AFF;
-            }
-        """)
+        # 样式见 card_style.APP_STYLE_SHEET 中的 #cardTypesList（为行号留出空间）
+        self.setObjectName('cardTypesList')
         
         # 跟踪当前打开的编辑器
         self.current_editor_item = None
@@ -204,39 +212,178 @@ class NumberedListWidget(QListWidget):
         for item in selected_items:
             item.setSelected(True)
 
-def normalize_path(path):
-    """将路径统一为Windows格式的独立函数"""
-    if not path:
-        return path
-    
-    # 将正斜杠替换为反斜杠
-    normalized = path.replace('/', '\\')
-    
-    # 处理os.path.join生成的路径，确保使用Windows分隔符
-    # os.path.join在Windows上会使用反斜杠，但为了确保一致性，我们再次标准化
-    normalized = normalized.replace('/', '\\')
-    
-    # 确保路径以正确的驱动器格式开始
-    if normalized.startswith('\\'):
-        # 如果是网络路径，保持原样
-        pass
-    elif ':' not in normalized[:2]:
-        # 如果没有驱动器标识符，添加当前驱动器
-        import os
-        current_drive = os.getcwd()[:2]  # 获取当前驱动器，如 "C:"
-        normalized = current_drive + '\\' + normalized.lstrip('\\')
-    
-    return normalized
+# 日志列表模型：数据来自 LogStore 的环形缓冲，QListView 只绘制可见的行
+class LogListModel(QAbstractListModel):
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.store.lines[index.row()]
+        return None
+
+    def append_messages(self, messages):
+        """追加日志，超出保留行数时先移除最早的行"""
+        lines = self.store.split(messages)
+        if not lines:
+            return
+        if len(lines) >= self.store.limit:
+            self.beginResetModel()
+            self.store.append(lines)
+            self.endResetModel()
+            return
+        overflow = self.store.overflow(len(lines))
+        if overflow:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self.store.discard_oldest(overflow)
+            self.endRemoveRows()
+        first = len(self.store.lines)
+        self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+        self.store.append(lines)
+        self.endInsertRows()
+
+# 后台处理线程：扫描、校验、复制都在此线程执行，界面只接收合并后的进度和日志
+class BatchWorker(QThread):
+    """在后台线程中处理；日志和进度先放入缓冲区，由界面线程的定时器按固定间隔统一发出
+
+    所有 log_lines/progress 信号都在界面线程中发出，保证日志顺序；
+    failed/batch_finished 到达界面前会先发出缓冲区中剩余的内容。
+    """
+    # 进度和日志的刷新间隔（秒），避免每个文件都触发一次界面重绘
+    REFRESH_INTERVAL = 0.1
+
+    planned = pyqtSignal(int)           # 校验通过，参数为总文件数
+    progress = pyqtSignal(int)          # 已处理文件数
+    log_lines = pyqtSignal(list)        # 一批日志行
+    failed = pyqtSignal(str, str)       # 标题, 消息（校验失败或异常）
+    batch_finished = pyqtSignal(object) # card_engine.BatchResult
+
+    def __init__(self, src_dir, dst_dir, card_types, name_id_pairs, naming_format,
+                 copy_mode=DEFAULT_COPY_MODE, source_index=None, resume=False,
+                 check_duplicates=False, hash_cache=None, recursive=False, watch=False,
+                 archive=None, transform=None, parent=None):
+        super().__init__(parent)
+        self.src_dir = src_dir
+        self.dst_dir = dst_dir
+        self.card_types = card_types
+        self.name_id_pairs = name_id_pairs
+        self.naming_format = naming_format
+        self.copy_mode = copy_mode
+        self.source_index = source_index
+        self.resume = resume
+        self.check_duplicates = check_duplicates
+        self.hash_cache = hash_cache
+        self.recursive = recursive
+        self.watch = watch
+        # 归档输出 (格式, 是否每人一个)，None 表示逐人建目录
+        self.archive = archive
+        # card_image.ImageTransform：复制的同时缩小/压缩图片，None 表示不处理
+        self.transform = transform
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._pending_lines = []
+        self._processed = 0
+        self._emitted_processed = 0
+        # 本对象属于界面线程，定时器在界面线程中触发
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(int(self.REFRESH_INTERVAL * 1000))
+        self._flush_timer.timeout.connect(self.flush)
+        self.started.connect(self._flush_timer.start)
+        self.finished.connect(self._flush_timer.stop)
+        # 先于界面连接的槽执行：开始处理、结束或出错之前先显示积压的日志
+        self.planned.connect(lambda *_: self.flush())
+        self.failed.connect(lambda *_: self.flush())
+        self.batch_finished.connect(lambda *_: self.flush())
+
+    def cancel(self):
+        """请求取消，在下一个文件前生效"""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def _log(self, message):
+        with self._lock:
+            self._pending_lines.append(message)
+
+    def _progress(self, processed_count):
+        self._processed = processed_count
+
+    def flush(self):
+        """发出缓冲区中的日志和最新进度（只在界面线程中调用）"""
+        with self._lock:
+            lines, self._pending_lines = self._pending_lines, []
+        if lines:
+            self.log_lines.emit(lines)
+        processed = self._processed
+        if processed != self._emitted_processed:
+            self._emitted_processed = processed
+            self.progress.emit(processed)
+
+    def run(self):
+        if self.watch:
+            self.run_watch()
+            return
+        try:
+            try:
+                plan = card_engine.prepare_batch(
+                    self.src_dir, self.dst_dir, self.card_types, self.name_id_pairs,
+                    self.naming_format, log=self._log, index=self.source_index,
+                    # 写入归档时不能链接或克隆源文件，按普通复制预检磁盘空间
+                    resume=self.resume and not self.archive,
+                    copy_mode='copy' if self.archive else self.copy_mode,
+                    check_duplicates=self.check_duplicates, hash_cache=self.hash_cache,
+                    recursive=self.recursive)
+            except BatchError as e:
+                self.failed.emit('警告', str(e))
+                return
+
+            self.planned.emit(plan.total)
+            if self.archive:
+                archive_format, per_person = self.archive
+                result = card_archive.archive_batch(
+                    plan, archive_format, per_person, log=self._log, progress=self._progress,
+                    is_cancelled=self.is_cancelled)
+            else:
+                result = card_engine.execute_batch(
+                    plan, log=self._log, progress=self._progress, is_cancelled=self.is_cancelled,
+                    copy_mode=self.copy_mode, transform=self.transform)
+            self.batch_finished.emit(result)
+        except Exception as e:
+            self.failed.emit('错误', f'处理文件时出错：{str(e)}')
+
+    def run_watch(self):
+        """监视源文件夹，图片到齐一人即归档，直到全部完成或取消"""
+        try:
+            import card_watch
+            self.planned.emit(len(self.name_id_pairs) * len(self.card_types))
+            result = card_watch.watch_batch(
+                self.src_dir, self.dst_dir, self.card_types, self.name_id_pairs,
+                self.naming_format, log=self._log, progress=self._progress,
+                is_cancelled=self.is_cancelled, copy_mode=self.copy_mode)
+            self.batch_finished.emit(result)
+        except BatchError as e:
+            self.failed.emit('警告', str(e))
+        except Exception as e:
+            self.failed.emit('错误', f'监视文件夹时出错：{str(e)}')
 
 class ImageSortingApp(QMainWindow):
+    # 日志区保留的行数（更早的日志只保存在日志文件中）
+    LOG_VIEW_LIMIT = DEFAULT_LOG_LIMIT
+    
     def __init__(self):
         super().__init__()
         self.setFixedSize(1600, 900)
         self.setWindowTitle('照片分类工具')
         
-        # 设置全局字体
+        # 设置全局字体和样式表（整个程序共用一份，只解析一次）
         font = QFont("SimSun", 14)
         QApplication.setFont(font)
+        QApplication.instance().setStyleSheet(APP_STYLE_SHEET)
         
         # 初始化证件类型列表
         self.default_card_types = [
@@ -257,9 +404,15 @@ class ImageSortingApp(QMainWindow):
             "image_{n}"
         ]
         
-        # 初始化历史记录相关属性
-        self.history_stack = []
-        self.max_history = 50  # 最大历史记录数
+        # 证件类型列表的撤销/重做记录，只保存每次修改变化的部分
+        self.card_types_history = EditHistory()
+        
+        # 后台处理线程及其进度对话框
+        self.worker = None
+        self.progress_dialog = None
+        
+        # 从文件导入的名单（card_roster.RosterImport），不放入输入框以免大名单拖慢界面
+        self.imported_roster = None
         
         # 获取程序所在目录 - 兼容exe环境
         if getattr(sys, 'frozen', False):
@@ -275,133 +428,99 @@ class ImageSortingApp(QMainWindow):
         self.dest_path_file = normalize_path(os.path.join(self.data_dir, "path.txt"))
         self.name_format_file = normalize_path(os.path.join(self.data_dir, "name.txt"))
         self.default_name_format_file = normalize_path(os.path.join(self.data_dir, "name_default.txt"))
-        
-        # 确保data目录存在并初始化所有必要文件
-        try:
-            print(f"程序目录: {self.app_dir}")
-            print(f"数据目录: {self.data_dir}")
-            
-            # 强制创建data目录
-            if not os.path.exists(self.data_dir):
-                os.makedirs(self.data_dir, exist_ok=True)
-                print(f'创建data目录: {self.data_dir}')
-            else:
-                print(f'data目录已存在: {self.data_dir}')
-            
-            # 只在文件不存在时创建默认配置文件
-            print("检查配置文件...")
-            
-            # 证件类型文件
-            if not os.path.exists(self.card_types_file):
-                try:
-                    with open(self.card_types_file, 'w', encoding='utf-8') as f:
-                        f.write('\n'.join(self.default_card_types))
-                    print(f'已创建证件类型文件: {self.card_types_file}')
-                except Exception as e:
-                    print(f'创建证件类型文件失败: {e}')
-                    import traceback
-                    traceback.print_exc()
-            else:
-                print(f'证件类型文件已存在: {self.card_types_file}')
-            
-            # 目标路径文件
-            if not os.path.exists(self.dest_path_file):
-                try:
-                    desktop_path = normalize_path(os.path.join(os.path.expanduser("~"), "Desktop"))
-                    if not os.path.exists(desktop_path):
-                        desktop_path = normalize_path(os.path.join(os.path.expanduser("~"), "桌面"))
-                    if not os.path.exists(desktop_path):
-                        desktop_path = "C:\\Users\\Public\\Desktop"
-                    
-                    # 统一路径格式为Windows格式
-                    normalized_desktop_path = normalize_path(desktop_path)
-                    
-                    with open(self.dest_path_file, 'w', encoding='utf-8') as f:
-                        f.write(normalized_desktop_path)
-                    print(f'已创建目标路径文件: {self.dest_path_file}')
-                except Exception as e:
-                    print(f'创建目标路径文件失败: {e}')
-                    import traceback
-                    traceback.print_exc()
-            else:
-                print(f'目标路径文件已存在: {self.dest_path_file}')
-            
-            # 命名格式文件
-            if not os.path.exists(self.name_format_file):
-                try:
-                    with open(self.name_format_file, 'w', encoding='utf-8') as f:
-                        f.write('\r\n'.join(self.default_formats))
-                    print(f'已创建命名格式文件: {self.name_format_file}')
-                except Exception as e:
-                    print(f'创建命名格式文件失败: {e}')
-                    import traceback
-                    traceback.print_exc()
-            else:
-                print(f'命名格式文件已存在: {self.name_format_file}')
-
-            # 默认命名格式文件
-            if not os.path.exists(self.default_name_format_file):
-                try:
-                    with open(self.default_name_format_file, 'w', encoding='utf-8') as f:
-                        f.write('图片 {n}')
-                    print(f'已创建默认命名格式文件: {self.default_name_format_file}')
-                except Exception as e:
-                    print(f'创建默认命名格式文件失败: {e}')
-                    import traceback
-                    traceback.print_exc()
-            else:
-                print(f'默认命名格式文件已存在: {self.default_name_format_file}')
-            
-            # 验证文件创建
-            if all([
-                os.path.exists(self.card_types_file),
-                os.path.exists(self.dest_path_file),
-                os.path.exists(self.name_format_file),
-                os.path.exists(self.default_name_format_file)
-            ]):
-                print("所有配置文件创建成功！")
-            else:
-                print("部分配置文件创建失败")
-                
-        except Exception as e:
-            print(f'初始化配置目录失败：{str(e)}')
-            import traceback
-            traceback.print_exc()
-            # 不退出程序，继续运行
+        self.source_index_file = normalize_path(os.path.join(self.data_dir, "source_index.json"))
+        self.hash_cache_file = normalize_path(os.path.join(self.data_dir, "hash_cache.json"))
+        
+        # 源目录扫描索引：重复点击开始处理时，源目录未变化则不再重新扫描
+        self.source_index = card_engine.SourceIndex(self.source_index_file)
+        # 源图片校验值缓存：检查重复图片时，未变化的文件不再重新读取
+        self.hash_cache = HashCache(self.hash_cache_file)
+        
+        # 日志：界面只保留最近 LOG_VIEW_LIMIT 行，完整日志写入 data/logs/（日志文件在窗口显示后创建）
+        self.log_store = LogStore(None, self.LOG_VIEW_LIMIT)
+        self.log_model = LogListModel(self.log_store, self)
+        
+        # 配置存储：各配置文件读入内存，修改合并后再写盘
+        self.config = ConfigStore(self.data_dir)
+        self.config.register('card_types', "card.txt", self.default_card_types, lines=True)
+        self.config.register('dest_path', "path.txt", self.default_dest_path())
+        # 命名格式使用 Windows 风格换行，避免在记事本显示空行
+        self.config.register('naming_formats', "name.txt", self.default_formats,
+                             lines=True, newline='\r\n')
+        self.config.register('default_naming_format', "name_default.txt", "图片 {n}")
+        mark_startup('初始化数据')
         
         # 初始化界面
         self.initUI()
+        mark_startup('创建界面')
         
-        # 加载保存的路径、证件类型和命名格式
+        # 加载保存的路径、证件类型和命名格式（配置文件不存在时使用默认值）
         self.load_dest_path()
         self.load_card_types()  # 加回证件类型列表的加载
         self.load_naming_formats()
         self.load_default_naming_format()
+        mark_startup('加载配置')
+        
+        # 撤销/重做证件类型的修改（输入框有焦点时由输入框自己处理）
+        QShortcut(QKeySequence.Undo, self, activated=self.undo_card_types)
+        # 重做同时支持 Ctrl+Y 和 Ctrl+Shift+Z（不用 QKeySequence.Redo，以免与后者重复而互相冲突）
+        for key in ('Ctrl+Y', 'Ctrl+Shift+Z'):
+            QShortcut(QKeySequence(key), self, activated=self.redo_card_types)
+        
+        # 创建配置文件、日志文件等不影响显示的工作留到窗口显示之后
+        QTimer.singleShot(0, self.finish_startup)
         
 
         
 
 
+    def finish_startup(self):
+        """窗口显示后执行的初始化：创建缺少的配置文件和本次运行的日志文件"""
+        mark_startup('首次绘制')
+        try:
+            # 只在文件不存在时创建默认配置文件
+            for path in self.config.ensure_files():
+                print(f'已创建配置文件: {path}')
+        except Exception as e:
+            print(f'初始化配置目录失败：{str(e)}')
+            # 不退出程序，继续运行
+        try:
+            self.log_store.spill_path = session_log_path(os.path.join(self.data_dir, "logs"))
+        except OSError as e:
+            print(f'创建日志目录失败: {e}')
+        # 监听目标文件夹输入框的文本变化，自动保存路径（加载完成后再连接，避免启动时触发）
+        self.dest_edit.textChanged.connect(self.on_dest_path_text_changed)
+        mark_startup('延后初始化')
+
+    @staticmethod
+    def default_dest_path():
+        """默认目标文件夹：当前用户的桌面"""
+        desktop_path = normalize_path(os.path.join(os.path.expanduser("~"), "Desktop"))
+        if not os.path.exists(desktop_path):
+            desktop_path = normalize_path(os.path.join(os.path.expanduser("~"), "桌面"))
+        if not os.path.exists(desktop_path):
+            desktop_path = "C:\\Users\\Public\\Desktop"
+        return normalize_path(desktop_path)
+
     def load_card_types(self):
         """加载证件类型列表"""
         try:
-            if os.path.exists(self.card_types_file):
-                with open(self.card_types_file, 'r', encoding='utf-8') as f:
-                    card_types = [line.strip() for line in f.readlines() if line.strip()]
-                self.card_types_list.clear()  # 清除现有项目
-                self.card_types_list.addItems(card_types)
-                # 初始化历史记录
-                self.history_stack = [card_types.copy()]
-                return
+            # 文件不存在时配置存储返回默认类型
+            card_types = self.config.get('card_types')
+            self.card_types_list.clear()  # 清除现有项目
+            self.card_types_list.addItems(card_types)
+            # 初始化历史记录
+            self.card_types_history.reset(card_types)
+            return
         except Exception as e:
             print(f"加载证件类型失败: {str(e)}")
             QMessageBox.warning(self, '警告', f'加载证件类型文件失败：{str(e)}')
         
-        # 如果文件不存在或加载失败，使用默认类型
+        # 如果加载失败，使用默认类型
         self.card_types_list.clear()
         self.card_types_list.addItems(self.default_card_types)
         # 初始化历史记录
-        self.history_stack = [self.default_card_types.copy()]
+        self.card_types_history.reset(self.default_card_types)
 
     def save_card_types(self):
         """保存证件类型列表"""
@@ -409,25 +528,51 @@ class ImageSortingApp(QMainWindow):
             card_types = [self.card_types_list.item(i).text() 
                          for i in range(self.card_types_list.count())]
             
-            # 保存当前状态到历史记录栈（只有在状态变化时才保存）
-            if not self.history_stack or card_types != self.history_stack[-1]:
-                # 深拷贝当前状态
-                self.history_stack.append(card_types.copy())
-                print(f'保存历史记录，当前历史记录数: {len(self.history_stack)}')
-                
-                # 如果历史记录超过最大值，删除最早的记录
-                if len(self.history_stack) > self.max_history:
-                    self.history_stack.pop(0)
+            # 记录本次修改（只有在内容变化时才记录）
+            self.card_types_history.record(card_types)
             
-            # 使用 UTF-8 编码保存，确保没有 BOM 标记，使用 Windows 换行符
-            with open(self.card_types_file, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(card_types))
-                
-            print(f'证件类型列表已保存到 {self.card_types_file}')
+            # 拖动、增删时会频繁调用，由配置存储合并后再写盘
+            self.config.set('card_types', card_types)
         except Exception as e:
             print(f"保存证件类型失败: {str(e)}")
             QMessageBox.warning(self, '警告', f'保存证件类型文件失败：{str(e)}')
 
+    def undo_card_types(self):
+        """撤销证件类型列表的上一次修改"""
+        self.apply_card_type_steps(self.card_types_history.undo())
+
+    def redo_card_types(self):
+        """重做被撤销的修改"""
+        self.apply_card_type_steps(self.card_types_history.redo())
+
+    def apply_card_type_steps(self, steps):
+        """在列表控件上执行撤销/重做的步骤，并保存结果"""
+        if not steps:
+            return
+        list_widget = self.card_types_list
+        if list_widget.current_editor_item:
+            list_widget.closePersistentEditor(list_widget.current_editor_item)
+            list_widget.current_editor_item = None
+        for step in steps:
+            if step[0] == 'insert':
+                list_widget.insertItem(step[1], step[2])
+                changed_row = step[1]
+            elif step[0] == 'delete':
+                list_widget.takeItem(step[1])
+                changed_row = min(step[1], list_widget.count() - 1)
+            elif step[0] == 'move':
+                list_widget.insertItem(step[2], list_widget.takeItem(step[1]))
+                changed_row = step[2]
+            else:
+                list_widget.item(step[1]).setText(step[2])
+                changed_row = step[1]
+        # 重新应用搜索过滤，并滚动到最后修改的位置
+        self.filter_card_types(self.search_edit.text())
+        if changed_row >= 0:
+            list_widget.scrollToItem(list_widget.item(changed_row))
+        # 历史记录中的内容已是执行后的结果，直接保存
+        self.config.set('card_types', self.card_types_history.items)
+
     def initUI(self):
         """初始化界面"""
         # 创建中央部件
@@ -435,7 +580,7 @@ class ImageSortingApp(QMainWindow):
         self.setCentralWidget(central_widget)
         
         # 初始化所有控件
-        self.source_edit = DragDropLineEdit()
+        self.source_edit = DragDropLineEdit(multiple=True)
         self.dest_edit = DragDropLineEdit()
         self.id_numbers_edit = QTextEdit()
         self.card_types_list = NumberedListWidget(self)
@@ -462,33 +607,17 @@ class ImageSortingApp(QMainWindow):
         
         # 定义按钮及其样式 - Apple 风格
         buttons = [
-            ("全选", self.select_all_items, "#007AFF", "#0062CC", "#004999"),    # Apple 蓝
-            ("取消", self.deselect_all_items, "#007AFF", "#0062CC", "#004999"),  # Apple 蓝
-            ("新增", self.show_add_dialog, "#007AFF", "#0062CC", "#004999"),     # Apple 蓝
-            ("删除", self.delete_selected_items, "#FF3B30", "#CC2F26", "#991F1C") # Apple 红
+            ("全选", self.select_all_items, "tool"),            # Apple 蓝
+            ("取消", self.deselect_all_items, "tool"),          # Apple 蓝
+            ("新增", self.show_add_dialog, "tool"),             # Apple 蓝
+            ("删除", self.delete_selected_items, "toolDanger")  # Apple 红
         ]
         
-        for btn_text, btn_slot, normal_color, hover_color, pressed_color in buttons:
+        for btn_text, btn_slot, role in buttons:
             btn = QPushButton(btn_text)
             btn.setFixedWidth(65)
             btn.setFixedHeight(35)
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    border-radius: 6px;
-                    padding: 5px 10px;
-                    background-color: {normal_color};
-                    color: white;
-                    border: none;
-                    font-family: SimSun;
-                    font-size: 14pt;
-                }}
-                QPushButton:hover {{
-                    background-color: {hover_color};
-                }}
-                QPushButton:pressed {{
-                    background-color: {pressed_color};
-                }}
-            """)
+            btn.setProperty("role", role)
             btn.clicked.connect(btn_slot)
             buttons_layout.addWidget(btn)
         
@@ -496,63 +625,16 @@ class ImageSortingApp(QMainWindow):
         
         # 证件类型标题
         card_types_label = QLabel("证件类型列表")
-        card_types_label.setStyleSheet("""
-            QLabel {
-                font-family: SimSun;
-                font-size: 14pt;
-                color: #333333;
-                padding-left: 5px;
-            }
-        """)
+        card_types_label.setProperty("role", "title")
         left_layout.addWidget(card_types_label)
         
         # 添加搜索框
         self.search_edit.setPlaceholderText("搜索证件类型...")
-        self.search_edit.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #E5E5EA;
-                border-radius: 15px;
-                padding: 5px 10px;
-                background-color: white;
-                font-family: SimSun;
-                font-size: 12pt;
-                margin: 5px 0px;
-            }
-            QLineEdit:focus {
-                border: 2px solid #007AFF;
-            }
-        """)
+        self.search_edit.setProperty("role", "search")
         self.search_edit.textChanged.connect(self.filter_card_types)
         left_layout.addWidget(self.search_edit)
         
-        # 证件类型列表
-        self.card_types_list.setStyleSheet("""
-            QListWidget {
-                border: 1px solid #E5E5EA;
-                border-radius: 10px;
-                background-color: white;
-                padding: 10px;
-                font-family: SimSun;
-                font-size: 14pt;
-                margin-top: 5px;
-            }
-            QListWidget::item {
-                height: 35px;
-                padding-left: 40px;
-                border-radius: 5px;
-                border: 1px solid transparent;
-                margin: 2px 0px;
-                background-color: #F7F7F7;
-            }
-            QListWidget::item:hover:!selected {
-                background-color: #E5E5EA;
-            }
-            QListWidget::item:selected {
-                background-color: #007AFF;
-                color: white;
-                border: 1px solid #007AFF;
-            }
-        """)
+        # 证件类型列表（NumberedListWidget 设置了 objectName，样式见 #cardTypesList）
         left_layout.addWidget(self.card_types_list)
         
         # 添加左右布局到主布局
@@ -572,96 +654,146 @@ class ImageSortingApp(QMainWindow):
         self.add_input_section(middle_layout, "源文件夹:", self.source_edit, "选择源文件夹")
         self.add_input_section(middle_layout, "目标文件夹:", self.dest_edit, "选择目标文件夹")
         
-        # 监听目标文件夹输入框的文本变化，自动保存路径
-        # 延迟连接，避免程序启动时触发
-        from PyQt5.QtCore import QTimer
-        QTimer.singleShot(100, lambda: self.dest_edit.textChanged.connect(self.on_dest_path_text_changed))
+        # 目标文件夹输入框的自动保存在 finish_startup 中连接
         
         # 姓名+身份证号输入区域
         id_numbers_label = QLabel("请输入姓名+身份证号（每行一个）:")
-        id_numbers_label.setStyleSheet("""
-            QLabel {
-                font-family: SimSun;
-                font-size: 14pt;
-                color: #333333;
-                padding-left: 5px;
-            }
-        """)
-        middle_layout.addWidget(id_numbers_label)
+        id_numbers_label.setProperty("role", "title")
+        
+        # 导入名单按钮（txt/CSV/TSV）
+        import_roster_btn = QPushButton("导入名单")
+        import_roster_btn.setFixedSize(180, 40)
+        import_roster_btn.setProperty("role", "secondary")
+        import_roster_btn.clicked.connect(self.import_roster_file)
+        
+        id_numbers_layout = QHBoxLayout()
+        id_numbers_layout.addWidget(id_numbers_label)
+        id_numbers_layout.addStretch()
+        id_numbers_layout.addWidget(import_roster_btn)
+        middle_layout.addLayout(id_numbers_layout)
         
         # 设置姓名+身份证号输入框的样式和占位符
-        self.id_numbers_edit.setPlaceholderText("请输入姓名+身份证号，每行一个\n例如：\n李四+110101199001011234\n（程序会自动添加-证件类型和扩展名）")
-        self.id_numbers_edit.setStyleSheet("""
-            QTextEdit {
-                border: 1px solid #E5E5EA;
-                border-radius: 10px;
-                padding: 10px;
-                background-color: white;
-                font-family: SimSun;
-                font-size: 14pt;
-                min-height: 120px;
-            }
-            QTextEdit:focus {
-                border: 2px solid #007AFF;
-            }
-        """)
+        self.id_numbers_placeholder = "请输入姓名+身份证号，每行一个\n例如：\n李四+110101199001011237\n（程序会自动添加-证件类型和扩展名）"
+        self.id_numbers_edit.setPlaceholderText(self.id_numbers_placeholder)
+        self.id_numbers_edit.textChanged.connect(self.on_id_numbers_text_changed)
+        self.id_numbers_edit.setObjectName("idNumbersEdit")
         middle_layout.addWidget(self.id_numbers_edit)
         
         # 导出日志按钮
         export_log_btn = QPushButton("导出日志")
         export_log_btn.setFixedSize(180, 40)
-        export_log_btn.setStyleSheet("""
-            QPushButton {
-                border-radius: 20px;
-                padding: 5px 15px;
-                background-color: #F2F2F7;
-                color: #007AFF;
-                border: 1px solid #E5E5EA;
-                font-family: SimSun;
-                font-size: 14pt;  /* 宋体四号 */
-                font-weight: normal;
-            }
-            QPushButton:hover {
-                background-color: #E5E5EA;
-                color: #0062CC;
-            }
-            QPushButton:pressed {
-                background-color: #D1D1D6;
-                color: #004999;
-            }
-        """)
+        export_log_btn.setProperty("role", "secondary")
+        export_log_btn.setObjectName("exportLogButton")
         export_log_btn.clicked.connect(self.export_log)
         
         # 添加导出日志按钮到布局
+        # 输出方式选择（复制/硬链接/克隆/内核复制）
+        copy_mode_label = QLabel("输出方式:")
+        copy_mode_label.setProperty("role", "title")
+        self.copy_mode_combo = QComboBox()
+        for mode, mode_name in COPY_MODES.items():
+            self.copy_mode_combo.addItem(mode_name, mode)
+        self.copy_mode_combo.setCurrentIndex(self.copy_mode_combo.findData(DEFAULT_COPY_MODE))
+        self.copy_mode_combo.setFixedSize(200, 40)
+        self.copy_mode_combo.setToolTip("自动：同一磁盘优先克隆，不支持时回退为普通复制\n"
+                                        "硬链接：输出文件与源文件共用数据，仅限同一磁盘")
+        self.copy_mode_combo.setProperty("role", "choice")
+        
+        # 断点续传：同一批数据中断后继续写入原输出目录，跳过已完成的文件
+        self.resume_check = QCheckBox("继续未完成的处理")
+        self.resume_check.setChecked(True)
+        self.resume_check.setToolTip("处理中断后再次处理同一批数据时，继续写入原输出目录并跳过已完成的文件")
+        self.resume_check.setProperty("role", "option")
+        
+        # 处理前检查源图片中是否有重复扫描的页（需读取全部源文件）
+        self.duplicate_check = QCheckBox("检查重复图片")
+        self.duplicate_check.setToolTip("处理前比较所有源图片的内容，发现同一页扫描了两次等情况时停止处理")
+        self.duplicate_check.setProperty("role", "option")
+        
+        # 扫描源文件夹的所有子文件夹（例如扫描仪按日期建立的子文件夹）
+        self.recursive_check = QCheckBox("包含子文件夹")
+        self.recursive_check.setToolTip(
+            "扫描源文件夹及其所有子文件夹（按子文件夹名称依次排列，各子文件夹可以各自从 1 编号）；"
+            "多个源文件夹时按填写顺序合并，每个文件夹内按序号排序")
+        self.recursive_check.setProperty("role", "option")
+        
+        # 监视源文件夹：扫描仪还在扫描时就开始归档，每凑齐一人的全部证件即复制
+        self.watch_check = QCheckBox("监视文件夹")
+        self.watch_check.setToolTip("开始处理后持续监视源文件夹，新图片写完（大小不再变化）且凑齐一人的全部证件类型即归档，"
+                                    "可在扫描过程中提前开始；点击取消停止监视")
+        self.watch_check.setProperty("role", "option")
+        
         export_btn_layout = QHBoxLayout()
+        export_btn_layout.addWidget(copy_mode_label)
+        export_btn_layout.addWidget(self.copy_mode_combo)
+        export_btn_layout.addWidget(self.resume_check)
+        export_btn_layout.addWidget(self.duplicate_check)
+        export_btn_layout.addWidget(self.recursive_check)
+        export_btn_layout.addWidget(self.watch_check)
         export_btn_layout.addStretch()
         export_btn_layout.addWidget(export_log_btn)
         middle_layout.addLayout(export_btn_layout)
+        
+        # 打包输出：把结果直接写入 ZIP/TAR，不在目标文件夹中逐人建目录
+        archive_label = QLabel("打包输出:")
+        archive_label.setProperty("role", "title")
+        self.archive_combo = QComboBox()
+        self.archive_combo.addItem("不打包（逐人建文件夹）", None)
+        for archive_format, format_name in card_archive.ARCHIVE_FORMATS.items():
+            self.archive_combo.addItem(f"单个 {format_name}", (archive_format, False))
+            self.archive_combo.addItem(f"每人一个 {format_name}", (archive_format, True))
+        self.archive_combo.setFixedSize(300, 40)
+        self.archive_combo.setToolTip("整批或每人写入一个归档文件，目录结构与逐人建文件夹相同；\n"
+                                      "ZIP 只存储不压缩（JPEG 压缩不了多少），不支持继续未完成的处理和监视文件夹")
+        self.archive_combo.setProperty("role", "choice")
+        archive_layout = QHBoxLayout()
+        archive_layout.addWidget(archive_label)
+        archive_layout.addWidget(self.archive_combo)
+        
+        # 缩小/压缩图片：复制完成的图片在后台按最长边和大小上限重新编码
+        self.transform_check = QCheckBox("压缩图片")
+        self.transform_check.setToolTip("复制的同时把 JPEG/PNG/WebP 图片缩小到最长边以内，"
+                                        "JPEG 超过大小上限时降低质量；已在限制内的图片不改动")
+        self.transform_check.setProperty("role", "option")
+        self.max_edge_spin = QSpinBox()
+        self.max_edge_spin.setRange(0, 20000)
+        self.max_edge_spin.setSingleStep(100)
+        self.max_edge_spin.setValue(2000)
+        self.max_edge_spin.setSpecialValueText("边长不限")
+        self.max_edge_spin.setPrefix("最长边 ")
+        self.max_edge_spin.setSuffix(" 像素")
+        self.max_edge_spin.setFixedSize(200, 40)
+        self.max_edge_spin.setProperty("role", "number")
+        self.max_kb_spin = QSpinBox()
+        self.max_kb_spin.setRange(0, 100000)
+        self.max_kb_spin.setSingleStep(100)
+        self.max_kb_spin.setValue(500)
+        self.max_kb_spin.setSpecialValueText("大小不限")
+        self.max_kb_spin.setPrefix("不超过 ")
+        self.max_kb_spin.setSuffix(" KB")
+        self.max_kb_spin.setFixedSize(200, 40)
+        self.max_kb_spin.setProperty("role", "number")
+        for spin in (self.max_edge_spin, self.max_kb_spin):
+            spin.setEnabled(False)
+            self.transform_check.toggled.connect(spin.setEnabled)
+        archive_layout.addWidget(self.transform_check)
+        archive_layout.addWidget(self.max_edge_spin)
+        archive_layout.addWidget(self.max_kb_spin)
+        archive_layout.addStretch()
+        middle_layout.addLayout(archive_layout)
 
         # 日志区域
-        self.log_text = QTextEdit()
-        middle_layout.addWidget(self.log_text)
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setWordWrap(False)
+        self.log_view.setSelectionMode(QListView.ExtendedSelection)
+        middle_layout.addWidget(self.log_view)
         
         # 开始处理按钮
         start_btn = QPushButton("开始处理")
         start_btn.setFixedSize(180, 40)
-        start_btn.setStyleSheet("""
-            QPushButton {
-                border-radius: 20px;
-                background-color: #007AFF;
-                color: white;
-                border: none;
-                font-family: SimSun;
-                font-size: 14pt;  /* 宋体四号 */
-                font-weight: normal;
-            }
-            QPushButton:hover {
-                background-color: #0062CC;
-            }
-            QPushButton:pressed {
-                background-color: #004999;
-            }
-        """)
+        start_btn.setProperty("role", "primary")
         start_btn.clicked.connect(self.process_files)
         
         # 添加开始处理按钮到布局（居中）
@@ -680,12 +812,12 @@ class ImageSortingApp(QMainWindow):
         format_buttons_layout = QHBoxLayout()
         format_buttons_layout.setSpacing(8)
         format_buttons = [
-            ("新增", self.add_naming_format, "#007AFF", "#0062CC", "#004999"),
-            ("删除", self.delete_naming_format, "#FF3B30", "#CC2F26", "#991F1C"),
-            ("设为默认", self.set_default_naming_format, "#34C759", "#28A745", "#1E7E34")
+            ("新增", self.add_naming_format, "tool"),
+            ("删除", self.delete_naming_format, "toolDanger"),
+            ("设为默认", self.set_default_naming_format, "toolConfirm")
         ]
         
-        for btn_text, btn_slot, normal_color, hover_color, pressed_color in format_buttons:
+        for btn_text, btn_slot, role in format_buttons:
             btn = QPushButton(btn_text)
             # 让“设为默认”按钮宽一些，避免文字被截断
             if btn_text == "设为默认":
@@ -693,23 +825,7 @@ class ImageSortingApp(QMainWindow):
             else:
                 btn.setFixedWidth(65)
             btn.setFixedHeight(35)
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    border-radius: 6px;
-                    padding: 5px 10px;
-                    background-color: {normal_color};
-                    color: white;
-                    border: none;
-                    font-family: SimSun;
-                    font-size: 14pt;
-                }}
-                QPushButton:hover {{
-                    background-color: {hover_color};
-                }}
-                QPushButton:pressed {{
-                    background-color: {pressed_color};
-                }}
-            """)
+            btn.setProperty("role", role)
             btn.clicked.connect(btn_slot)
             format_buttons_layout.addWidget(btn)
         
@@ -718,66 +834,25 @@ class ImageSortingApp(QMainWindow):
 
         # 添加标题
         right_title = QLabel("图片命名格式")
-        right_title.setStyleSheet("""
-            QLabel {
-                font-family: SimSun;
-                font-size: 14pt;
-                color: #333333;
-                padding-left: 5px;
-            }
-        """)
+        right_title.setProperty("role", "title")
         right_layout.addWidget(right_title)
 
         # 添加搜索框
         self.format_search = QLineEdit()
         self.format_search.setPlaceholderText("搜索命名格式...")
-        self.format_search.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #E5E5EA;
-                border-radius: 15px;
-                padding: 5px 10px;
-                background-color: white;
-                font-family: SimSun;
-                font-size: 12pt;
-                margin: 5px 0px;
-            }
-            QLineEdit:focus {
-                border: 2px solid #007AFF;
-            }
-        """)
+        self.format_search.setProperty("role", "search")
         self.format_search.textChanged.connect(self.filter_formats)
         right_layout.addWidget(self.format_search)
 
         # 添加命名格式输入框
         self.naming_format_edit.setText("图片 {n}")  # 默认格式（启动后会被默认值覆盖）
         self.naming_format_edit.setPlaceholderText("例如: 图片 {n}")
-        self.naming_format_edit.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #E5E5EA;
-                border-radius: 6px;
-                padding: 5px 10px;
-                background-color: white;
-                font-family: SimSun;
-                font-size: 14pt;
-                min-height: 35px;
-                margin: 5px 0px;
-            }
-            QLineEdit:focus {
-                border: 2px solid #007AFF;
-            }
-        """)
+        self.naming_format_edit.setObjectName("namingFormatEdit")
         right_layout.addWidget(self.naming_format_edit)
 
         # 添加格式说明标签
         format_hint = QLabel("自定义图片命名规则")
-        format_hint.setStyleSheet("""
-            QLabel {
-                font-family: SimSun;
-                font-size: 12pt;
-                color: #666666;
-                padding-left: 5px;
-            }
-        """)
+        format_hint.setProperty("role", "hint")
         right_layout.addWidget(format_hint)
 
         # 添加命名格式列表
@@ -790,33 +865,7 @@ class ImageSortingApp(QMainWindow):
             "image_{n}"
         ])
         
-        self.naming_list.setStyleSheet("""
-            QListWidget {
-                border: 1px solid #E5E5EA;
-                border-radius: 10px;
-                background-color: white;
-                padding: 10px;
-                font-family: SimSun;
-                font-size: 14pt;
-                margin-top: 5px;
-            }
-            QListWidget::item {
-                height: 35px;
-                padding-left: 10px;
-                border-radius: 5px;
-                border: 1px solid transparent;
-                margin: 2px 0px;
-                background-color: #F7F7F7;
-            }
-            QListWidget::item:hover:!selected {
-                background-color: #E5E5EA;
-            }
-            QListWidget::item:selected {
-                background-color: #007AFF;
-                color: white;
-                border: 1px solid #007AFF;
-            }
-        """)
+        self.naming_list.setObjectName("namingList")
         
         # 连接命名格式列表的信号
         self.naming_list.itemSelectionChanged.connect(self.on_format_selection_changed)
@@ -836,14 +885,7 @@ class ImageSortingApp(QMainWindow):
         # 标签
         label = QLabel(label_text)
         label.setFixedWidth(150)
-        label.setStyleSheet("""
-            QLabel {
-                font-family: SimSun;
-                font-size: 14pt;
-                color: #333333;
-                padding-left: 5px;
-            }
-        """)
+        label.setProperty("role", "title")
         layout.addWidget(label)
         
         # 输入框 - Apple 风格
@@ -851,53 +893,18 @@ class ImageSortingApp(QMainWindow):
         line_edit.setMinimumWidth(500)
         if "目标文件夹" in label_text:
             line_edit.setPlaceholderText("默认使用自动创建的输出目录")
+        elif line_edit is self.source_edit:
+            line_edit.setPlaceholderText("拖拽或点击按钮选择，多个文件夹用 ; 分隔")
         else:
             line_edit.setPlaceholderText("拖拽或点击按钮选择")
-        line_edit.setStyleSheet("""
-            QLineEdit {
-                border-radius: 10px;
-                border: 1px solid #E5E5EA;
-                padding: 5px 10px;
-                background-color: white;
-                font-family: SimSun;
-                font-size: 14pt;
-            }
-            QLineEdit:hover {
-                border: 1px solid #007AFF;
-            }
-            QLineEdit:focus {
-                border: 2px solid #007AFF;
-                background-color: #FFFFFF;
-            }
-            QLineEdit[placeholderText] {
-                color: #8E8E93;
-            }
-        """)
+        line_edit.setProperty("role", "path")
         layout.addWidget(line_edit)
         
         # 浏览按钮 - Apple 风格
         browse_btn = QPushButton(button_text)
         browse_btn.setFixedWidth(180)
         browse_btn.setFixedHeight(40)
-        browse_btn.setStyleSheet("""
-            QPushButton {
-                border-radius: 10px;
-                padding: 5px 15px;
-                background-color: #F2F2F7;
-                color: #007AFF;
-                border: 1px solid #E5E5EA;
-                font-family: SimSun;
-                font-size: 14pt;
-            }
-            QPushButton:hover {
-                background-color: #E5E5EA;
-                color: #0062CC;
-            }
-            QPushButton:pressed {
-                background-color: #D1D1D6;
-                color: #004999;
-            }
-        """)
+        browse_btn.setProperty("role", "secondary")
         browse_btn.clicked.connect(lambda: self.browse_path(line_edit, '文件夹' in button_text))
         layout.addWidget(browse_btn)
         
@@ -924,135 +931,98 @@ class ImageSortingApp(QMainWindow):
                 print("不是目标文件夹输入框，不保存路径")
             
     def log(self, message):
-        self.log_text.append(message)
+        self.log_batch([message])
+        
+    def log_batch(self, lines):
+        """一次追加多行日志，原本停在底部时自动滚动到最新一行"""
+        scroll_bar = self.log_view.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+        self.log_model.append_messages(lines)
+        if at_bottom:
+            self.log_view.scrollToBottom()
         
     def process_files(self):
-        """处理文件"""
-        try:
-            src_dir = self.normalize_path(self.source_edit.text())
-            base_dst_dir = self.normalize_path(self.dest_edit.text())
-            
-            if not src_dir or not base_dst_dir:
-                self.show_message('警告', '请选择源文件夹和目标文件夹')
-                return
-                
-            if not os.path.exists(src_dir):
-                self.show_message('警告', '源文件夹不存在')
-                return
-                
-            if not os.path.exists(base_dst_dir):
-                self.show_message('警告', '目标文件夹不存在')
-                return
-                
-            # 创建输出目录
-            output_dir = self.normalize_path(os.path.join(base_dst_dir, "输出目录"))
-            if os.path.exists(output_dir):
-                # 如果输出目录已存在，尝试创建输出目录1、输出目录2等
-                i = 1
-                while os.path.exists(output_dir):
-                    output_dir = self.normalize_path(os.path.join(base_dst_dir, f"输出目录{i}"))
-                    i += 1
-            
-            # 创建输出目录
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # 获取选中的证件类型
-            selected_card_types = [item.text() for item in self.card_types_list.selectedItems()]
-            if not selected_card_types:
-                self.show_message('警告', '请选择至少一种证件类型')
+        """在后台线程中处理文件"""
+        if self.worker is not None and self.worker.isRunning():
+            return
+        
+        archive = self.archive_combo.currentData()
+        if archive and self.watch_check.isChecked():
+            self.show_message('警告', '监视文件夹时不支持打包输出，请取消其中一项')
+            return
+        
+        transform = None
+        if self.transform_check.isChecked():
+            if archive or self.watch_check.isChecked():
+                self.show_message('警告', '打包输出和监视文件夹时不支持压缩图片，请取消其中一项')
                 return
-            
-            # 获取姓名+身份证号列表
-            name_id_pairs = [line.strip() for line in self.id_numbers_edit.toPlainText().split('\n') if line.strip()]
-            
-            if not name_id_pairs:
-                self.show_message('警告', '请输入至少一个姓名+身份证号')
+            max_edge = self.max_edge_spin.value()
+            max_kb = self.max_kb_spin.value()
+            if not max_edge and not max_kb:
+                self.show_message('警告', '请设置最长边或大小上限')
                 return
-            
-            # 获取文件列表并排序
-            files = self.get_sorted_files(src_dir)
-            if not files:
-                self.show_message('警告', '源文件夹中没有符合命名格式的图片文件')
+            try:
+                transform = card_image.ImageTransform(max_edge or None, max_kb * 1024 or None)
+            except BatchError as e:
+                self.show_message('警告', str(e))
                 return
-            
-            # 验证输入格式
-            for i, line in enumerate(name_id_pairs):
-                if not self.is_valid_name_id_format(line):
-                    self.show_message('警告', f'第{i+1}行格式不正确：{line}\n正确格式：姓名+身份证号，例如：李四+110101199001011234')
-                    return
-            
-            # 计算总数并验证
-            images_per_person = len(selected_card_types)
-            total_images_needed = len(name_id_pairs) * images_per_person
-            
-            if len(files) != total_images_needed:
-                self.show_message('警告', 
-                    f'图片数量不匹配！\n'
-                    f'每个人需要 {images_per_person} 张图片\n'
-                    f'共有 {len(name_id_pairs)} 个人\n'
-                    f'需要的总图片数：{total_images_needed}\n'
-                    f'实际图片数量：{len(files)}')
-                return
-            
-            # 显示进度对话框
-            progress = QProgressDialog("正在处理文件...", "取消", 0, total_images_needed, self)
-            progress.setWindowModality(Qt.WindowModal)
-            progress.setMinimumDuration(0)
-            processed_count = 0
-            
-            # 按姓名+身份证号分组处理文件
-            for i, name_id_pair in enumerate(name_id_pairs):
-                if progress.wasCanceled():
-                    break
-                
-                try:
-                    # 在输出目录下创建每个姓名+身份证号的目录
-                    person_dir = self.normalize_path(os.path.join(output_dir, name_id_pair))
-                    os.makedirs(person_dir, exist_ok=True)
-                    
-                    # 获取这个人的图片
-                    start_idx = i * images_per_person
-                    person_files = files[start_idx:start_idx + images_per_person]
-                    
-                    # 复制并重命名文件
-                    for src_file, card_type in zip(person_files, selected_card_types):
-                        if progress.wasCanceled():
-                            break
-                        
-                        try:
-                            # 生成目标文件名：姓名+身份证号-证件类型
-                            new_name = f"{name_id_pair}-{card_type}{os.path.splitext(src_file)[1]}"
-                            dst_file = self.normalize_path(os.path.join(person_dir, new_name))
-                            
-                            # 复制文件
-                            shutil.copy2(src_file, dst_file)
-                            self.log(f'已复制到 {name_id_pair} 的文件夹: {os.path.basename(src_file)} -> {new_name}')
-                            
-                            processed_count += 1
-                            progress.setValue(processed_count)
-                            QApplication.processEvents()
-                            
-                        except Exception as e:
-                            self.log(f'处理文件出错 {src_file}: {str(e)}')
-                            continue
-                            
-                except Exception as e:
-                    self.log(f'处理 {name_id_pair} 的文件夹时出错: {str(e)}')
-                    continue
-            
-            if processed_count == total_images_needed:
-                self.show_message(
-                    '完成', 
-                    f'文件处理完成！\n'
-                    f'已处理 {len(name_id_pairs)} 个姓名+身份证号文件夹\n'
-                    f'共处理 {processed_count} 个文件'
-                )
-                
-        except Exception as e:
-            self.show_message('错误', f'处理文件时出错：{str(e)}')
-        finally:
-            if 'progress' in locals():
-                progress.close()
+        
+        self.worker = BatchWorker(
+            self.source_edit.text(),
+            self.dest_edit.text(),
+            [item.text() for item in self.card_types_list.selectedItems()],
+            self.get_name_id_pairs(),
+            self.get_selected_naming_format(),
+            self.copy_mode_combo.currentData(),
+            self.source_index,
+            self.resume_check.isChecked(),
+            self.duplicate_check.isChecked(),
+            self.hash_cache,
+            self.recursive_check.isChecked(),
+            self.watch_check.isChecked(),
+            archive,
+            transform,
+            self,
+        )
+        
+        # 显示进度对话框（校验完成前为忙碌状态）
+        self.progress_dialog = QProgressDialog("正在处理文件...", "取消", 0, 0, self)
+        self.progress_dialog.setWindowModality(Qt.WindowModal)
+        self.progress_dialog.setMinimumDuration(0)
+        self.progress_dialog.setAutoClose(False)
+        self.progress_dialog.setAutoReset(False)
+        self.progress_dialog.canceled.connect(self.worker.cancel)
+        
+        self.worker.planned.connect(lambda total: self.progress_dialog.setMaximum(total))
+        self.worker.progress.connect(self.progress_dialog.setValue)
+        self.worker.log_lines.connect(self.log_batch)
+        self.worker.failed.connect(self.on_batch_failed)
+        self.worker.batch_finished.connect(self.on_batch_finished)
+        self.worker.start()
+        
+    def close_progress_dialog(self):
+        if self.progress_dialog is not None:
+            self.progress_dialog.close()
+            self.progress_dialog = None
+        
+    def on_batch_failed(self, title, message):
+        """后台处理校验失败或出错"""
+        self.close_progress_dialog()
+        self.show_message(title, message)
+        
+    def on_batch_finished(self, result):
+        """后台处理结束"""
+        self.close_progress_dialog()
+        if result.copy_summary:
+            self.log(f'输出方式：{result.copy_summary}')
+        if result.cancelled:
+            self.log(f'处理已取消：已完成 {result.processed} / {result.plan.total} 个文件')
+        metrics_lines = result.metrics.summary_lines() if result.metrics else []
+        if result.report_path:
+            metrics_lines.append(f'运行报告：{result.report_path}')
+        self.log_batch(metrics_lines)
+        if result.completed:
+            self.show_message('完成', '\n\n'.join([result.summary()] + ['\n'.join(metrics_lines)]))
 
     def clear_all_items(self):
         """清空所有项目"""
@@ -1135,9 +1105,8 @@ class ImageSortingApp(QMainWindow):
                 if not filename.endswith('.txt'):
                     filename += '.txt'
                     
-                # 将日志内容写入文件，使用正确的编码和换行符
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(self.log_text.toPlainText())
+                # 从磁盘上的完整日志流式复制
+                self.log_store.export(filename)
                 
                 self.show_message("成功", "日志导出成功！")
                 
@@ -1159,8 +1128,15 @@ class ImageSortingApp(QMainWindow):
 
     def closeEvent(self, event):
         """程序关闭时的事件处理"""
+        # 等待后台处理在当前文件后停止
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        
         # 保存当前证件类型列表
         self.save_card_types()
+        self.config.flush()
+        self.log_store.close()
         event.accept()
 
     def filter_card_types(self, text):
@@ -1192,7 +1168,13 @@ class ImageSortingApp(QMainWindow):
    - 图片 {n}    →  图片 1.png, 图片 2.png
    - 图片-{n}    →  图片-1.png, 图片-2.png
    - IMG_{n}     →  IMG_1.png, IMG_2.png
-   - {n}号照片   →  1号照片.png, 2号照片.png"""
+   - {n}号照片   →  1号照片.png, 2号照片.png
+4. 其他占位符：
+   - {n:04}      补零的序号，如 IMG_{n:04} → IMG_0001.png
+   - {date}      8 位日期，{time} 6 位时间
+   - {名称}      任意文本（如扫描站编号），{名称:d} 数字
+   - {date}_{station}_{n}  →  20240101_A3_1.png
+   按占位符的先后顺序排序（先日期、再扫描站、再序号）"""
         
         msg = QMessageBox(self)
         msg.setWindowTitle('命名格式说明')
@@ -1243,11 +1225,9 @@ class ImageSortingApp(QMainWindow):
     def load_naming_formats(self):
         """从文件加载命名格式列表"""
         try:
-            if os.path.exists(self.name_format_file):
-                with open(self.name_format_file, 'r', encoding='utf-8') as f:
-                    formats = [line.strip() for line in f.readlines() if line.strip()]
-                self.naming_list.clear()
-                self.naming_list.addItems(formats)
+            formats = self.config.get('naming_formats')
+            self.naming_list.clear()
+            self.naming_list.addItems(formats)
         except Exception as e:
             print(f"加载命名格式失败: {e}")
 
@@ -1256,20 +1236,16 @@ class ImageSortingApp(QMainWindow):
         try:
             formats = [self.naming_list.item(i).text() 
                       for i in range(self.naming_list.count())]
-            # 使用 Windows 风格换行，避免在记事本显示空行
-            with open(self.name_format_file, 'w', encoding='utf-8') as f:
-                f.write('\r\n'.join(formats))
+            self.config.set('naming_formats', formats)
         except Exception as e:
             print(f"保存命名格式失败: {e}")
 
     def get_default_naming_format(self):
         """读取默认命名格式（若失败则返回内置默认）"""
         try:
-            if os.path.exists(self.default_name_format_file):
-                with open(self.default_name_format_file, 'r', encoding='utf-8') as f:
-                    fmt = f.read().strip()
-                    if fmt and '{n}' in fmt:
-                        return fmt
+            fmt = self.config.get('default_naming_format')
+            if fmt and card_engine.naming_format_error(fmt) is None:
+                return fmt
         except Exception as e:
             print(f"读取默认命名格式失败: {e}")
         return "图片 {n}"
@@ -1287,8 +1263,7 @@ class ImageSortingApp(QMainWindow):
     def save_default_naming_format(self, fmt):
         """保存默认命名格式到文件"""
         try:
-            with open(self.default_name_format_file, 'w', encoding='utf-8') as f:
-                f.write(fmt)
+            self.config.set('default_naming_format', fmt)
             print(f"默认命名格式已保存: {fmt}")
         except Exception as e:
             print(f"保存默认命名格式失败: {e}")
@@ -1303,8 +1278,9 @@ class ImageSortingApp(QMainWindow):
         if not fmt:
             self.show_message('警告', '请输入或选择一个命名格式')
             return
-        if '{n}' not in fmt:
-            self.show_message('警告', '默认命名格式必须包含 {n}')
+        error = card_engine.naming_format_error(fmt)
+        if error:
+            self.show_message('警告', f'默认命名格式无效：{error}')
             return
         self.save_default_naming_format(fmt)
         self.show_message('成功', f'已设置默认命名格式为：\n{fmt}')
@@ -1382,13 +1358,11 @@ class ImageSortingApp(QMainWindow):
     def load_dest_path(self):
         """加载保存的目标文件夹路径"""
         try:
-            if os.path.exists(self.dest_path_file):
-                with open(self.dest_path_file, 'r', encoding='utf-8') as f:
-                    path = f.read().strip()
-                    if path and os.path.exists(path):
-                        # 确保加载的路径使用Windows风格
-                        normalized_path = self.normalize_path(path)
-                        self.dest_edit.setText(normalized_path)
+            path = self.config.get('dest_path')
+            if path and os.path.exists(path):
+                # 确保加载的路径使用Windows风格
+                normalized_path = self.normalize_path(path)
+                self.dest_edit.setText(normalized_path)
         except Exception as e:
             print(f"加载目标路径失败: {e}")
 
@@ -1401,10 +1375,7 @@ class ImageSortingApp(QMainWindow):
         try:
             # 统一路径格式为Windows格式
             normalized_path = self.normalize_path(path.strip())
-            
-            with open(self.dest_path_file, 'w', encoding='utf-8') as f:
-                f.write(normalized_path)
-            print(f"目标路径已保存到文件: {normalized_path}")
+            self.config.set('dest_path', normalized_path)
         except Exception as e:
             print(f"保存目标路径失败: {e}")
 
@@ -1417,18 +1388,8 @@ class ImageSortingApp(QMainWindow):
             self.save_dest_path(normalized_path)
 
     def on_dest_path_text_changed(self, text):
-        """当目标文件夹输入框文本改变时调用"""
-        # 延迟保存，避免频繁写入文件
-        if hasattr(self, '_save_timer'):
-            self._save_timer.stop()
-        else:
-            from PyQt5.QtCore import QTimer
-            self._save_timer = QTimer()
-            self._save_timer.setSingleShot(True)
-            self._save_timer.timeout.connect(lambda: self.save_dest_path(text))
-        
-        # 1秒后保存路径，确保使用Windows风格
-        self._save_timer.start(1000)
+        """当目标文件夹输入框文本改变时调用（配置存储会合并连续输入，延迟写盘）"""
+        self.save_dest_path(text)
 
     def select_dest_folder(self):
         """选择目标文件夹并保存路径"""
@@ -1447,9 +1408,10 @@ class ImageSortingApp(QMainWindow):
             self.show_message('警告', '请输入命名格式')
             return
             
-        # 检查格式是否包含 {n}
-        if '{n}' not in text:
-            self.show_message('警告', '命名格式必须包含 {n}')
+        # 编译检查：必须包含 {n}，占位符和类型有效，且能匹配按该格式命名的文件
+        error = card_engine.naming_format_error(text)
+        if error:
+            self.show_message('警告', f'无效的命名格式：{error}')
             return
             
         # 检查格式是否已存在
@@ -1458,19 +1420,9 @@ class ImageSortingApp(QMainWindow):
                 self.show_message('警告', '该命名格式已存在')
                 return
                 
-        # 检查格式是否合法
-        try:
-            # 尝试替换 {n} 为数字，验证格式是否有效
-            test_name = text.replace('{n}', '1')
-            if not test_name:
-                raise ValueError('无效的命名格式')
-                
-            # 添加到列表
-            self.naming_list.addItem(text)
-            self.save_naming_formats()
-            
-        except Exception as e:
-            self.show_message('警告', f'无效的命名格式：{str(e)}')
+        # 添加到列表
+        self.naming_list.addItem(text)
+        self.save_naming_formats()
 
     def delete_naming_format(self):
         """删除选中的命名格式"""
@@ -1498,139 +1450,117 @@ class ImageSortingApp(QMainWindow):
             else:
                 item.setHidden(True)
 
-    def is_valid_id_number(self, id_num):
-        """验证身份证号格式"""
-        # 身份证号必须是18位
-        if len(id_num) != 18:
-            return False
-        
-        # 前17位必须是数字
-        if not id_num[:17].isdigit():
-            return False
+    def get_name_id_pairs(self):
+        """获取姓名+身份证号列表：优先使用导入的名单，否则读取输入框"""
+        if self.imported_roster is not None:
+            return self.imported_roster.entries
+        return card_engine.split_roster_text(self.id_numbers_edit.toPlainText())
+
+    def import_roster_file(self):
+        """从 txt/CSV/TSV 文件导入名单"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, '导入名单', '', '名单文件 (*.txt *.csv *.tsv);;All Files (*)')
+        if not path:
+            return
         
-        # 最后一位可以是数字或X（大写或小写）
-        last_char = id_num[17].upper()
-        if not (last_char.isdigit() or last_char == 'X'):
-            return False
+        # CSV/TSV：表头中有“姓名”“身份证号”时直接使用，否则让用户选择列
+        options = {}
+        header = card_roster.read_header(path)
+        if '姓名' in header and '身份证号' in header:
+            options = {'name_column': '姓名', 'id_column': '身份证号'}
+        elif len(header) > 1:
+            choices = [f'第{i + 1}列：{name}' for i, name in enumerate(header)]
+            choice, ok = QInputDialog.getItem(self, '选择列', '姓名+身份证号 所在列：', choices, 0, False)
+            if not ok:
+                return
+            options = {'column': choices.index(choice) + 1}
         
-        # 验证出生日期部分（第7-14位）
+        QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
-            year = int(id_num[6:10])
-            month = int(id_num[10:12])
-            day = int(id_num[12:14])
-            
-            # 检查年份范围（1900-2100）
-            if year < 1900 or year > 2100:
-                return False
-            
-            # 检查月份范围
-            if month < 1 or month > 12:
-                return False
-            
-            # 检查日期范围
-            if day < 1 or day > 31:
-                return False
-            
-            # 简单的日期有效性检查
-            if month in [4, 6, 9, 11] and day > 30:
-                return False
-            if month == 2:
-                # 闰年检查
-                is_leap = (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)
-                if (is_leap and day > 29) or (not is_leap and day > 28):
-                    return False
-                    
-        except ValueError:
-            return False
+            result = card_roster.import_roster(path, **options)
+        except card_roster.RosterError as e:
+            QApplication.restoreOverrideCursor()
+            self.show_message('警告', str(e))
+            return
+        QApplication.restoreOverrideCursor()
         
-        return True
+        if result.error_count:
+            self.log(f'名单文件 {path} 有 {result.error_count} 行不正确：\n{result.error_report(limit=100)}')
+            self.show_message('警告', f'名单文件有 {result.error_count} 行不正确，详见日志\n{result.error_report(limit=3)}')
+            return
+        if not result.entries:
+            self.show_message('警告', '名单文件中没有姓名+身份证号')
+            return
+        
+        self.id_numbers_edit.clear()
+        self.imported_roster = result
+        self.id_numbers_edit.setPlaceholderText(
+            f'已从文件导入 {len(result.entries)} 人：\n{path}\n（在此输入内容将取消导入，改用手工输入）')
+        self.log(f'已导入名单 {path}：{len(result.entries)} 人')
+
+    def on_id_numbers_text_changed(self):
+        """手工输入名单时取消文件导入"""
+        if self.imported_roster is not None and self.id_numbers_edit.document().characterCount() > 1:
+            self.imported_roster = None
+            self.id_numbers_edit.setPlaceholderText(self.id_numbers_placeholder)
+            self.log('已取消导入的名单，改用输入框中的内容')
+
+    def is_valid_id_number(self, id_num):
+        """验证身份证号格式"""
+        return card_engine.is_valid_id_number(id_num)
 
     def normalize_id_number(self, id_num):
         """标准化身份证号，将小写x转换为大写X"""
-        if len(id_num) == 18 and id_num[17].lower() == 'x':
-            return id_num[:17] + 'X'
-        return id_num
+        return card_engine.normalize_id_number(id_num)
 
     def is_valid_name_id_format(self, line):
-        """验证姓名+身份证号格式
-        输入格式：姓名+身份证号
-        例如：李四+110101199001011234
-        返回: True 如果格式正确，False 如果格式不正确
-        """
-        line = line.strip()
-        if not line:
-            return False
-        
-        # 检查是否包含+
-        if '+' not in line:
-            return False
-        
-        # 用+分割
-        parts = line.split('+', 1)
-        name = parts[0].strip()
-        id_num = parts[1].strip()
-        
-        # 检查姓名和身份证号是否为空
-        if not name or not id_num:
-            return False
-        
-        # 验证身份证号格式
-        if not self.is_valid_id_number(id_num):
-            return False
-        
-        return True
+        """验证姓名+身份证号格式（姓名+身份证号）"""
+        return card_engine.is_valid_name_id_format(line)
+
+    def get_selected_naming_format(self):
+        """获取选中的命名格式，如果没有选中则使用输入框中的格式"""
+        if self.naming_list.selectedItems():
+            return self.naming_list.selectedItems()[0].text()
+        selected_format = self.naming_format_edit.text()
+        if not selected_format or card_engine.naming_format_error(selected_format):
+            selected_format = self.get_default_naming_format()  # 使用默认格式
+        return selected_format
 
     def get_sorted_files(self, src_dir):
         """获取并排序文件列表"""
         try:
-            # 获取选中的命名格式，如果没有选中则使用输入框中的格式
-            selected_format = None
-            if self.naming_list.selectedItems():
-                selected_format = self.naming_list.selectedItems()[0].text()
-            else:
-                selected_format = self.naming_format_edit.text()
-                if not selected_format or '{n}' not in selected_format:
-                    selected_format = self.get_default_naming_format()  # 使用默认格式
-            
-            # 使用生成器获取文件列表
-            def get_image_files():
-                extensions = (
-                    '.jpg', '.jpeg', '.png', '.bmp', '.gif',
-                    '.tiff', '.tif', '.webp', '.heic', '.heif',
-                    '.raw', '.cr2', '.nef', '.arw',
-                    '.ico', '.jfif', '.pjpeg', '.pjp'
-                )
-                
-                # 使用选中的格式来匹配文件
-                file_pattern = re.escape(selected_format).replace(r'\{n\}', r'(\d+)')
-                
-                for filename in os.listdir(src_dir):
-                    if filename.lower().endswith(tuple(ext.lower() for ext in extensions)):
-                        base_name = os.path.splitext(filename)[0]
-                        match = re.match(file_pattern, base_name)
-                        if match:
-                            # 确保生成的路径使用Windows风格
-                            file_path = os.path.join(src_dir, filename)
-                            yield self.normalize_path(file_path)
-            
-            # 获取并排序文件列表
-            files = list(get_image_files())
-            if files:
-                files.sort(key=lambda x: int(re.search(
-                    re.escape(selected_format).replace(r'\{n\}', r'(\d+)'),
-                    os.path.splitext(os.path.basename(x))[0]
-                ).group(1)))
-            
-            return files
-            
+            return card_engine.get_sorted_files(src_dir, self.get_selected_naming_format(),
+                                                self.source_index,
+                                                self.recursive_check.isChecked())
         except Exception as e:
             self.log(f'处理文件列表时出错：{str(e)}')
             return []
 
+def print_startup_profile():
+    """打印启动各阶段耗时（从导入本文件开始计时，不含 Python 解释器自身的启动）"""
+    print('启动耗时：')
+    previous = STARTUP_STARTED
+    for name, moment in startup_marks:
+        print(f'  {name}：{(moment - previous) * 1000:.1f} ms')
+        previous = moment
+    print(f'  合计：{(previous - STARTUP_STARTED) * 1000:.1f} ms')
+
+
 def main():
-    app = QApplication(sys.argv)
+    profile_startup = '--profile-startup' in sys.argv
+    # 启动完成后立即退出，供打包脚本测量启动时间
+    exit_after_startup = '--exit-after-startup' in sys.argv
+    argv = [arg for arg in sys.argv if arg not in ('--profile-startup', '--exit-after-startup')]
+    app = QApplication(argv)
+    mark_startup('创建 QApplication')
     window = ImageSortingApp()
     window.show()
+    mark_startup('显示窗口')
+    # 以下定时器在 finish_startup 之后执行（同为 0 毫秒的定时器按创建顺序触发）
+    if profile_startup:
+        QTimer.singleShot(0, print_startup_profile)
+    if exit_after_startup:
+        QTimer.singleShot(0, app.quit)
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
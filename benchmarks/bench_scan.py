@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+源目录扫描微基准：对比旧版 get_sorted_files（listdir + 逐个 re.match + 排序时重复正则）
+与 card_engine.get_sorted_files（单次 scandir + 预编译正则 + 整数排序）
+
+用法：python benchmarks/bench_scan.py --files 100000
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import card_engine  # noqa: E402
+
+
+def legacy_get_sorted_files(src_dir, selected_format):
+    """旧版实现（仅去掉界面依赖），作为对照组"""
+    def get_image_files():
+        extensions = (
+            '.jpg', '.jpeg', '.png', '.bmp', '.gif',
+            '.tiff', '.tif', '.webp', '.heic', '.heif',
+            '.raw', '.cr2', '.nef', '.arw',
+            '.ico', '.jfif', '.pjpeg', '.pjp'
+        )
+        file_pattern = re.escape(selected_format).replace(r'\{n\}', r'(\d+)')
+        for filename in os.listdir(src_dir):
+            if filename.lower().endswith(tuple(ext.lower() for ext in extensions)):
+                base_name = os.path.splitext(filename)[0]
+                match = re.match(file_pattern, base_name)
+                if match:
+                    yield card_engine.normalize_path(os.path.join(src_dir, filename))
+
+    files = list(get_image_files())
+    if files:
+        files.sort(key=lambda x: int(re.search(
+            re.escape(selected_format).replace(r'\{n\}', r'(\d+)'),
+            os.path.splitext(os.path.basename(x))[0]
+        ).group(1)))
+    return files
+
+
+def make_source_dir(root, count, naming_format):
+    """生成 count 个空图片文件，另加约 5% 不匹配的干扰文件"""
+    for i in range(1, count + 1):
+        name = naming_format.replace('{n}', str(i))
+        open(os.path.join(root, name + '.jpg'), 'wb').close()
+    for i in range(count // 20):
+        open(os.path.join(root, f'note_{i}.txt'), 'wb').close()
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='源目录扫描微基准')
+    parser.add_argument('--files', type=int, default=100000, help='匹配的图片数量')
+    parser.add_argument('--naming', default=card_engine.DEFAULT_NAMING_FORMAT, help='命名格式')
+    parser.add_argument('--repeat', type=int, default=3, help='每种实现运行次数，取最快一次')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='card_bench_') as root:
+        print(f'生成 {args.files} 个文件 ...')
+        make_source_dir(root, args.files, args.naming)
+
+        legacy_time, legacy_files = best_of(
+            lambda: legacy_get_sorted_files(root, args.naming), args.repeat)
+        new_time, new_files = best_of(
+            lambda: card_engine.get_sorted_files(root, args.naming), args.repeat)
+
+    if legacy_files != new_files:
+        print('❌ 两种实现结果不一致')
+        return 1
+
+    print(f'旧版 listdir + re.match : {legacy_time:.3f}s')
+    print(f'scandir + 预编译正则     : {new_time:.3f}s')
+    print(f'加速比                   : {legacy_time / new_time:.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+完整流程基准：生成模拟扫描仪输出的源文件夹（N 人 × M 种证件类型），
+分别测量扫描（get_sorted_files）、名单校验（逐行 is_valid_name_id_format 与批量校验）
+以及准备和复制阶段，结果写入 JSON 文件，便于在不同版本、不同存储之间对比
+
+用法：
+  python benchmarks/bench_suite.py --scales 100 1000 10000 --size 200K
+  python benchmarks/bench_suite.py --scales 1000000 --size 0 --copy-limit 100000 --root D:\\bench
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import card_engine  # noqa: E402
+import card_roster  # noqa: E402
+from bench_validate import make_id_number  # noqa: E402
+
+# 生成的文件最小为 JPEG 文件头、序号和结束标记的长度
+MIN_FILE_SIZE = 16
+SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+
+
+def parse_size(text):
+    """解析 200K、1.5M 这样的大小"""
+    text = text.strip().upper()
+    unit = text[-1] if text and text[-1] in SIZE_UNITS else ''
+    number = text[:-1] if unit else text
+    return int(float(number) * SIZE_UNITS[unit])
+
+
+def parse_size_range(text):
+    """解析 200K 或 100K-2M，返回 (最小, 最大)"""
+    low, _, high = text.partition('-')
+    low = parse_size(low)
+    return low, parse_size(high) if high else low
+
+
+def make_tree(root, persons, card_types, naming_format, size_range, seed):
+    """生成源文件夹和名单，返回 (源文件夹, 名单, 总字节数)
+
+    每个文件内容不同（JPEG 文件头的注释段中为序号，末尾为结束标记，能通过预检的格式检查），
+    大小在 size_range 内均匀分布。
+    """
+    rng = random.Random(seed)
+    template = card_engine.compile_naming_format(naming_format)
+    src_dir = os.path.join(root, 'src')
+    os.makedirs(src_dir)
+    low, high = size_range
+    block = rng.randbytes(high) if high else b''
+    total_bytes = 0
+    for n in range(1, persons * card_types + 1):
+        size = max(rng.randint(low, high) if high > low else low, MIN_FILE_SIZE)
+        content = (b'\xff\xd8\xff\xfe\x00\x0a' + n.to_bytes(8, 'little')
+                   + block[14:size - 2])[:size - 2] + b'\xff\xd9'
+        with open(os.path.join(src_dir, template.format(n=n) + '.jpg'), 'wb') as f:
+            f.write(content)
+        total_bytes += size
+    roster = [f'人员{i}+{make_id_number(rng)}' for i in range(persons)]
+    return src_dir, roster, total_bytes
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 6), result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_scale(scale, args, size_range):
+    persons = max(1, math.ceil(scale / args.card_types))
+    card_types = [f'证件{i + 1}' for i in range(args.card_types)]
+    result = {'scale': scale, 'persons': persons, 'card_types': args.card_types,
+              'files': persons * args.card_types}
+
+    root = tempfile.mkdtemp(prefix='card_bench_', dir=args.root)
+    try:
+        start = time.perf_counter()
+        src_dir, roster, total_bytes = make_tree(root, persons, args.card_types, args.naming,
+                                                 size_range, args.seed)
+        result['bytes'] = total_bytes
+        result['generate_s'] = round(time.perf_counter() - start, 3)
+
+        stages = result['stages'] = {}
+        stages['scan_s'], files = best_of(
+            lambda: card_engine.get_sorted_files(src_dir, args.naming), args.repeat)
+        stages['validate_loop_s'], _ = best_of(
+            lambda: [line for line in roster if not card_roster.is_valid_name_id_format(line)],
+            args.repeat)
+        stages['validate_batch_s'], failures = best_of(
+            lambda: card_roster.find_invalid_roster_lines(roster), args.repeat)
+        if len(files) != result['files'] or failures:
+            raise RuntimeError(f'生成的数据不正确：{len(files)} 个文件，{len(failures)} 行名单不合格')
+
+        if result['files'] > args.copy_limit:
+            stages['copy'] = None
+            return result
+
+        dst_dir = os.path.join(root, 'dst')
+        os.makedirs(dst_dir)
+        start = time.perf_counter()
+        plan = card_engine.prepare_batch(src_dir, dst_dir, card_types, roster, args.naming,
+                                         log=lambda message: None, copy_mode=args.copy_mode)
+        stages['prepare_s'] = round(time.perf_counter() - start, 6)
+        batch = card_engine.execute_batch(plan, log=lambda message: None, workers=args.workers,
+                                          copy_mode=args.copy_mode, report=False)
+        if not batch.completed:
+            raise RuntimeError(f'复制未完成：{batch.processed} / {plan.total}')
+        metrics = batch.metrics.to_dict()
+        stages['copy'] = {key: metrics[key] for key in
+                          ('phases_s', 'files_per_s', 'mb_per_s', 'copy_latency_s')}
+        stages['copy']['methods'] = batch.copy_summary
+        return result
+    finally:
+        if args.keep:
+            print(f'  保留测试数据：{root}')
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='照片分类工具完整流程基准')
+    parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='每组测试的文件数（100 ~ 1000000）')
+    parser.add_argument('--card-types', type=int, default=4, help='每人的证件类型数')
+    parser.add_argument('--size', default='64K',
+                        help=f'单个文件大小，如 0、200K、2M，或范围 100K-2M（至少 {MIN_FILE_SIZE} 字节）')
+    parser.add_argument('--naming', default=card_engine.DEFAULT_NAMING_FORMAT,
+                        help='命名格式，如 "图片 {n}"、"IMG_{n:04}" 或 "{date}_{station}_{n}"')
+    parser.add_argument('--copy-mode', default='copy', choices=list(card_engine.COPY_MODES),
+                        help='复制阶段使用的输出方式（默认 copy，便于不同机器对比）')
+    parser.add_argument('--workers', type=int, default=card_engine.DEFAULT_COPY_WORKERS,
+                        help='并发复制线程数')
+    parser.add_argument('--copy-limit', type=int, default=100000,
+                        help='文件数超过该值时只测扫描和校验，不测复制')
+    parser.add_argument('--repeat', type=int, default=3, help='扫描和校验运行次数，取最快一次')
+    parser.add_argument('--root', help='生成测试数据的目录（默认系统临时目录，测存储时指向目标磁盘）')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子，相同参数生成相同数据')
+    parser.add_argument('--keep', action='store_true', help='保留生成的测试数据')
+    parser.add_argument('-o', '--output', default='bench_results.json', help='结果文件（JSON）')
+    args = parser.parse_args(argv)
+
+    naming_error = card_engine.naming_format_error(args.naming)
+    if naming_error:
+        print(naming_error, file=sys.stderr)
+        return 1
+    size_range = parse_size_range(args.size)
+
+    report = {
+        'meta': {
+            'started': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'numpy': card_roster.load_numpy().__version__ if card_roster.load_numpy() else None,
+            'args': vars(args),
+        },
+        'results': [],
+    }
+
+    for scale in args.scales:
+        print(f'规模 {scale} ...')
+        result = run_scale(scale, args, size_range)
+        report['results'].append(result)
+        stages = result['stages']
+        line = (f'  扫描 {stages["scan_s"]:.3f}s，逐行校验 {stages["validate_loop_s"]:.3f}s，'
+                f'批量校验 {stages["validate_batch_s"]:.3f}s')
+        if stages['copy']:
+            line += (f'，准备 {stages["prepare_s"]:.3f}s，复制 {stages["copy"]["files_per_s"]:.0f} 个/秒'
+                     f' {stages["copy"]["mb_per_s"]:.1f} MB/秒')
+        print(line)
+
+        # 每组完成后写一次，长时间运行中断时也能保留已完成的结果
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f'结果已写入 {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,8 +3,13 @@
 """
 照片分类工具 - EXE打包脚本（针对 Card Tools.py）
 使用 PyInstaller 将 Python 程序打包为独立 exe
+
+  python build_exe.py            单文件 exe（每次启动都要先解压到临时目录）
+  python build_exe.py --slim     精简目录版：只包含用到的 Qt 模块，去掉多余插件和翻译，启动更快
 """
 
+import argparse
+import json
 import os
 import sys
 import subprocess
@@ -12,6 +17,30 @@ import shutil
 import time
 
 
+APP_NAME = "照片分类工具"
+# 程序实际用到的 Qt 模块
+QT_MODULES = ["PyQt5.sip", "PyQt5.QtCore", "PyQt5.QtGui", "PyQt5.QtWidgets"]
+# 精简版排除的模块：PyQt5 中用不到的模块，以及用不到的标准库
+SLIM_EXCLUDES = [
+    "PyQt5.QtBluetooth", "PyQt5.QtDBus", "PyQt5.QtDesigner", "PyQt5.QtHelp",
+    "PyQt5.QtLocation", "PyQt5.QtMultimedia", "PyQt5.QtMultimediaWidgets",
+    "PyQt5.QtNetwork", "PyQt5.QtNfc", "PyQt5.QtOpenGL", "PyQt5.QtPositioning",
+    "PyQt5.QtPrintSupport", "PyQt5.QtQml", "PyQt5.QtQuick", "PyQt5.QtQuickWidgets",
+    "PyQt5.QtSensors", "PyQt5.QtSerialPort", "PyQt5.QtSql", "PyQt5.QtSvg",
+    "PyQt5.QtTest", "PyQt5.QtWebChannel", "PyQt5.QtWebEngineCore",
+    "PyQt5.QtWebEngineWidgets", "PyQt5.QtWebSockets", "PyQt5.QtWinExtras",
+    "PyQt5.QtXml", "PyQt5.QtXmlPatterns", "tkinter",
+]
+# 精简版保留的 Qt 插件目录：窗口系统、界面风格、图片格式；其余插件和 translations 全部删除
+SLIM_QT_PLUGINS = {"platforms", "styles", "imageformats"}
+# 测量启动时间的运行次数（第一次接近冷启动）及单次超时（秒）
+STARTUP_RUNS = 3
+STARTUP_TIMEOUT = 60
+# 启动时间比上次构建慢超过该比例时给出提示
+STARTUP_REGRESSION = 0.2
+BUILD_REPORT = os.path.join("dist", "build_report.json")
+
+
 def check_dependencies() -> bool:
     required = ["PyQt5", "pyinstaller"]
     missing = []
@@ -29,7 +58,98 @@ def check_dependencies() -> bool:
     return True
 
 
-def build_exe() -> bool:
+def pyinstaller_command(main_script, icon_arg, slim) -> list:
+    cmd = [
+        "pyinstaller",
+        "--onedir" if slim else "--onefile",
+        "--windowed",
+        f"--name={APP_NAME}",
+        icon_arg,
+        "--add-data=data;data",
+    ]
+    cmd += [f"--hidden-import={name}" for name in QT_MODULES]
+    if slim:
+        cmd += [f"--exclude-module={name}" for name in SLIM_EXCLUDES]
+    else:
+        cmd.append("--collect-all=PyQt5")
+    cmd += ["--clean", "--noconfirm", main_script]
+    return cmd
+
+
+def prune_qt_files(bundle_dir) -> int:
+    """删除目录版中用不到的 Qt 插件和翻译文件，返回删除的字节数"""
+    removed = 0
+    for root, dirs, _ in os.walk(bundle_dir):
+        if os.path.basename(root) not in ("Qt5", "Qt"):
+            continue
+        targets = []
+        if "translations" in dirs:
+            targets.append(os.path.join(root, "translations"))
+        if "plugins" in dirs:
+            plugins_dir = os.path.join(root, "plugins")
+            targets += [os.path.join(plugins_dir, name) for name in os.listdir(plugins_dir)
+                        if name not in SLIM_QT_PLUGINS]
+        for path in targets:
+            removed += dir_size(path)[0]
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"  已删除 {os.path.relpath(path, bundle_dir)}")
+        dirs[:] = []
+    return removed
+
+
+def dir_size(path) -> tuple:
+    """返回 (总字节数, 文件数)"""
+    if os.path.isfile(path):
+        return os.path.getsize(path), 1
+    total = count = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+            count += 1
+    return total, count
+
+
+def measure_startup(exe_path, runs=STARTUP_RUNS) -> list:
+    """运行生成的程序直到首次绘制完成后退出，返回每次的耗时（秒）"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            subprocess.run([exe_path, "--exit-after-startup"], timeout=STARTUP_TIMEOUT, check=False)
+        except subprocess.TimeoutExpired:
+            print(f"❌ 程序 {STARTUP_TIMEOUT} 秒内没有退出，停止测量启动时间")
+            break
+        except OSError as e:
+            print(f"❌ 无法运行生成的程序：{e}")
+            break
+        times.append(round(time.perf_counter() - start, 3))
+    return times
+
+
+def write_build_report(report) -> None:
+    """按打包方式保存本次结果，并与上次同一方式的结果比较"""
+    reports = {}
+    try:
+        with open(BUILD_REPORT, "r", encoding="utf-8") as f:
+            reports = json.load(f)
+    except (OSError, ValueError):
+        pass
+    previous = reports.get(report["profile"])
+    if previous:
+        print(f"上次构建：{previous['bundle_bytes'] / 1024 / 1024:.1f} MB，"
+              f"启动 {previous.get('startup_s')} 秒")
+        if previous.get("startup_s") and report["startup_s"]:
+            before, after = min(previous["startup_s"]), min(report["startup_s"])
+            if after > before * (1 + STARTUP_REGRESSION):
+                print(f"⚠️ 启动时间从 {before:.2f}s 变为 {after:.2f}s，比上次慢 "
+                      f"{(after / before - 1) * 100:.0f}%")
+    reports[report["profile"]] = report
+    with open(BUILD_REPORT, "w", encoding="utf-8") as f:
+        json.dump(reports, f, ensure_ascii=False, indent=2)
+    print(f"✅ 构建结果已写入 {BUILD_REPORT}")
+
+
+def build_exe(slim=False, measure=True) -> bool:
     main_script = "Card Tools.py"
     if not os.path.exists(main_script):
         print(f"错误：找不到主程序文件 {main_script}")
@@ -39,67 +159,89 @@ def build_exe() -> bool:
     icon_path = os.path.join(assets_dir, "app.ico")
     icon_arg = f"--icon={icon_path}" if os.path.exists(icon_path) else "--icon=NONE"
 
-    cmd = [
-        "pyinstaller",
-        "--onefile",
-        "--windowed",
-        "--name=照片分类工具",
-        icon_arg,
-        "--add-data=data;data",
-        "--hidden-import=PyQt5.sip",
-        "--hidden-import=PyQt5.QtCore",
-        "--hidden-import=PyQt5.QtGui",
-        "--hidden-import=PyQt5.QtWidgets",
-        "--collect-all=PyQt5",
-        "--clean",
-        "--noconfirm",
-        main_script,
-    ]
+    cmd = pyinstaller_command(main_script, icon_arg, slim)
 
     print("执行命令:", " ".join(cmd))
     start = time.time()
     subprocess.run(cmd, check=True)
-    print(f"PyInstaller 完成，用时 {time.time()-start:.2f}s")
+    build_seconds = time.time() - start
+    print(f"PyInstaller 完成，用时 {build_seconds:.2f}s")
 
-    exe_path = os.path.join("dist", "照片分类工具.exe")
+    # 单文件版为 dist/照片分类工具.exe；目录版为 dist/照片分类工具/ 目录，程序在其中
+    bundle_dir = os.path.join("dist", APP_NAME) if slim else None
+    exe_path = os.path.join(bundle_dir or "dist", f"{APP_NAME}.exe")
     if not os.path.exists(exe_path):
         print("❌ 未找到生成的 exe")
         return False
 
-    # 复制 data 到 dist
+    if slim:
+        removed = prune_qt_files(bundle_dir)
+        print(f"✅ 已删除未使用的 Qt 插件和翻译，共 {removed / 1024 / 1024:.1f} MB")
+
+    bundle_bytes, bundle_files = dir_size(bundle_dir or exe_path)
+    print(f"打包结果：{bundle_bytes / 1024 / 1024:.1f} MB，{bundle_files} 个文件")
+
+    # 在复制 data 之前测量；测量时程序在 exe 旁创建的 data/（默认配置和日志）随后删除
+    run_data = os.path.join(bundle_dir or "dist", "data")
+    had_data = os.path.exists(run_data)
+    startup = measure_startup(exe_path) if measure else []
+    if not had_data and os.path.exists(run_data):
+        shutil.rmtree(run_data, ignore_errors=True)
+    if startup:
+        print(f"启动时间（首次绘制后退出）：{', '.join(f'{t:.2f}s' for t in startup)}")
+    write_build_report({
+        "profile": "slim" if slim else "onefile",
+        "built": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "build_s": round(build_seconds, 2),
+        "bundle_bytes": bundle_bytes,
+        "bundle_files": bundle_files,
+        "startup_s": startup,
+    })
+
+    # 复制 data 到程序所在目录（程序从 exe 所在目录读取 data/）
     if os.path.exists("data"):
-        dist_data = os.path.join("dist", "data")
+        dist_data = os.path.join(bundle_dir or "dist", "data")
         if os.path.exists(dist_data):
             shutil.rmtree(dist_data)
         shutil.copytree("data", dist_data)
-        print("✅ 已复制 data/ 到 dist/")
+        print(f"✅ 已复制 data/ 到 {os.path.dirname(dist_data)}/")
 
     # 写入简要说明
     readme_path = os.path.join("dist", "使用说明.txt")
     with open(readme_path, "w", encoding="utf-8") as f:
-        f.write("# 使用说明\n\n双击 照片分类工具.exe 运行。\n")
+        f.write(f"# 使用说明\n\n双击 {APP_NAME}.exe 运行。\n")
 
     # 生成精简发布目录
     release_dir = os.path.join("dist", "release")
     if os.path.exists(release_dir):
         shutil.rmtree(release_dir)
-    os.makedirs(release_dir, exist_ok=True)
-    shutil.copy2(exe_path, os.path.join(release_dir, os.path.basename(exe_path)))
-    if os.path.exists(os.path.join("dist", "data")):
-        shutil.copytree(os.path.join("dist", "data"), os.path.join(release_dir, "data"))
+    if slim:
+        # 目录版需要整个目录（含 _internal/ 和 data/）
+        shutil.copytree(bundle_dir, release_dir)
+    else:
+        os.makedirs(release_dir, exist_ok=True)
+        shutil.copy2(exe_path, os.path.join(release_dir, os.path.basename(exe_path)))
+        if os.path.exists(os.path.join("dist", "data")):
+            shutil.copytree(os.path.join("dist", "data"), os.path.join(release_dir, "data"))
     shutil.copy2(readme_path, os.path.join(release_dir, "使用说明.txt"))
     print("✅ 已创建 dist/release 发布目录")
     return True
 
 
 def main():
+    parser = argparse.ArgumentParser(description="打包 Card Tools.py 为 EXE")
+    parser.add_argument("--slim", action="store_true",
+                        help="生成精简目录版（只含 QtCore/QtGui/QtWidgets，不含多余插件和翻译），启动更快")
+    parser.add_argument("--no-measure", action="store_true", help="不运行生成的程序测量启动时间")
+    args = parser.parse_args()
+
     print("=" * 60)
-    print("打包 Card Tools.py 为 EXE")
+    print("打包 Card Tools.py 为 EXE" + ("（精简目录版）" if args.slim else ""))
     print("=" * 60)
     check_dependencies()
     ok = False
     try:
-        ok = build_exe()
+        ok = build_exe(slim=args.slim, measure=not args.no_measure)
     except subprocess.CalledProcessError as e:
         print("❌ PyInstaller 执行失败", e)
     except Exception as e:
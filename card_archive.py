@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 归档输出
+不在输出目录中逐人建目录、逐个写文件，而是把同样的目录结构顺序写入一个 ZIP（仅存储，
+JPEG 不再压缩）或 TAR 文件，也可以每人一个归档；NAS 上的目录和文件创建次数从每个文件一次
+降为每个归档一次，上传前也不用再手动打包
+"""
+
+import os
+import shutil
+import time
+from collections import OrderedDict
+
+from card_engine import BatchError, BatchResult, build_copy_tasks
+from card_metrics import RunMetrics
+
+
+ARCHIVE_FORMATS = OrderedDict([
+    ('zip', 'ZIP（不压缩）'),
+    ('tar', 'TAR'),
+])
+ARCHIVE_EXTENSIONS = {'zip': '.zip', 'tar': '.tar'}
+# 归档文件的写入缓冲区，以及每次从源文件读取的大小
+ARCHIVE_BUFFER_SIZE = 4 * 1024 * 1024
+# ZIP 不能表示 1980 年之前的时间
+_ZIP_MIN_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+class ArchiveWriter:
+    """顺序写入一个 ZIP（仅存储）或 TAR 归档
+
+    先写入 <路径>.part，close() 写完目录后改名为最终文件名；abort() 删除未完成的文件。
+    """
+
+    def __init__(self, path, archive_format):
+        # zipfile/tarfile 只在写入归档时导入，界面启动时不必加载
+        import tarfile
+        import zipfile
+        self.path = path
+        self.archive_format = archive_format
+        self._part_path = path + '.part'
+        self._file = open(self._part_path, 'wb', buffering=ARCHIVE_BUFFER_SIZE)
+        try:
+            if archive_format == 'zip':
+                self._archive = zipfile.ZipFile(self._file, 'w', zipfile.ZIP_STORED,
+                                                allowZip64=True)
+            else:
+                self._archive = tarfile.open(fileobj=self._file, mode='w',
+                                             format=tarfile.PAX_FORMAT,
+                                             copybufsize=ARCHIVE_BUFFER_SIZE)
+        except BaseException:
+            self._file.close()
+            os.remove(self._part_path)
+            raise
+
+    def add(self, src_file, arcname):
+        """写入一个源文件，返回字节数
+
+        源文件打开失败时抛出 OSError，归档不受影响；写入过程中出错时归档已不完整，抛出 BatchError。
+        """
+        import tarfile
+        import zipfile
+        with open(src_file, 'rb') as src:
+            st = os.fstat(src.fileno())
+            try:
+                if self.archive_format == 'zip':
+                    info = zipfile.ZipInfo(arcname, max(time.localtime(st.st_mtime)[:6],
+                                                        _ZIP_MIN_DATE))
+                    info.compress_type = zipfile.ZIP_STORED
+                    info.external_attr = 0o644 << 16
+                    # 预先给出大小，超过 4 GB 时自动使用 ZIP64
+                    info.file_size = st.st_size
+                    with self._archive.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst, ARCHIVE_BUFFER_SIZE)
+                else:
+                    info = tarfile.TarInfo(arcname)
+                    info.size = st.st_size
+                    info.mtime = st.st_mtime
+                    info.mode = 0o644
+                    self._archive.addfile(info, src)
+            except (OSError, ValueError) as e:
+                raise BatchError(f'写入归档 {self.path} 时出错，归档已不完整：{e}') from e
+        return st.st_size
+
+    def close(self):
+        self._archive.close()
+        self._file.close()
+        os.replace(self._part_path, self.path)
+
+    def abort(self):
+        try:
+            self._archive.close()
+        except (OSError, ValueError):
+            pass
+        self._file.close()
+        try:
+            os.remove(self._part_path)
+        except OSError:
+            pass
+
+
+def archive_batch(plan, archive_format='zip', per_person=False, log=print, progress=None,
+                  is_cancelled=None, report=True):
+    """把复制清单中的文件顺序写入归档，返回 card_engine.BatchResult
+
+    per_person 为 False 时在输出目录中写入一个归档，内含 姓名+身份证号/文件名；
+    为 True 时每人一个归档（姓名+身份证号.zip），内含该人的文件。
+    取消时已写入的内容仍会完成归档；源文件无法读取时记录日志并跳过该文件。
+    """
+    metrics = plan.metrics if plan.metrics is not None else RunMetrics()
+    tasks = plan.tasks if plan.tasks is not None else build_copy_tasks(plan)
+    extension = ARCHIVE_EXTENSIONS[archive_format]
+    os.makedirs(plan.output_dir, exist_ok=True)
+
+    processed_count = 0
+    cancelled = False
+    archive_paths = []
+    writer = None
+    current_pair = None
+
+    def finish_archive():
+        nonlocal writer
+        start = time.perf_counter()
+        writer.close()
+        archive_paths.append(writer.path)
+        writer = None
+        metrics.add_time('完成归档', time.perf_counter() - start)
+
+    copy_start = time.perf_counter()
+    try:
+        for name_id_pair, src_file, _, new_name in tasks:
+            if is_cancelled and is_cancelled():
+                cancelled = True
+                break
+            if writer is None or (per_person and name_id_pair != current_pair):
+                if writer is not None:
+                    finish_archive()
+                name = name_id_pair if per_person else os.path.basename(plan.output_dir)
+                try:
+                    writer = ArchiveWriter(os.path.join(plan.output_dir, name + extension),
+                                           archive_format)
+                except OSError as e:
+                    raise BatchError(f'创建归档 {name + extension} 出错：{e}') from e
+                current_pair = name_id_pair
+
+            arcname = new_name if per_person else f'{name_id_pair}/{new_name}'
+            start = time.perf_counter()
+            try:
+                size = writer.add(src_file, arcname)
+            except OSError as e:
+                metrics.failed += 1
+                log(f'处理文件出错 {src_file}: {str(e)}')
+                continue
+            metrics.record_copy(src_file, size, time.perf_counter() - start)
+            log(f'已写入 {os.path.basename(writer.path)}: {os.path.basename(src_file)} -> {arcname}')
+            processed_count += 1
+            if progress:
+                progress(processed_count)
+        if writer is not None:
+            finish_archive()
+    finally:
+        if writer is not None:
+            writer.abort()
+        metrics.add_time('复制', time.perf_counter() - copy_start)
+
+    summary = f'{ARCHIVE_FORMATS[archive_format]}，{len(archive_paths)} 个归档'
+    report_path = None
+    if report:
+        try:
+            report_path = metrics.write_report(
+                plan.output_dir, src_dirs=plan.src_dirs, output_dir=plan.output_dir,
+                archive_format=archive_format, per_person=per_person,
+                archives=len(archive_paths), total=plan.total, processed=processed_count,
+                skipped=0, cancelled=cancelled)
+        except OSError as e:
+            log(f'写入运行报告出错: {str(e)}')
+    return BatchResult(plan, processed_count, cancelled, summary, 0, metrics, report_path)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 配置存储
+data/ 下的各配置文件（证件类型、命名格式、目标路径等）启动时读入内存，读取直接返回内存中的值；
+修改先写入内存，合并一段时间内的多次修改后再写盘（先写临时文件再替换，避免半截文件）；
+文件被外部修改（修改时间变化）时重新读取
+"""
+
+import os
+import threading
+import time
+
+from card_fileio import atomic_write
+
+
+# 修改后延迟写盘的秒数，期间的多次修改只写一次
+DEFAULT_DEBOUNCE = 0.5
+# 检查文件是否被外部修改的最短间隔（秒）
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class _Entry:
+    def __init__(self, path, default, lines, newline):
+        self.path = path
+        self.default = default
+        self.lines = lines
+        self.newline = newline
+        self.value = None
+        self.loaded = False
+        self.mtime_ns = None
+        self.checked = 0.0
+        self.dirty = False
+
+
+class ConfigStore:
+    """按名称读写 data 目录下的配置文件（只应在界面线程中调用 get/set）
+
+    register() 登记配置项：lines=True 时文件每行一项（忽略空行），值为列表，否则值为去掉首尾空白的字符串。
+    """
+
+    def __init__(self, data_dir, debounce=DEFAULT_DEBOUNCE):
+        self.data_dir = data_dir
+        self.debounce = debounce
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def register(self, key, filename, default, lines=False, newline='\n'):
+        self._entries[key] = _Entry(os.path.join(self.data_dir, filename), default, lines, newline)
+
+    def path(self, key):
+        return self._entries[key].path
+
+    def ensure_files(self):
+        """创建不存在的配置文件（写入默认值），返回新创建的文件列表"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        created = []
+        for entry in self._entries.values():
+            if not os.path.exists(entry.path):
+                with self._lock:
+                    self._write(entry, entry.default)
+                created.append(entry.path)
+        return created
+
+    def _parse(self, entry, text):
+        if entry.lines:
+            return [line.strip() for line in text.splitlines() if line.strip()]
+        return text.strip()
+
+    def _read(self, entry):
+        try:
+            st = os.stat(entry.path)
+            with open(entry.path, 'r', encoding='utf-8-sig') as f:
+                entry.value = self._parse(entry, f.read())
+            entry.mtime_ns = st.st_mtime_ns
+        except FileNotFoundError:
+            entry.value = entry.default
+            entry.mtime_ns = None
+        entry.loaded = True
+
+    def get(self, key):
+        """返回配置值；文件被外部修改且没有未写盘的修改时重新读取"""
+        entry = self._entries[key]
+        now = time.monotonic()
+        if not entry.loaded:
+            self._read(entry)
+            entry.checked = now
+        elif not entry.dirty and now - entry.checked >= RELOAD_CHECK_INTERVAL:
+            entry.checked = now
+            try:
+                mtime_ns = os.stat(entry.path).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns != entry.mtime_ns:
+                self._read(entry)
+        value = entry.value
+        return list(value) if entry.lines else value
+
+    def set(self, key, value):
+        """修改配置值，延迟 debounce 秒后写盘；值未变化时不写"""
+        entry = self._entries[key]
+        value = list(value) if entry.lines else value
+        with self._lock:
+            if entry.loaded and value == entry.value:
+                return
+            entry.value = value
+            entry.loaded = True
+            entry.dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _write(self, entry, value):
+        """调用方需持有锁"""
+        atomic_write(entry.path, entry.newline.join(value) if entry.lines else value)
+        entry.mtime_ns = os.stat(entry.path).st_mtime_ns
+
+    def flush(self):
+        """立即写入所有未写盘的修改"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            for entry in self._entries.values():
+                if not entry.dirty:
+                    continue
+                try:
+                    self._write(entry, entry.value)
+                    entry.dirty = False
+                except OSError as e:
+                    print(f'保存配置文件失败 {entry.path}: {e}')
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 输出文件写入方式
+支持普通复制、硬链接、写时复制克隆（reflink）、内核态复制（copy_file_range/sendfile）
+和边复制边计算校验值的校验复制，不支持时自动回退到普通复制
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import sys
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from card_hash import HASH_ALGORITHM
+
+
+# 写入方式及界面显示名称
+COPY_MODES = {
+    'auto': '自动',
+    'copy': '复制',
+    'hardlink': '硬链接',
+    'reflink': '克隆（reflink）',
+    'kernel': '内核复制',
+    'verify': '校验复制',
+}
+DEFAULT_COPY_MODE = 'auto'
+
+# Linux ioctl FICLONE = _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# 这些错误表示当前文件系统/设备组合不支持该方式，回退即可
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EPERM, errno.EACCES,
+    getattr(errno, 'EOPNOTSUPP', errno.EINVAL),
+    getattr(errno, 'ENOTSUP', errno.EINVAL),
+    getattr(errno, 'ENOSYS', errno.EINVAL),
+    getattr(errno, 'ENOTSOCK', errno.EINVAL),
+}
+# 只有 Linux 的 sendfile 可以写入普通文件；macOS/BSD 上输出必须是 socket（同 shutil._USE_CP_SENDFILE）
+_USE_SENDFILE = sys.platform.startswith('linux')
+
+_CHUNK_SIZE = 64 * 1024 * 1024
+# 校验复制的读写块大小
+_VERIFY_CHUNK_SIZE = 1024 * 1024
+
+
+class _Unsupported(Exception):
+    """当前方式不可用，需要回退"""
+
+
+class VerifyError(OSError):
+    """校验复制后目标文件与源文件不一致"""
+
+
+def _raise_if_unsupported(error):
+    if error.errno in _UNSUPPORTED_ERRNOS:
+        raise _Unsupported() from error
+    raise error
+
+
+def _reflink(src, dst):
+    """通过 FICLONE 创建写时复制副本（btrfs、XFS 等）"""
+    if fcntl is None:
+        raise _Unsupported()
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError as e:
+            _raise_if_unsupported(e)
+
+
+def _kernel_copy(src, dst):
+    """由内核完成数据搬运，不经过用户态缓冲区"""
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    sendfile = getattr(os, 'sendfile', None) if _USE_SENDFILE else None
+    if copy_file_range is None and sendfile is None:
+        raise _Unsupported()
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(infd).st_size
+        offset = 0
+        while offset < size:
+            count = min(_CHUNK_SIZE, size - offset)
+            try:
+                if copy_file_range is not None:
+                    sent = copy_file_range(infd, outfd, count, offset, offset)
+                else:
+                    sent = sendfile(outfd, infd, offset, count)
+            except OSError as e:
+                # 已写入部分数据时不能简单回退，直接报错
+                if offset:
+                    raise
+                if copy_file_range is not None and sendfile is not None \
+                        and e.errno in _UNSUPPORTED_ERRNOS:
+                    copy_file_range = None
+                    continue
+                _raise_if_unsupported(e)
+            if sent == 0:
+                break
+            offset += sent
+
+
+def _verified_copy(src, dst):
+    """读一次、写一次，同一遍中计算校验值；写完后核对目标文件大小，返回十六进制校验值"""
+    digest = hashlib.new(HASH_ALGORITHM)
+    buffer = bytearray(_VERIFY_CHUNK_SIZE)
+    view = memoryview(buffer)
+    written = 0
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        src_size = os.fstat(fsrc.fileno()).st_size
+        while True:
+            count = fsrc.readinto(buffer)
+            if not count:
+                break
+            chunk = view[:count]
+            digest.update(chunk)
+            fdst.write(chunk)
+            written += count
+        fdst.flush()
+        dst_size = os.fstat(fdst.fileno()).st_size
+    if written != src_size or dst_size != src_size:
+        raise VerifyError(errno.EIO, f'校验失败：源文件 {src_size} 字节，'
+                                     f'读取 {written} 字节，目标文件 {dst_size} 字节', dst)
+    shutil.copystat(src, dst)
+    return digest.hexdigest()
+
+
+def _hardlink(src, dst):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        _raise_if_unsupported(e)
+
+
+class Copier:
+    """按所选方式写入输出文件，可在多个线程中共享
+
+    auto：同一设备上优先克隆，其次内核复制，最后普通复制；
+    hardlink：仅在同一设备上建立硬链接（与源文件共用数据），否则复制；
+    reflink / kernel：尝试对应方式，不支持时回退为普通复制；
+    verify：用户态复制并同时计算校验值，使用 copy_verified() 取得校验值。
+    """
+
+    def __init__(self, mode=DEFAULT_COPY_MODE):
+        if mode not in COPY_MODES:
+            raise ValueError(f'不支持的输出方式：{mode}')
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._dir_devices = {}
+        # 已确认不支持的 (方式, 源设备, 目标设备)，避免对每个文件重复尝试
+        self._unsupported = set()
+        self.counts = {}
+
+    def _dir_device(self, path):
+        directory = os.path.dirname(path) or '.'
+        device = self._dir_devices.get(directory)
+        if device is None:
+            device = os.stat(directory).st_dev
+            self._dir_devices[directory] = device
+        return device
+
+    def _methods(self, same_device):
+        if self.mode == 'copy':
+            return ()
+        if self.mode == 'hardlink':
+            return ('hardlink',) if same_device else ()
+        if self.mode == 'reflink':
+            return ('reflink',) if same_device else ()
+        if self.mode == 'kernel':
+            return ('kernel',)
+        # auto
+        return ('reflink', 'kernel') if same_device else ('kernel',)
+
+    @property
+    def verify(self):
+        return self.mode == 'verify'
+
+    def copy_verified(self, src, dst):
+        """校验复制单个文件，返回十六进制校验值（见 card_hash.HASH_ALGORITHM）"""
+        digest = _verified_copy(src, dst)
+        with self._lock:
+            self.counts['verify'] = self.counts.get('verify', 0) + 1
+        return digest
+
+    def copy(self, src, dst):
+        """写入单个文件，返回实际使用的方式"""
+        if self.verify:
+            self.copy_verified(src, dst)
+            return 'verify'
+        method = 'copy'
+        if self.mode != 'copy':
+            devices = (os.stat(src).st_dev, self._dir_device(dst))
+            for candidate in self._methods(devices[0] == devices[1]):
+                if (candidate, devices) in self._unsupported:
+                    continue
+                try:
+                    if candidate == 'hardlink':
+                        _hardlink(src, dst)
+                    elif candidate == 'reflink':
+                        _reflink(src, dst)
+                        shutil.copystat(src, dst)
+                    else:
+                        _kernel_copy(src, dst)
+                        shutil.copystat(src, dst)
+                except _Unsupported:
+                    with self._lock:
+                        self._unsupported.add((candidate, devices))
+                    continue
+                method = candidate
+                break
+
+        if method == 'copy':
+            shutil.copy2(src, dst)
+
+        with self._lock:
+            self.counts[method] = self.counts.get(method, 0) + 1
+        return method
+
+    def summary(self):
+        """各方式实际使用次数，例如：克隆（reflink） 120，复制 3"""
+        return '，'.join(f'{COPY_MODES[name]} {count}'
+                        for name, count in sorted(self.counts.items()))
@@ -0,0 +1,1089 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 处理引擎（不依赖 PyQt5）
+提供扫描、校验、复制的完整流程及命令行入口，界面与夜间批处理共用同一套逻辑
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+
+from card_copy import Copier, COPY_MODES, DEFAULT_COPY_MODE
+from card_fileio import atomic_write
+from card_hash import (HashCache, hash_file, hash_sources, find_duplicates,
+                       format_duplicate_report, write_manifest)
+from card_metrics import RunMetrics
+from card_naming import compile_naming_format, naming_format_error
+from card_sniff import sniff_file, format_sniff_summary
+from card_journal import RunJournal, batch_fingerprint, find_unfinished_run
+from card_roster import (is_valid_id_number, normalize_id_number, is_valid_name_id_format,
+                         find_invalid_roster_lines, format_roster_failures,
+                         split_roster_text, import_roster, RosterError)
+
+
+# 支持的图片扩展名（小写）；扫描时只按扩展名筛选，预检时再用 card_sniff 按文件内容确认格式
+IMAGE_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.bmp', '.gif',
+    '.tiff', '.tif', '.webp', '.heic', '.heif',
+    '.raw', '.cr2', '.nef', '.arw',
+    '.ico', '.jfif', '.pjpeg', '.pjp'
+)
+_IMAGE_EXTENSION_SET = frozenset(IMAGE_EXTENSIONS)
+
+# 扫描到的源文件：排序键（命名格式中各字段值的元组，见 card_naming）、路径、大小（字节）、
+# 修改时间（纳秒）、所属源目录的下标（多个源目录时）
+SourceFile = namedtuple('SourceFile', 'seq path size mtime_ns root', defaults=(0,))
+
+DEFAULT_NAMING_FORMAT = "图片 {n}"
+OUTPUT_DIR_NAME = "输出目录"
+
+# 并发复制的默认线程数（网络存储上复制主要受延迟限制）
+DEFAULT_COPY_WORKERS = 4
+# 多个源目录或包含子目录时并发扫描的线程数
+DEFAULT_SCAN_WORKERS = 8
+# 界面输入框中分隔多个源目录的字符
+SOURCE_SEPARATOR = ';'
+
+# 文件名中不允许的字符（按 Windows 规则检查，输出目录也可能是共享盘）
+INVALID_FILENAME_CHARS = frozenset('<>:"/\\|?*') | frozenset(chr(i) for i in range(32))
+_RESERVED_FILENAMES = frozenset(
+    ['CON', 'PRN', 'AUX', 'NUL']
+    + [f'COM{i}' for i in range(1, 10)] + [f'LPT{i}' for i in range(1, 10)])
+# 预检报告中每类问题最多列出的条数
+PREFLIGHT_REPORT_LIMIT = 10
+
+
+class BatchError(Exception):
+    """处理前校验失败，消息可直接展示给用户"""
+
+
+def normalize_path(path):
+    """将路径统一为Windows格式（非Windows系统原样返回）"""
+    if not path:
+        return path
+
+    if os.name != 'nt':
+        return path
+
+    # 将正斜杠替换为反斜杠
+    normalized = path.replace('/', '\\')
+
+    # 确保路径以正确的驱动器格式开始
+    if normalized.startswith('\\'):
+        # 如果是网络路径，保持原样
+        pass
+    elif ':' not in normalized[:2]:
+        # 如果没有驱动器标识符，添加当前驱动器
+        current_drive = os.getcwd()[:2]  # 获取当前驱动器，如 "C:"
+        normalized = current_drive + '\\' + normalized.lstrip('\\')
+
+    return normalized
+
+
+def _scan_directory(directory, naming_format, with_stat=False, collect_dirs=False):
+    """单次 scandir 扫描一个目录，返回 (未排序的 SourceFile 列表, 子目录列表)
+
+    collect_dirs=False 时不收集子目录；不进入目录的符号链接，避免循环。
+    """
+    sort_key = compile_naming_format(naming_format).sort_key
+    extensions = _IMAGE_EXTENSION_SET
+    splitext = os.path.splitext
+
+    matched = []
+    subdirs = []
+    # 路径只规范化一次，entry.path 直接沿用该格式
+    with os.scandir(normalize_path(directory)) as entries:
+        for entry in entries:
+            base_name, ext = splitext(entry.name)
+            if ext.lower() not in extensions:
+                if collect_dirs and entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                continue
+            key = sort_key(base_name)
+            if key is not None and entry.is_file():
+                if with_stat:
+                    st = entry.stat()
+                    matched.append(SourceFile(key, entry.path, st.st_size, st.st_mtime_ns))
+                else:
+                    matched.append(SourceFile(key, entry.path, None, None))
+            elif collect_dirs and entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+    return matched, subdirs
+
+
+def scan_source_dir(src_dir, naming_format, with_stat=False):
+    """单次 scandir 扫描源目录，返回未排序的 SourceFile 列表
+
+    with_stat=False 时不读取文件属性，size 和 mtime_ns 为 None。
+    """
+    return _scan_directory(src_dir, naming_format, with_stat)[0]
+
+
+def split_source_dirs(src_dirs):
+    """源目录列表：接受列表或以 SOURCE_SEPARATOR 分隔的字符串，去除空项和重复项"""
+    if isinstance(src_dirs, str):
+        src_dirs = src_dirs.split(SOURCE_SEPARATOR)
+    result = []
+    for src_dir in src_dirs:
+        src_dir = normalize_path(src_dir.strip())
+        if src_dir and src_dir not in result:
+            result.append(src_dir)
+    return result
+
+
+def scan_source_roots(src_dirs, naming_format, recursive=False, workers=DEFAULT_SCAN_WORKERS):
+    """并发扫描多个源目录（recursive 为 True 时包括所有子目录）
+
+    每个目录（含子目录）作为一个扫描任务提交到线程池，扫描到的子目录继续提交；
+    结果按源目录的顺序合并，同一源目录内按 (相对子目录, 排序键, 路径) 排序，与扫描完成的先后无关：
+    源目录本身的文件在前，各子目录按名称依次排列（例如按日期建立、各自从 1 编号的子目录）。
+    """
+    per_root = [[] for _ in src_dirs]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_directory, src_dir, naming_format, False, recursive): i
+                   for i, src_dir in enumerate(src_dirs)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                matched, subdirs = future.result()
+                per_root[i].extend(matched)
+                for subdir in subdirs:
+                    pending[pool.submit(_scan_directory, subdir, naming_format, False, True)] = i
+
+    merged = []
+    for root, (src_dir, matched) in enumerate(zip(src_dirs, per_root)):
+        prefix_len = len(os.path.join(src_dir, ''))
+
+        def order(source):
+            subdir = os.path.dirname(source.path[prefix_len:])
+            return (subdir.split(os.sep) if subdir else [], source.seq, source.path)
+
+        matched.sort(key=order)
+        merged.extend(source._replace(root=root) for source in matched)
+    return merged
+
+
+def scan_sorted_sources(src_dir, naming_format, index=None, recursive=False):
+    """返回按序号排序的 SourceFile 列表，提供 index 时复用缓存
+
+    src_dir 可以是多个源目录（列表或以 SOURCE_SEPARATOR 分隔），此时按源目录顺序合并；
+    多个源目录或 recursive 为 True 时并发扫描，不使用 index。
+    """
+    src_dirs = split_source_dirs(src_dir)
+    if len(src_dirs) > 1 or recursive:
+        return scan_source_roots(src_dirs, naming_format, recursive)
+    if index is not None:
+        return index.scan(src_dirs[0], naming_format)
+    matched = scan_source_dir(src_dirs[0], naming_format)
+    matched.sort()
+    return matched
+
+
+def get_sorted_files(src_dir, naming_format, index=None, recursive=False):
+    """按命名格式匹配源目录中的图片并按序号排序（多个源目录时按源目录顺序合并）"""
+    return [source.path
+            for source in scan_sorted_sources(src_dir, naming_format, index, recursive)]
+
+
+def find_repeated_numbers(sources):
+    """同一文件夹中序号（排序键的全部字段）重复的文件（例如 图片 1.jpg 和 图片 1.png）
+
+    不同子目录中的相同序号不算重复；sources 需为 scan_sorted_sources 的结果，返回 [(排序键, [路径, ...])]。
+    """
+    dirname = os.path.dirname
+    repeated = []
+    i = 0
+    while i < len(sources):
+        j = i + 1
+        while (j < len(sources) and sources[j].seq == sources[i].seq
+               and sources[j].root == sources[i].root
+               and dirname(sources[j].path) == dirname(sources[i].path)):
+            j += 1
+        if j - i > 1:
+            repeated.append((sources[i].seq, [source.path for source in sources[i:j]]))
+        i = j
+    return repeated
+
+
+class SourceIndex:
+    """源目录扫描索引
+
+    以 (源目录, 命名格式) 为键缓存扫描结果（文件名、大小、修改时间、排序键），
+    目录的设备号、inode 和修改时间都不变时直接复用；
+    指定 cache_file 时在首次使用时加载，并在扫描结果变化后写回磁盘。
+    """
+
+    # 最多缓存的目录数，超出后淘汰最久未使用的
+    MAX_ENTRIES = 16
+    # 目录修改时间距今不足该秒数时不缓存，避免同一时间粒度内新增的文件被漏掉
+    RACY_WINDOW = 2.0
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self._entries = OrderedDict()  # key -> (signature, [SourceFile])
+        self._loaded = cache_file is None
+        self._lock = threading.Lock()
+        self.last_hit = False
+
+    @staticmethod
+    def _key(src_dir, naming_format):
+        return f'{normalize_path(src_dir)}|{naming_format}'
+
+    @staticmethod
+    def _signature(src_dir):
+        st = os.stat(src_dir)
+        return [st.st_dev, st.st_ino, st.st_mtime_ns]
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key, item in data.items():
+                # JSON 中排序键为列表；旧版本的缓存中为整数序号
+                files = [SourceFile(tuple(values[0]) if isinstance(values[0], list)
+                                    else (values[0],), *values[1:])
+                         for values in item['files']]
+                self._entries[key] = (item['signature'], files)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f'加载源目录索引失败: {e}')
+            self._entries.clear()
+
+    def save(self):
+        """写回磁盘"""
+        if not self.cache_file:
+            return
+        with self._lock:
+            data = {key: {'signature': signature, 'files': files}
+                    for key, (signature, files) in self._entries.items()}
+        try:
+            atomic_write(self.cache_file,
+                         json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        except OSError as e:
+            print(f'保存源目录索引失败: {e}')
+
+    def scan(self, src_dir, naming_format):
+        """返回按序号排序的 SourceFile 列表"""
+        key = self._key(src_dir, naming_format)
+        signature = self._signature(src_dir)
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                self._entries.move_to_end(key)
+                self.last_hit = True
+                return list(cached[1])
+
+        self.last_hit = False
+        files = scan_source_dir(src_dir, naming_format, with_stat=True)
+        files.sort()
+
+        if time.time() - signature[2] / 1e9 < self.RACY_WINDOW:
+            return files
+
+        with self._lock:
+            self._entries[key] = (signature, files)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        self.save()
+        return list(files)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def filename_error(name):
+    """检查能否作为文件（夹）名的一部分，返回原因；合格时返回 None"""
+    bad = sorted(set(name) & INVALID_FILENAME_CHARS)
+    if bad:
+        return '包含不允许的字符 ' + ' '.join(repr(c) for c in bad)
+    if name != name.rstrip(' .'):
+        return '不能以空格或句点结尾'
+    if name.split('.')[0].upper() in _RESERVED_FILENAMES:
+        return '是系统保留名称'
+    return None
+
+
+def format_size(size):
+    """字节数转为便于阅读的形式，例如 1.5 GB"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+
+def stat_sources(sources, workers=DEFAULT_COPY_WORKERS, sniff=False):
+    """批量读取源文件的大小和修改时间
+
+    返回 (新的 SourceFile 列表, [(路径, 错误)], [card_sniff.SniffResult] 或 None)；
+    sniff 为 True 时打开文件读取文件头和文件尾识别格式（大小和修改时间取自同一次打开）；
+    网络存储上主要受延迟限制，使用线程池并发。
+    """
+    def stat_one(source):
+        try:
+            if sniff:
+                sniffed = sniff_file(source.path)
+                return source._replace(size=sniffed.size, mtime_ns=sniffed.mtime_ns), sniffed, None
+            st = os.stat(source.path)
+        except OSError as e:
+            return source, None, e
+        return source._replace(size=st.st_size, mtime_ns=st.st_mtime_ns), None, None
+
+    if workers > 1 and len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(stat_one, sources, chunksize=256))
+    else:
+        results = [stat_one(source) for source in sources]
+
+    errors = [(source.path, error) for source, _, error in results if error is not None]
+    sniffed = [item for _, item, _ in results if item is not None] if sniff else None
+    return [source for source, _, _ in results], errors, sniffed
+
+
+def next_output_dir(base_dst_dir):
+    """返回可用的输出目录：输出目录、输出目录1、输出目录2…"""
+    output_dir = normalize_path(os.path.join(base_dst_dir, OUTPUT_DIR_NAME))
+    i = 1
+    while os.path.exists(output_dir):
+        output_dir = normalize_path(os.path.join(base_dst_dir, f"{OUTPUT_DIR_NAME}{i}"))
+        i += 1
+    return output_dir
+
+
+class BatchPlan:
+    """一次处理任务：已校验的输入、排好序的源文件和完整的复制清单"""
+
+    def __init__(self, src_dir, output_dir, card_types, name_id_pairs, files, sources=None,
+                 fingerprint=None, resumed=False, base_dst_dir=None):
+        # src_dir 可以是多个源目录，src_dir 属性为第一个
+        self.src_dirs = split_source_dirs(src_dir)
+        self.src_dir = self.src_dirs[0] if self.src_dirs else src_dir
+        self.output_dir = output_dir
+        self.card_types = list(card_types)
+        self.name_id_pairs = list(name_id_pairs)
+        self.files = files
+        # 与 files 一一对应的 SourceFile（含大小、修改时间，未读取时为 None）
+        self.sources = sources
+        # 批次指纹（见 card_journal.batch_fingerprint），resumed 表示继续之前未完成的输出目录
+        self.fingerprint = fingerprint
+        self.resumed = resumed
+        self.base_dst_dir = base_dst_dir if base_dst_dir is not None else os.path.dirname(output_dir)
+        # 复制清单 [(name_id_pair, src_file, dst_file, new_name)]，见 build_copy_tasks
+        self.tasks = None
+        # 源文件总字节数（预检时统计）
+        self.total_bytes = None
+        # 与 files 一一对应的内容校验值（检查重复图片时计算）
+        self.digests = None
+        # 与 sources 一一对应的 card_sniff.SniffResult（预检时按文件头识别的格式和尺寸）
+        self.sniffed = None
+        # 运行统计（card_metrics.RunMetrics），准备阶段开始记录，execute_batch 继续记录
+        self.metrics = None
+
+    @property
+    def images_per_person(self):
+        return len(self.card_types)
+
+    @property
+    def total(self):
+        return len(self.name_id_pairs) * self.images_per_person
+
+
+class BatchResult:
+    """处理结果统计"""
+
+    def __init__(self, plan, processed, cancelled=False, copy_summary='', skipped=0,
+                 metrics=None, report_path=None):
+        self.plan = plan
+        # processed 包含断点续传时跳过的已完成文件（skipped）
+        self.processed = processed
+        self.skipped = skipped
+        self.cancelled = cancelled
+        # 各写入方式的实际使用次数，见 card_copy.Copier.summary
+        self.copy_summary = copy_summary
+        # 运行统计及 JSON 运行报告路径（未写入时为 None）
+        self.metrics = metrics
+        self.report_path = report_path
+
+    @property
+    def completed(self):
+        return self.processed == self.plan.total
+
+    def summary(self):
+        return (f'文件处理完成！\n'
+                f'已处理 {len(self.plan.name_id_pairs)} 个姓名+身份证号文件夹\n'
+                f'共处理 {self.processed} 个文件')
+
+
+def prepare_batch(src_dir, base_dst_dir, card_types, name_id_pairs,
+                  naming_format=DEFAULT_NAMING_FORMAT, log=print, index=None, resume=False,
+                  copy_mode=DEFAULT_COPY_MODE, check_duplicates=False, hash_cache=None,
+                  recursive=False):
+    """校验输入、扫描源文件并生成通过预检的处理计划，失败时抛出 BatchError
+
+    不会在磁盘上创建任何内容，输出目录由 execute_batch 创建；
+    src_dir 可以是多个源目录（列表或以 SOURCE_SEPARATOR 分隔），按源目录顺序、再按序号合并，
+    recursive 为 True 时包括子目录；
+    index 为 SourceIndex 时复用其中的扫描结果（仅单个源目录且不包括子目录时）；
+    resume 为 True 时优先继续同一批数据未完成的输出目录，而不是新建输出目录；
+    copy_mode 用于判断预检时是否需要目标磁盘有足够的剩余空间；
+    check_duplicates 为 True 时计算所有源图片的校验值，发现内容相同的图片则不处理，
+    hash_cache 为 card_hash.HashCache 时复用其中未变化文件的校验值。
+    """
+    metrics = RunMetrics()
+    src_dirs = split_source_dirs(src_dir or '')
+    base_dst_dir = normalize_path(base_dst_dir)
+
+    if not src_dirs or not base_dst_dir:
+        raise BatchError('请选择源文件夹和目标文件夹')
+
+    missing = [path for path in src_dirs if not os.path.exists(path)]
+    if missing:
+        raise BatchError('源文件夹不存在' if len(src_dirs) == 1
+                         else '源文件夹不存在：\n' + '\n'.join(missing))
+
+    if not os.path.exists(base_dst_dir):
+        raise BatchError('目标文件夹不存在')
+
+    # 单个源目录时与之前的指纹保持一致，已有的未完成输出目录仍可继续
+    src_key = SOURCE_SEPARATOR.join(src_dirs) + ('|recursive' if recursive else '')
+    fingerprint = batch_fingerprint(src_key, naming_format, card_types, name_id_pairs)
+    output_dir = find_unfinished_run(base_dst_dir, OUTPUT_DIR_NAME, fingerprint) if resume else None
+    resumed = output_dir is not None
+    if resumed:
+        log(f'继续未完成的处理：{output_dir}')
+    else:
+        output_dir = next_output_dir(base_dst_dir)
+
+    if not card_types:
+        raise BatchError('请选择至少一种证件类型')
+
+    if not name_id_pairs:
+        raise BatchError('请输入至少一个姓名+身份证号')
+
+    naming_error = naming_format_error(naming_format)
+    if naming_error:
+        raise BatchError(naming_error)
+
+    # 获取文件列表并排序
+    try:
+        with metrics.phase('扫描'):
+            sources = scan_sorted_sources(src_dirs, naming_format, index, recursive)
+    except Exception as e:
+        log(f'处理文件列表时出错：{str(e)}')
+        sources = []
+    if index is not None and index.last_hit:
+        log(f'源目录未变化，使用缓存的扫描结果（{len(sources)} 个文件）')
+    files = [source.path for source in sources]
+    if not files:
+        raise BatchError('源文件夹中没有符合命名格式的图片文件')
+    if len(src_dirs) > 1:
+        counts = [0] * len(src_dirs)
+        for source in sources:
+            counts[source.root] += 1
+        log('各源文件夹的图片数：' + '，'.join(f'{path} {count}'
+                                          for path, count in zip(src_dirs, counts)))
+
+    # 同一文件夹中序号重复时无法确定顺序（例如同一序号既有 .jpg 又有 .png）
+    repeated = find_repeated_numbers(sources)
+    if repeated:
+        raise BatchError(_report(
+            '同一文件夹中有序号重复的图片，无法确定顺序，请删除或重命名多余的文件',
+            [' = '.join(paths) for _, paths in repeated]))
+
+    # 验证输入格式（一次报告全部不合格的行）
+    with metrics.phase('校验名单'):
+        failures = find_invalid_roster_lines(name_id_pairs)
+    if failures:
+        raise BatchError(format_roster_failures(failures))
+
+    plan = BatchPlan(src_dirs, output_dir, card_types, name_id_pairs, files, sources,
+                     fingerprint, resumed, base_dst_dir)
+    plan.metrics = metrics
+
+    if len(files) != plan.total:
+        raise BatchError(
+            f'图片数量不匹配！\n'
+            f'每个人需要 {plan.images_per_person} 张图片\n'
+            f'共有 {len(name_id_pairs)} 个人\n'
+            f'需要的总图片数：{plan.total}\n'
+            f'实际图片数量：{len(files)}')
+
+    with metrics.phase('预检'):
+        preflight_batch(plan, log, copy_mode)
+    if check_duplicates:
+        with metrics.phase('重复检查'):
+            check_duplicate_sources(plan, log, hash_cache)
+    return plan
+
+
+def build_copy_tasks(plan):
+    """生成完整的复制清单（只在内存中计算，不访问磁盘）"""
+    images_per_person = plan.images_per_person
+    files = plan.files
+    tasks = []
+    for i, name_id_pair in enumerate(plan.name_id_pairs):
+        # 在输出目录下为每个姓名+身份证号建立目录
+        person_dir = normalize_path(os.path.join(plan.output_dir, name_id_pair))
+        person_files = files[i * images_per_person:(i + 1) * images_per_person]
+        for src_file, card_type in zip(person_files, plan.card_types):
+            # 生成目标文件名：姓名+身份证号-证件类型
+            new_name = f"{name_id_pair}-{card_type}{os.path.splitext(src_file)[1]}"
+            tasks.append((name_id_pair, src_file,
+                          normalize_path(os.path.join(person_dir, new_name)), new_name))
+    return tasks
+
+
+def _report(title, items):
+    lines = [f'{title}（{len(items)} 项）：']
+    lines.extend(f'  {item}' for item in items[:PREFLIGHT_REPORT_LIMIT])
+    if len(items) > PREFLIGHT_REPORT_LIMIT:
+        lines.append(f'  ……另有 {len(items) - PREFLIGHT_REPORT_LIMIT} 项')
+    return '\n'.join(lines)
+
+
+def preflight_batch(plan, log=print, copy_mode=DEFAULT_COPY_MODE):
+    """处理前预检，所有问题一次性汇总后抛出 BatchError
+
+    检查证件类型和人员目录名中的非法字符、目标文件重名、源文件能否读取、
+    源文件的真实格式（空文件、内容全为 0、内容无法识别的文件）、目标文件夹能否写入以及剩余空间；
+    可能未写完（末尾缺少结束标记）和内容与扩展名不符的文件只记录日志；通过后填充 plan.tasks、plan.sources、plan.sniffed 和 plan.total_bytes。
+    """
+    problems = []
+
+    bad_names = []
+    for card_type in plan.card_types:
+        reason = filename_error(card_type)
+        if reason:
+            bad_names.append(f'证件类型 “{card_type}” {reason}')
+    for name_id_pair in plan.name_id_pairs:
+        reason = filename_error(name_id_pair)
+        if reason:
+            bad_names.append(f'“{name_id_pair}” {reason}')
+    if bad_names:
+        problems.append(_report('以下名称不能用作文件名', bad_names))
+
+    tasks = build_copy_tasks(plan)
+
+    # 目标文件重名（Windows 文件名不区分大小写），例如重复的证件类型或人员
+    seen = {}
+    collisions = []
+    for _, _, dst_file, new_name in tasks:
+        key = dst_file.casefold()
+        if key in seen:
+            collisions.append(new_name)
+        else:
+            seen[key] = new_name
+    if collisions:
+        problems.append(_report('以下目标文件重名，请检查证件类型或名单是否重复', collisions))
+
+    sources = plan.sources or [SourceFile(None, path, None, None) for path in plan.files]
+    sources, stat_errors, sniffed = stat_sources(sources, workers=DEFAULT_SCAN_WORKERS,
+                                                 sniff=True)
+    if stat_errors:
+        problems.append(_report('以下源文件无法读取',
+                                [f'{path}: {error}' for path, error in stat_errors]))
+    suspicious = [f'{result.path}: {result.problem}' for result in sniffed if result.problem]
+    if suspicious:
+        problems.append(_report('以下源文件内容有问题', suspicious))
+    incomplete = [f'{result.path}: {result.incomplete}' for result in sniffed if result.incomplete]
+    if incomplete:
+        log(_report('以下源文件可能未写完，请确认扫描已结束（仍会照常处理）', incomplete))
+    mismatched = [f'{result.path}: {result.mismatch}' for result in sniffed if result.mismatch]
+    if mismatched:
+        log(_report('以下源文件的内容与扩展名不符或无法确认（仍会按原扩展名输出）', mismatched))
+    total_bytes = sum(source.size for source in sources if source.size is not None)
+
+    base_dst_dir = plan.base_dst_dir
+    write_dir = plan.output_dir if plan.resumed else base_dst_dir
+    if not os.access(write_dir, os.W_OK | os.X_OK):
+        problems.append(f'没有写入权限：{write_dir}')
+
+    try:
+        free_bytes = shutil.disk_usage(base_dst_dir).free
+    except OSError as e:
+        free_bytes = None
+        log(f'无法获取目标磁盘剩余空间：{e}')
+    # 继续未完成的处理时，记录中已完成的文件不再需要空间
+    needed_bytes = total_bytes - (completed_bytes(plan, tasks, sources) if plan.resumed else 0)
+    if free_bytes is not None and free_bytes < needed_bytes:
+        message = (f'目标磁盘空间不足：需要 {format_size(needed_bytes)}，'
+                   f'剩余 {format_size(free_bytes)}')
+        try:
+            dst_device = os.stat(base_dst_dir).st_dev
+            same_device = all(os.stat(src_dir).st_dev == dst_device for src_dir in plan.src_dirs)
+        except OSError:
+            same_device = False
+        if copy_mode in ('hardlink', 'reflink', 'auto') and same_device:
+            # 同一磁盘上硬链接/克隆几乎不占用新空间，只提示不阻止
+            log(f'{message}（同一磁盘上使用{COPY_MODES[copy_mode]}方式，可能不需要额外空间）')
+        else:
+            problems.append(message)
+
+    if problems:
+        raise BatchError('处理前检查未通过：\n' + '\n'.join(problems))
+
+    plan.tasks = tasks
+    plan.sources = sources
+    plan.sniffed = sniffed
+    plan.total_bytes = total_bytes
+    log(f'源文件格式：{format_sniff_summary(sniffed)}')
+    log(f'预检通过：{len(tasks)} 个文件，共 {format_size(total_bytes)}'
+        + (f'，目标磁盘剩余 {format_size(free_bytes)}' if free_bytes is not None else ''))
+
+
+def completed_bytes(plan, tasks, sources):
+    """继续未完成的处理时，处理记录中已完成且源文件大小未变的文件的总字节数"""
+    if not plan.fingerprint:
+        return 0
+    run_journal = RunJournal(plan.output_dir, plan.fingerprint)
+    try:
+        run_journal.load()
+    except OSError:
+        return 0
+    if not run_journal.completed:
+        return 0
+    sizes = {source.path: source.size for source in sources}
+    total = 0
+    for _, src_file, dst_file, _ in tasks:
+        entry = run_journal.completed.get(dst_file)
+        if entry is not None and entry[0] == src_file and entry[1] == sizes.get(src_file):
+            total += entry[1]
+    return total
+
+
+def check_duplicate_sources(plan, log=print, cache=None, workers=DEFAULT_COPY_WORKERS):
+    """计算源图片校验值，存在内容完全相同的图片时抛出 BatchError
+
+    重复扫描同一页会让之后的图片依次错位到下一个证件类型，因此必须在复制前发现。
+    """
+    start = time.perf_counter()
+    digests, cache_hits, errors = hash_sources(plan.sources, cache, workers)
+    if errors:
+        raise BatchError(_report('以下源文件无法读取',
+                                 [f'{path}: {error}' for path, error in errors]))
+    log(f'已检查 {len(digests)} 个源文件的内容（{cache_hits} 个使用缓存），'
+        f'用时 {time.perf_counter() - start:.1f} 秒')
+
+    duplicate_groups, adjacent = find_duplicates(digests)
+    if duplicate_groups:
+        raise BatchError('源文件夹中有内容完全相同的图片，按顺序归档会错位，请检查后重新扫描：\n'
+                         + format_duplicate_report(plan.files, duplicate_groups, adjacent))
+    plan.digests = digests
+
+
+def iter_copy_tasks(plan, log=print, metrics=None):
+    """按人员顺序生成复制任务 (name_id_pair, src_file, dst_file, new_name)
+
+    人员目录在生成该人的任务前创建，创建失败时记录日志并跳过此人；
+    提供 metrics 时将建目录耗时计入“建目录”阶段。
+    """
+    tasks = plan.tasks if plan.tasks is not None else build_copy_tasks(plan)
+    current_pair = None
+    skip_pair = False
+    for task in tasks:
+        name_id_pair = task[0]
+        if name_id_pair != current_pair:
+            current_pair = name_id_pair
+            start = time.perf_counter()
+            try:
+                os.makedirs(os.path.dirname(task[2]), exist_ok=True)
+                skip_pair = False
+            except Exception as e:
+                log(f'处理 {name_id_pair} 的文件夹时出错: {str(e)}')
+                skip_pair = True
+            if metrics is not None:
+                metrics.add_time('建目录', time.perf_counter() - start)
+        if not skip_pair:
+            yield task
+
+
+def execute_batch(plan, log=print, progress=None, is_cancelled=None,
+                  workers=DEFAULT_COPY_WORKERS, copy_mode=DEFAULT_COPY_MODE, journal=True,
+                  report=True, copier=None, transform=None):
+    """按人员分组复制并重命名文件
+
+    copy_mode 为 card_copy.COPY_MODES 中的写入方式，不支持时回退为普通复制；
+    copy_mode 为 'verify' 时复制的同时计算校验值（已检查重复图片时还与源文件校验值比对），
+    并在每个人员目录下写入校验清单 card_hash.MANIFEST_NAME；
+    workers > 1 时使用线程池并发复制，日志、进度回调仍在调用线程中执行；
+    journal 为 True 时在输出目录中记录已完成的文件，plan.resumed 时跳过记录中已完成的文件；
+    progress(processed_count) 在每个文件复制成功后调用；
+    is_cancelled() 返回 True 时停止提交新的文件，已提交的文件会等待完成；
+    report 为 True 时在输出目录写入 JSON 运行报告（各阶段耗时、吞吐量、复制延迟）；
+    copier 为 card_copy.Copier 时复用（多次调用累计各方式的使用次数），否则按 copy_mode 新建；
+    transform 为 card_image.ImageTransform 时，每个文件复制完成后交给它的线程池缩小/压缩，
+    与复制同时进行，复制结束后在“等待图片处理”阶段等待全部完成（校验清单记录处理后的校验值）。
+    “复制”阶段为整个复制循环的耗时，包含其中的“建目录”和“日志”。
+    """
+    metrics = plan.metrics if plan.metrics is not None else RunMetrics()
+    source_sizes = ({source.path: source.size for source in plan.sources}
+                    if plan.sources else {})
+    raw_log = log
+
+    def log(message):
+        start = time.perf_counter()
+        raw_log(message)
+        metrics.add_time('日志', time.perf_counter() - start)
+
+    processed_count = 0
+    skipped_count = 0
+    cancelled = False
+    if copier is None:
+        copier = Copier(copy_mode)
+
+    # 预检通过后才创建输出目录
+    os.makedirs(plan.output_dir, exist_ok=True)
+
+    run_journal = None
+    if journal and plan.fingerprint:
+        run_journal = RunJournal(plan.output_dir, plan.fingerprint)
+        if plan.resumed:
+            run_journal.load()
+        run_journal.open()
+
+    # 校验复制：人员目录 -> {文件名: 校验值}，最后写入各目录的校验清单
+    manifests = {}
+    expected_digests = (dict(zip(plan.files, plan.digests))
+                        if copier.verify and plan.digests else None)
+
+    def copy_task(task):
+        """返回 (源文件大小和修改时间或 None, 校验值或 None, 复制耗时)"""
+        _, src_file, dst_file, _ = task
+        start = time.perf_counter()
+        digest = None
+        if copier.verify:
+            digest = copier.copy_verified(src_file, dst_file)
+            expected = expected_digests.get(src_file) if expected_digests else None
+            if expected is not None and digest != expected:
+                raise OSError('校验值与处理前检查时不一致，源文件可能在处理过程中被修改')
+        else:
+            copier.copy(src_file, dst_file)
+        elapsed = time.perf_counter() - start
+        if run_journal is not None:
+            st = os.stat(src_file)
+            return (st.st_size, st.st_mtime_ns), digest, elapsed
+        return None, digest, elapsed
+
+    def add_to_manifest(dst_file, digest):
+        manifests.setdefault(os.path.dirname(dst_file), {})[os.path.basename(dst_file)] = digest
+
+    def finish(task, error=None, result=None):
+        nonlocal processed_count
+        name_id_pair, src_file, dst_file, new_name = task
+        if error is not None:
+            metrics.failed += 1
+            log(f'处理文件出错 {src_file}: {str(error)}')
+            return
+        src_stat, digest, elapsed = result
+        metrics.record_copy(src_file, src_stat[0] if src_stat else source_sizes.get(src_file),
+                            elapsed)
+        log(f'已复制到 {name_id_pair} 的文件夹: {os.path.basename(src_file)} -> {new_name}')
+        if digest is not None:
+            add_to_manifest(dst_file, digest)
+        if run_journal is not None:
+            run_journal.record(src_file, dst_file, *src_stat, digest)
+        if transform is not None:
+            transform.submit(dst_file)
+        processed_count += 1
+        if progress:
+            progress(processed_count)
+
+    def pending_tasks():
+        """跳过记录中已完成且未变化的文件"""
+        nonlocal processed_count, skipped_count
+        for task in iter_copy_tasks(plan, log, metrics):
+            if run_journal is not None and run_journal.completed \
+                    and run_journal.is_completed(task[1], task[2]):
+                if copier.verify:
+                    # 之前未使用校验复制时记录中没有校验值，读取已完成的目标文件补算
+                    try:
+                        add_to_manifest(task[2], run_journal.digest(task[2]) or hash_file(task[2]))
+                    except OSError as e:
+                        finish(task, e)
+                        continue
+                if transform is not None:
+                    transform.submit(task[2])
+                skipped_count += 1
+                processed_count += 1
+                if progress:
+                    progress(processed_count)
+                continue
+            yield task
+
+    copy_start = time.perf_counter()
+    try:
+        if workers <= 1:
+            for task in pending_tasks():
+                if is_cancelled and is_cancelled():
+                    cancelled = True
+                    break
+                try:
+                    result = copy_task(task)
+                except Exception as e:
+                    finish(task, e)
+                else:
+                    finish(task, result=result)
+        else:
+            # 限制在途任务数量，保证取消能及时生效且不会一次性提交全部任务
+            max_pending = workers * 4
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = {}
+
+                def drain(return_when):
+                    done, _ = wait(pending, return_when=return_when)
+                    for future in done:
+                        task = pending.pop(future)
+                        error = future.exception()
+                        finish(task, error, None if error else future.result())
+
+                for task in pending_tasks():
+                    if is_cancelled and is_cancelled():
+                        cancelled = True
+                        break
+                    pending[pool.submit(copy_task, task)] = task
+                    if len(pending) >= max_pending:
+                        drain(FIRST_COMPLETED)
+
+                if pending:
+                    drain(ALL_COMPLETED)
+    finally:
+        metrics.add_time('复制', time.perf_counter() - copy_start)
+        if transform is not None:
+            with metrics.phase('等待图片处理'):
+                transformed = transform.results(cancel=cancelled)
+            for item in transformed:
+                if item.error is not None:
+                    metrics.transform_failed += 1
+                    log(f'压缩图片出错 {item.path}: {item.error}')
+                elif item.after is not None:
+                    metrics.record_transform(item.before, item.after)
+                    log(f'已压缩 {os.path.basename(item.path)}: {item.before // 1024} KB -> '
+                        f'{item.after // 1024} KB（{item.size[0]}x{item.size[1]}）')
+                    if copier.verify:
+                        try:
+                            add_to_manifest(item.path, hash_file(item.path))
+                        except OSError as e:
+                            log(f'计算校验值出错 {item.path}: {str(e)}')
+        if manifests:
+            with metrics.phase('写入清单'):
+                for person_dir, digests in manifests.items():
+                    try:
+                        write_manifest(person_dir, digests)
+                    except OSError as e:
+                        log(f'写入校验清单出错 {person_dir}: {str(e)}')
+        if run_journal is not None:
+            run_journal.close(finished=processed_count == plan.total)
+
+    if skipped_count:
+        log(f'已跳过 {skipped_count} 个之前已完成的文件')
+
+    report_path = None
+    if report:
+        try:
+            report_path = metrics.write_report(
+                plan.output_dir, src_dirs=plan.src_dirs, output_dir=plan.output_dir,
+                copy_mode=copy_mode, workers=workers, total=plan.total,
+                processed=processed_count, skipped=skipped_count, cancelled=cancelled,
+                copy_methods=dict(copier.counts),
+                image_transform=transform.describe() if transform is not None else None)
+        except OSError as e:
+            log(f'写入运行报告出错: {str(e)}')
+    return BatchResult(plan, processed_count, cancelled, copier.summary(), skipped_count,
+                       metrics, report_path)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description='照片分类工具 - 命令行批处理（无需启动界面）')
+    parser.add_argument('-s', '--source', required=True, nargs='+',
+                        help='源文件夹，可指定多个（按顺序合并，每个文件夹内按序号排序）')
+    parser.add_argument('-R', '--recursive', action='store_true',
+                        help='包括源文件夹的所有子文件夹')
+    parser.add_argument('-d', '--dest', required=True, help='目标文件夹（在其下创建输出目录）')
+    parser.add_argument('-r', '--roster', required=True,
+                        help='名单文件：txt 每行一个 姓名+身份证号，或 CSV/TSV（UTF-8 或 GBK）')
+    parser.add_argument('--roster-column', metavar='COL',
+                        help='CSV/TSV 中 姓名+身份证号 所在列（列号从 1 开始或表头名称）')
+    parser.add_argument('--roster-name-column', metavar='COL', help='CSV/TSV 中的姓名列')
+    parser.add_argument('--roster-id-column', metavar='COL', help='CSV/TSV 中的身份证号列')
+    parser.add_argument('--roster-delimiter', metavar='CHAR', help='名单分隔符（默认按扩展名：csv 为逗号，tsv 为制表符）')
+    parser.add_argument('-t', '--card-types', required=True, nargs='+',
+                        help='证件类型，顺序与每人的图片顺序一致')
+    parser.add_argument('-n', '--naming', default=DEFAULT_NAMING_FORMAT,
+                        help=f'图片命名格式，必须包含 {{n}}，可加 {{n:04}} 补零位数及 {{date}}、{{time}}、'
+                             f'{{名称}} 等字段，如 {{date}}_{{station}}_{{n}}（默认：{DEFAULT_NAMING_FORMAT}）')
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_COPY_WORKERS,
+                        help=f'并发复制线程数，1 为逐个复制（默认：{DEFAULT_COPY_WORKERS}）')
+    parser.add_argument('-m', '--copy-mode', choices=list(COPY_MODES), default=DEFAULT_COPY_MODE,
+                        help='输出方式：auto 自动选择克隆/内核复制，copy 普通复制，'
+                             'hardlink 硬链接（同一磁盘），reflink 克隆，kernel 内核复制，'
+                             'verify 复制时计算 SHA-256 并在每个人员目录写入校验清单'
+                             f'（默认：{DEFAULT_COPY_MODE}）')
+    parser.add_argument('--archive', choices=['zip', 'tar'],
+                        help='把结果顺序写入归档文件而不是逐人建目录：zip 仅存储不压缩，tar')
+    parser.add_argument('--archive-per-person', action='store_true',
+                        help='与 --archive 一起使用，每人一个归档（默认整批一个归档）')
+    parser.add_argument('--max-edge', type=int, metavar='PX',
+                        help='把图片缩小到最长边不超过该像素数（需要 PyQt5，复制的同时处理）')
+    parser.add_argument('--max-kb', type=int, metavar='KB',
+                        help='把图片压缩到不超过该大小（JPEG 降低质量，仍超出时继续缩小）')
+    parser.add_argument('--quality', type=int, default=85, metavar='Q',
+                        help='重新编码图片的质量 1-100（默认：85）')
+    parser.add_argument('--transform-workers', type=int, metavar='N',
+                        help='缩小/压缩图片的线程数（默认：CPU 核数，最多 4）')
+    parser.add_argument('--index-cache', metavar='FILE',
+                        help='源目录扫描索引缓存文件，源目录未变化时跳过重新扫描')
+    parser.add_argument('--resume', action='store_true',
+                        help='继续同一批数据未完成的输出目录，跳过已完成的文件')
+    parser.add_argument('--check-duplicates', action='store_true',
+                        help='处理前检查源图片中是否有内容完全相同的图片（如同一页扫描两次）')
+    parser.add_argument('--hash-cache', metavar='FILE',
+                        help='校验值缓存文件，源文件未变化时不再重新读取')
+    parser.add_argument('--watch', action='store_true',
+                        help='监视源文件夹，图片写完且凑齐一人的全部证件类型即归档（边扫描边处理）')
+    parser.add_argument('--idle-timeout', type=float, metavar='SEC',
+                        help='监视时超过该秒数没有新图片则停止（默认一直等到名单全部完成）')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='只生成处理计划并预检（空间、权限、重名、非法字符），不写入任何文件')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不输出逐个文件的日志')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    naming_error = naming_format_error(args.naming)
+    if naming_error:
+        print(naming_error, file=sys.stderr)
+        return 1
+
+    try:
+        roster = import_roster(args.roster, column=args.roster_column,
+                               name_column=args.roster_name_column,
+                               id_column=args.roster_id_column,
+                               delimiter=args.roster_delimiter)
+    except RosterError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    if roster.error_count:
+        print(f'名单文件有 {roster.error_count} 行不正确：\n{roster.error_report()}', file=sys.stderr)
+        return 1
+    name_id_pairs = roster.entries
+
+    log = (lambda message: None) if args.quiet else print
+
+    if args.archive_per_person and not args.archive:
+        print('--archive-per-person 需要与 --archive 一起使用', file=sys.stderr)
+        return 1
+    if args.archive and (args.watch or args.resume):
+        print('--archive 不能与 --watch、--resume 同时使用', file=sys.stderr)
+        return 1
+    transforming = bool(args.max_edge or args.max_kb)
+    if transforming and (args.archive or args.watch):
+        print('--max-edge、--max-kb 不能与 --archive、--watch 同时使用', file=sys.stderr)
+        return 1
+    if not 1 <= args.quality <= 100:
+        print('--quality 必须在 1 到 100 之间', file=sys.stderr)
+        return 1
+    transform = None
+    if transforming:
+        # 图片处理依赖本模块，在此处导入避免循环导入
+        import card_image
+        try:
+            transform = card_image.ImageTransform(
+                args.max_edge, args.max_kb * 1024 if args.max_kb else None, args.quality,
+                args.transform_workers or card_image.DEFAULT_TRANSFORM_WORKERS)
+        except card_image.BatchError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+
+    if args.watch:
+        if len(args.source) > 1 or args.recursive or args.dry_run:
+            print('--watch 只支持单个源文件夹，且不能与 --recursive、--dry-run 同时使用',
+                  file=sys.stderr)
+            return 1
+        # 监视模式依赖本模块，在此处导入避免循环导入；
+        # 以脚本运行时本模块名为 __main__，需捕获 card_watch 所用的 card_engine.BatchError
+        import card_watch
+        try:
+            result = card_watch.watch_batch(
+                args.source[0], args.dest, args.card_types, name_id_pairs, args.naming,
+                log=log, copy_mode=args.copy_mode, workers=args.workers,
+                idle_timeout=args.idle_timeout)
+        except card_watch.BatchError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        except KeyboardInterrupt:
+            print('已停止监视', file=sys.stderr)
+            return 2
+        return _print_result(result)
+
+    try:
+        index = SourceIndex(args.index_cache) if args.index_cache else None
+        hash_cache = HashCache(args.hash_cache) if args.hash_cache else None
+        plan = prepare_batch(args.source, args.dest, args.card_types, name_id_pairs,
+                             args.naming, log=log, index=index, resume=args.resume,
+                             copy_mode='copy' if args.archive else args.copy_mode,
+                             check_duplicates=args.check_duplicates or bool(args.hash_cache),
+                             hash_cache=hash_cache, recursive=args.recursive)
+    except BatchError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    if args.dry_run:
+        print(f'输出目录（未创建）: {plan.output_dir}')
+        print(f'计划处理 {len(plan.name_id_pairs)} 人，{plan.total} 个文件，'
+              f'共 {format_size(plan.total_bytes)}')
+        if not args.quiet:
+            for _, src_file, dst_file, _ in plan.tasks:
+                print(f'{src_file} -> {dst_file}')
+        return 0
+
+    print(f'输出目录: {plan.output_dir}')
+    if args.archive:
+        # 归档输出依赖本模块，在此处导入避免循环导入
+        import card_archive
+        try:
+            result = card_archive.archive_batch(plan, args.archive, args.archive_per_person,
+                                                log=log)
+        except card_archive.BatchError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        return _print_result(result)
+    result = execute_batch(plan, log=log, workers=args.workers, copy_mode=args.copy_mode,
+                           transform=transform)
+    return _print_result(result)
+
+
+def _print_result(result):
+    """输出处理结果和运行统计，返回退出码"""
+    if result.copy_summary:
+        print(f'输出方式：{result.copy_summary}')
+    print('\n'.join(result.metrics.summary_lines()))
+    if result.report_path:
+        print(f'运行报告：{result.report_path}')
+    if result.completed:
+        print(result.summary())
+        return 0
+
+    print(f'处理未完成：成功 {result.processed} / {result.plan.total} 个文件', file=sys.stderr)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
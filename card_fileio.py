@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 文件写入
+缓存、配置、校验清单和重新编码的图片都先写入同一目录下的临时文件再替换，避免留下半截文件；
+临时文件名由 tempfile.mkstemp 生成，多个进程同时保存同一文件时不会互相覆盖对方的临时文件
+"""
+
+import os
+import stat
+import tempfile
+
+
+# mkstemp 创建的文件只有所有者可读写；新文件改为与 open() 创建时相同的权限
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write(path, data):
+    """将 data（bytes，或按 UTF-8 编码的 str）写入 path，先写临时文件再替换；失败时抛出 OSError
+
+    已有文件保留原来的权限。
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory, name = os.path.split(os.path.abspath(path))
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_file = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_file, mode)
+        os.replace(tmp_file, path)
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 文件内容校验值
+并发计算源图片的 SHA-256，找出内容完全相同的图片（同一页重复扫描会导致按顺序归档错位）；
+校验值按 (路径, 大小, 修改时间) 缓存，源文件未变化时不再重新读取
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from card_fileio import atomic_write
+
+
+HASH_ALGORITHM = 'sha256'
+# 读取块大小；hashlib 在处理大块数据时会释放 GIL，多个线程可以同时计算
+READ_CHUNK_SIZE = 1024 * 1024
+# 不小于该大小的文件（RAW/CR2/NEF 等）用 mmap 读取，省去复制到用户态缓冲区
+MMAP_THRESHOLD = 32 * 1024 * 1024
+DEFAULT_HASH_WORKERS = 4
+# 重复报告中最多列出的组数
+DUPLICATE_REPORT_LIMIT = 20
+
+
+def hash_file(path, size=None):
+    """计算文件的 SHA-256 十六进制校验值"""
+    digest = hashlib.new(HASH_ALGORITHM)
+    with open(path, 'rb') as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, len(mapped), READ_CHUNK_SIZE):
+                        digest.update(view[offset:offset + READ_CHUNK_SIZE])
+                finally:
+                    view.release()
+        else:
+            buffer = bytearray(READ_CHUNK_SIZE)
+            view = memoryview(buffer)
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digest.update(view[:count])
+    return digest.hexdigest()
+
+
+class HashCache:
+    """校验值缓存：路径 -> (大小, 修改时间, 校验值)
+
+    大小或修改时间变化即视为失效；指定 cache_file 时在首次使用时加载，save() 写回磁盘。
+    """
+
+    # 最多缓存的文件数，超出后丢弃最早加入的
+    MAX_ENTRIES = 200000
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self._entries = {}
+        self._loaded = cache_file is None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('algorithm') == HASH_ALGORITHM:
+                self._entries = {path: tuple(values) for path, values in data['files'].items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f'加载校验值缓存失败: {e}')
+            self._entries = {}
+
+    def get(self, path, size, mtime_ns):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._entries.get(os.path.abspath(path))
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, path, size, mtime_ns, digest):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            path = os.path.abspath(path)
+            self._entries.pop(path, None)
+            self._entries[path] = (size, mtime_ns, digest)
+            while len(self._entries) > self.MAX_ENTRIES:
+                del self._entries[next(iter(self._entries))]
+            self._dirty = True
+
+    def save(self):
+        """写回磁盘"""
+        if not self.cache_file or not self._dirty:
+            return
+        with self._lock:
+            data = {'algorithm': HASH_ALGORITHM, 'files': dict(self._entries)}
+            self._dirty = False
+        try:
+            atomic_write(self.cache_file,
+                         json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        except OSError as e:
+            print(f'保存校验值缓存失败: {e}')
+
+
+def hash_sources(sources, cache=None, workers=DEFAULT_HASH_WORKERS, is_cancelled=None):
+    """计算 SourceFile 列表中每个文件的校验值
+
+    返回 (与 sources 一一对应的校验值列表, 命中缓存的个数, [(路径, 错误)])；
+    读取失败或已取消的文件校验值为 None。
+    """
+    def hash_one(source):
+        """返回 (校验值, 错误, 是否命中缓存)"""
+        if is_cancelled and is_cancelled():
+            return None, None, False
+        if cache is not None and source.size is not None:
+            digest = cache.get(source.path, source.size, source.mtime_ns)
+            if digest is not None:
+                return digest, None, True
+        try:
+            digest = hash_file(source.path, source.size)
+        except OSError as e:
+            return None, e, False
+        if cache is not None and source.size is not None:
+            cache.put(source.path, source.size, source.mtime_ns, digest)
+        return digest, None, False
+
+    if workers > 1 and len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(hash_one, sources, chunksize=16))
+    else:
+        results = [hash_one(source) for source in sources]
+
+    if cache is not None:
+        cache.save()
+    errors = [(source.path, error) for source, (_, error, _) in zip(sources, results)
+              if error is not None]
+    cache_hits = sum(1 for _, _, hit in results if hit)
+    return [digest for digest, _, _ in results], cache_hits, errors
+
+
+def find_duplicates(digests):
+    """返回 (重复组列表, 相邻重复的下标列表)
+
+    重复组为内容相同的文件下标列表；相邻重复的下标 i 表示第 i 个与第 i+1 个文件内容相同。
+    """
+    groups = {}
+    for i, digest in enumerate(digests):
+        if digest is not None:
+            groups.setdefault(digest, []).append(i)
+    duplicate_groups = [indexes for indexes in groups.values() if len(indexes) > 1]
+    adjacent = [i for i in range(len(digests) - 1)
+                if digests[i] is not None and digests[i] == digests[i + 1]]
+    return duplicate_groups, adjacent
+
+
+def format_duplicate_report(paths, duplicate_groups, adjacent, limit=DUPLICATE_REPORT_LIMIT):
+    """生成重复图片报告，相邻重复（多半是同一页扫描了两次）排在前面"""
+    name = os.path.basename
+    lines = []
+    if adjacent:
+        lines.append(f'相邻的重复图片（{len(adjacent)} 处，可能是同一页扫描了两次）：')
+        lines.extend(f'  {name(paths[i])} = {name(paths[i + 1])}' for i in adjacent[:limit])
+        if len(adjacent) > limit:
+            lines.append(f'  ……另有 {len(adjacent) - limit} 处')
+    if duplicate_groups:
+        lines.append(f'内容完全相同的图片（{len(duplicate_groups)} 组）：')
+        lines.extend('  ' + ' = '.join(name(paths[i]) for i in indexes)
+                     for indexes in duplicate_groups[:limit])
+        if len(duplicate_groups) > limit:
+            lines.append(f'  ……另有 {len(duplicate_groups) - limit} 组')
+    return '\n'.join(lines)
+
+
+# 每个人员目录下的校验清单，格式与 sha256sum 相同，可用 `sha256sum -c SHA256SUMS.txt` 复核
+MANIFEST_NAME = 'SHA256SUMS.txt'
+
+
+def read_manifest(path):
+    """读取校验清单，返回 {文件名: 校验值}；文件不存在时返回空字典"""
+    digests = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                digest, sep, name = line.rstrip('\n').partition(' ')
+                if sep and name:
+                    digests[name[1:] if name[0] in '* ' else name] = digest
+    except FileNotFoundError:
+        pass
+    return digests
+
+
+def write_manifest(directory, digests):
+    """将 {文件名: 校验值} 合并写入目录下的校验清单"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    merged = read_manifest(path)
+    merged.update(digests)
+    atomic_write(path, ''.join(f'{merged[name]} *{name}\n' for name in sorted(merged)))
+    return path
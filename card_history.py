@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 撤销/重做
+证件类型列表每次修改后与上一次的内容比较，只记录变化的部分（插入、删除、移动、重命名），
+不保存整个列表的副本，历史记录可以很深而不占用多少内存
+"""
+
+from collections import deque
+
+
+# 最多保留的撤销步数，超出后丢弃最早的记录
+DEFAULT_MAX_DEPTH = 1000
+
+
+def _diff(old, new):
+    """比较两个列表，返回一条操作记录；内容相同时返回 None
+
+    操作记录为：
+      ('insert', [(行, 文本), ...])      插入若干项，行号为插入后的位置，升序
+      ('delete', [(行, 文本), ...])      删除若干项，行号为删除前的位置，升序
+      ('move', 原行, 新行)               移动一项
+      ('rename', 行, 原文本, 新文本)     修改一项
+      ('replace', 行, [原文本], [新文本]) 其他变化：替换从该行开始的一段
+    """
+    if old == new:
+        return None
+    # 去掉相同的开头和结尾，只比较中间变化的一段
+    start = 0
+    limit = min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+    old_mid, new_mid = old[start:end_old], new[start:end_new]
+
+    if len(old_mid) < len(new_mid):
+        rows = _extra_rows(old_mid, new_mid)
+        if rows is not None:
+            return ('insert', [(start + i, new_mid[i]) for i in rows])
+    elif len(old_mid) > len(new_mid):
+        rows = _extra_rows(new_mid, old_mid)
+        if rows is not None:
+            return ('delete', [(start + i, old_mid[i]) for i in rows])
+    elif len(old_mid) == 1:
+        return ('rename', start, old_mid[0], new_mid[0])
+    else:
+        last = start + len(old_mid) - 1
+        if old_mid[0] == new_mid[-1] and old_mid[1:] == new_mid[:-1]:
+            return ('move', start, last)
+        if old_mid[-1] == new_mid[0] and old_mid[:-1] == new_mid[1:]:
+            return ('move', last, start)
+    return ('replace', start, old_mid, new_mid)
+
+
+def _extra_rows(short, long):
+    """short 是 long 的子序列时返回 long 中多出的下标列表，否则返回 None"""
+    rows = []
+    i = 0
+    for j, text in enumerate(long):
+        if i < len(short) and short[i] == text:
+            i += 1
+        else:
+            rows.append(j)
+    return rows if i == len(short) else None
+
+
+def _forward_steps(op):
+    """把操作记录展开为依次执行的基本步骤：
+    ('insert', 行, 文本)、('delete', 行)、('move', 原行, 新行)、('set', 行, 文本)
+    """
+    kind = op[0]
+    if kind == 'insert':
+        return [('insert', row, text) for row, text in op[1]]
+    if kind == 'delete':
+        # 从后往前删，前面的行号不受影响
+        return [('delete', row) for row, _ in reversed(op[1])]
+    if kind == 'move':
+        _, from_row, to_row = op
+        return [('move', from_row, to_row)]
+    if kind == 'rename':
+        return [('set', op[1], op[3])]
+    _, start, old_mid, new_mid = op
+    return ([('delete', start) for _ in old_mid]
+            + [('insert', start + i, text) for i, text in enumerate(new_mid)])
+
+
+def _inverse(op):
+    kind = op[0]
+    if kind == 'insert':
+        return ('delete', op[1])
+    if kind == 'delete':
+        return ('insert', op[1])
+    if kind == 'move':
+        return ('move', op[2], op[1])
+    if kind == 'rename':
+        return ('rename', op[1], op[3], op[2])
+    return ('replace', op[1], op[3], op[2])
+
+
+def apply_steps(items, steps):
+    """在列表上执行基本步骤（界面上的列表控件按同样的步骤修改）"""
+    for step in steps:
+        kind = step[0]
+        if kind == 'insert':
+            items.insert(step[1], step[2])
+        elif kind == 'delete':
+            del items[step[1]]
+        elif kind == 'move':
+            items.insert(step[2], items.pop(step[1]))
+        else:
+            items[step[1]] = step[2]
+
+
+class EditHistory:
+    """列表的撤销/重做记录
+
+    record() 传入修改后的列表，与记录的当前内容比较后保存变化；
+    undo()/redo() 返回需要执行的基本步骤（见 apply_steps），没有可撤销/重做的内容时返回 None。
+    """
+
+    def __init__(self, items=(), max_depth=DEFAULT_MAX_DEPTH):
+        self._undo = deque(maxlen=max_depth)
+        self._redo = []
+        self.items = list(items)
+
+    def reset(self, items):
+        """重新开始记录（例如重新加载列表后）"""
+        self._undo.clear()
+        self._redo.clear()
+        self.items = list(items)
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def __len__(self):
+        return len(self._undo)
+
+    def record(self, items):
+        """记录一次修改，返回操作记录；内容未变化时返回 None"""
+        op = _diff(self.items, items)
+        if op is None:
+            return None
+        self._undo.append(op)
+        self._redo.clear()
+        self.items = list(items)
+        return op
+
+    def undo(self):
+        if not self._undo:
+            return None
+        op = self._undo.pop()
+        self._redo.append(op)
+        steps = _forward_steps(_inverse(op))
+        apply_steps(self.items, steps)
+        return steps
+
+    def redo(self):
+        if not self._redo:
+            return None
+        op = self._redo.pop()
+        self._undo.append(op)
+        steps = _forward_steps(op)
+        apply_steps(self.items, steps)
+        return steps
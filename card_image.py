@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 图片缩小/重新编码
+报送单位限制文件大小和分辨率：复制完成的图片交给线程池，用 QImageReader 解码（解码时直接缩小）、
+QImageWriter 按质量或大小上限重新编码后原地替换，与复制同时进行；已在限制内的图片不改动
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PyQt5.QtCore import QBuffer, QIODevice, QSize
+    from PyQt5.QtGui import QImageReader, QImageWriter
+except ImportError:  # 命令行环境可能未安装 PyQt5
+    QImageReader = None
+
+from card_engine import BatchError
+from card_fileio import atomic_write
+
+
+DEFAULT_QUALITY = 85
+# 按大小上限降低质量时的最低质量
+MIN_QUALITY = 40
+# 最低质量仍超出大小上限时继续缩小尺寸的最多次数
+MAX_SCALE_ROUNDS = 4
+DEFAULT_TRANSFORM_WORKERS = min(4, os.cpu_count() or 1)
+# 可以重新编码的扩展名及对应的 Qt 格式；其他格式（HEIC、RAW 等）保持原样
+TRANSFORM_FORMATS = {
+    '.jpg': b'jpg', '.jpeg': b'jpg', '.png': b'png', '.bmp': b'bmp', '.webp': b'webp',
+}
+
+# after 为处理后的字节数，未改动时为 None；size 为处理后的 (宽, 高)；error 为失败原因
+TransformResult = namedtuple('TransformResult', 'path before after size error')
+
+
+def transform_available():
+    return QImageReader is not None
+
+
+def _encode(image, image_format, quality):
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    writer = QImageWriter(buffer, image_format)
+    writer.setQuality(quality)
+    if not writer.write(image):
+        raise OSError(writer.errorString())
+    buffer.close()
+    return bytes(buffer.data())
+
+
+def transform_image(path, max_edge=None, max_bytes=None, quality=DEFAULT_QUALITY):
+    """把图片缩小到最长边不超过 max_edge、文件不超过 max_bytes 字节，原地替换，返回 TransformResult
+
+    只有 JPEG 会为满足大小上限而降低质量（不低于 MIN_QUALITY），仍超出时按比例继续缩小尺寸。
+    """
+    before = os.path.getsize(path)
+    image_format = TRANSFORM_FORMATS.get(os.path.splitext(path)[1].lower())
+    if image_format is None:
+        return TransformResult(path, before, None, None, None)
+
+    reader = QImageReader(path)
+    size = reader.size()
+    if not size.isValid():
+        return TransformResult(path, before, None, None, f'无法读取图片：{reader.errorString()}')
+    width, height = size.width(), size.height()
+    longest = max(width, height)
+    too_large = bool(max_edge) and longest > max_edge
+    too_heavy = bool(max_bytes) and before > max_bytes
+    if not too_large and not too_heavy:
+        return TransformResult(path, before, None, (width, height), None)
+
+    scale = max_edge / longest if too_large else 1.0
+    for _ in range(MAX_SCALE_ROUNDS):
+        # 每个 QImageReader 只能读取一次；setScaledSize 让解码器直接输出缩小后的图片
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        if scale < 1.0:
+            reader.setScaledSize(QSize(max(1, round(width * scale)), max(1, round(height * scale))))
+        image = reader.read()
+        if image.isNull():
+            return TransformResult(path, before, None, None, f'无法读取图片：{reader.errorString()}')
+        data = _encode(image, image_format, quality)
+        if max_bytes and len(data) > max_bytes and image_format == b'jpg':
+            # 二分查找不超过大小上限的最高质量
+            low, high, best = MIN_QUALITY, quality - 1, None
+            while low <= high:
+                middle = (low + high) // 2
+                candidate = _encode(image, image_format, middle)
+                if len(candidate) <= max_bytes:
+                    best, low = candidate, middle + 1
+                else:
+                    high = middle - 1
+            if best is not None:
+                data = best
+        if not max_bytes or len(data) <= max_bytes:
+            break
+        # 按面积比例继续缩小
+        scale *= max(0.5, (max_bytes / len(data)) ** 0.5 * 0.9)
+    else:
+        return TransformResult(path, before, None, None,
+                               f'无法压缩到 {max_bytes // 1024} KB 以内（最小 {len(data) // 1024} KB）')
+
+    atomic_write(path, data)
+    return TransformResult(path, before, len(data), (image.width(), image.height()), None)
+
+
+class ImageTransform:
+    """图片处理阶段：submit() 提交已复制完成的图片，在线程池中处理；results() 等待全部完成
+
+    QImageReader/QImageWriter 可以在多个线程中同时使用（每个线程各自的对象）。
+    """
+
+    def __init__(self, max_edge=None, max_bytes=None, quality=DEFAULT_QUALITY,
+                 workers=DEFAULT_TRANSFORM_WORKERS):
+        if not transform_available():
+            raise BatchError('缩小/压缩图片需要安装 PyQt5')
+        self.max_edge = max_edge
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.workers = max(1, workers)
+        self._pool = None
+        self._pending = []  # [(路径, future)]
+
+    def describe(self):
+        limits = []
+        if self.max_edge:
+            limits.append(f'最长边 {self.max_edge} 像素')
+        if self.max_bytes:
+            limits.append(f'不超过 {self.max_bytes // 1024} KB')
+        return '，'.join(limits + [f'质量 {self.quality}'])
+
+    def submit(self, path):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        future = self._pool.submit(transform_image, path, self.max_edge, self.max_bytes,
+                                   self.quality)
+        self._pending.append((path, future))
+
+    def results(self, cancel=False):
+        """等待已提交的图片处理完成，返回 TransformResult 列表；cancel 为 True 时放弃尚未开始的图片"""
+        if cancel:
+            for _, future in self._pending:
+                future.cancel()
+        results = []
+        for path, future in self._pending:
+            if future.cancelled():
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(TransformResult(path, None, None, None, str(e)))
+        self._pending = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        return results
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 处理记录（断点续传）
+每个输出目录下保存一份 JSON Lines 记录，逐条记录已完成的 (源文件, 目标文件, 大小, 修改时间[, 校验值])，
+中断后再次处理同一批数据时可跳过已完成的文件；全部完成后记录文件自动删除
+"""
+
+import hashlib
+import json
+import os
+import time
+
+
+JOURNAL_NAME = '.card_journal.jsonl'
+
+
+def batch_fingerprint(src_dir, naming_format, card_types, name_id_pairs):
+    """同一批数据（源目录、命名格式、证件类型、人员名单）得到相同的指纹"""
+    payload = json.dumps([src_dir, naming_format, list(card_types), list(name_id_pairs)],
+                         ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def read_fingerprint(journal_path):
+    """读取记录文件首行中的批次指纹，无法读取时返回 None"""
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            return json.loads(f.readline()).get('run')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def find_unfinished_run(base_dst_dir, dir_prefix, fingerprint):
+    """在目标文件夹中查找同一批数据未完成的输出目录（取最近修改的一个）"""
+    candidates = []
+    try:
+        with os.scandir(base_dst_dir) as entries:
+            for entry in entries:
+                if not entry.name.startswith(dir_prefix) or not entry.is_dir():
+                    continue
+                journal_path = os.path.join(entry.path, JOURNAL_NAME)
+                if read_fingerprint(journal_path) == fingerprint:
+                    candidates.append((os.path.getmtime(journal_path), entry.path))
+    except OSError:
+        return None
+    return max(candidates)[1] if candidates else None
+
+
+class RunJournal:
+    """一次处理的记录文件
+
+    record() 只写入内存缓冲区，累计 FLUSH_ENTRIES 条或超过 FLUSH_INTERVAL 秒才批量写盘，
+    每次写盘后 fsync，避免记录本身成为瓶颈的同时保证断电后最多丢失一个批次。
+    只应在单个线程中调用。
+    """
+
+    FLUSH_ENTRIES = 256
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, output_dir, fingerprint):
+        self.path = os.path.join(output_dir, JOURNAL_NAME)
+        self.fingerprint = fingerprint
+        self.completed = {}  # 目标文件 -> (源文件, 大小, 修改时间, 校验值或 None)
+        self._buffer = []
+        self._file = None
+        self._last_flush = time.monotonic()
+
+    def load(self):
+        """读取已有记录，返回已完成的条数；指纹不一致时忽略原记录"""
+        if read_fingerprint(self.path) != self.fingerprint:
+            return 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            next(f, None)
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.completed[entry['dst']] = (entry['src'], entry['size'], entry['mtime_ns'],
+                                                    entry.get('sha256'))
+                except (ValueError, KeyError, TypeError):
+                    # 中断时最后一行可能不完整
+                    continue
+        return len(self.completed)
+
+    def open(self):
+        """打开记录文件准备追加，新文件先写入批次指纹"""
+        is_new = read_fingerprint(self.path) != self.fingerprint
+        needs_newline = False
+        if not is_new:
+            # 中断时最后一行可能不完整，追加前先换行，避免与新记录粘在一起
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    needs_newline = f.read(1) != b'\n'
+        self._file = open(self.path, 'w' if is_new else 'a', encoding='utf-8')
+        if is_new:
+            self._file.write(json.dumps({'run': self.fingerprint, 'started': time.time()}) + '\n')
+            self._file.flush()
+        elif needs_newline:
+            self._file.write('\n')
+
+    def is_completed(self, src_file, dst_file):
+        """目标文件已在记录中，且源文件和目标文件都未发生变化"""
+        entry = self.completed.get(dst_file)
+        if entry is None or entry[0] != src_file:
+            return False
+        try:
+            src_stat = os.stat(src_file)
+            return (src_stat.st_size == entry[1] and src_stat.st_mtime_ns == entry[2]
+                    and os.path.getsize(dst_file) == entry[1])
+        except OSError:
+            return False
+
+    def digest(self, dst_file):
+        """记录中目标文件的校验值（校验复制时记录），没有时返回 None"""
+        entry = self.completed.get(dst_file)
+        return entry[3] if entry is not None else None
+
+    def record(self, src_file, dst_file, size, mtime_ns, digest=None):
+        entry = {'src': src_file, 'dst': dst_file, 'size': size, 'mtime_ns': mtime_ns}
+        if digest is not None:
+            entry['sha256'] = digest
+        self._buffer.append(json.dumps(entry, ensure_ascii=False))
+        if (len(self._buffer) >= self.FLUSH_ENTRIES
+                or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer or self._file is None:
+            return
+        self._file.write('\n'.join(self._buffer) + '\n')
+        self._buffer = []
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self, finished=False):
+        """写入剩余记录；finished 为 True 时表示整批已完成，删除记录文件"""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+        if finished:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
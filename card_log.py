@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 日志存储
+内存中只保留最近若干行供界面显示（环形缓冲），完整日志追加写入磁盘文件，导出时从文件流式复制
+"""
+
+import os
+import shutil
+import time
+from collections import deque
+
+
+# 界面中保留的日志行数
+DEFAULT_LOG_LIMIT = 10000
+# 日志目录中保留的会话日志文件数
+KEEP_LOG_FILES = 20
+
+
+def session_log_path(log_dir, keep=KEEP_LOG_FILES):
+    """在 log_dir 下为本次运行创建日志文件名，并删除较早的日志文件"""
+    os.makedirs(log_dir, exist_ok=True)
+    try:
+        old_logs = sorted(name for name in os.listdir(log_dir) if name.endswith('.log'))
+        for name in old_logs[:max(0, len(old_logs) - keep + 1)]:
+            os.remove(os.path.join(log_dir, name))
+    except OSError as e:
+        print(f'清理旧日志失败: {e}')
+    return os.path.join(log_dir, f"运行日志_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.log")
+
+
+class LogStore:
+    """日志存储（只应在界面线程中使用）
+
+    lines 为最近 limit 行；spill_path 不为空时每行同时写入该文件，作为完整记录。
+    """
+
+    def __init__(self, spill_path=None, limit=DEFAULT_LOG_LIMIT):
+        self.limit = limit
+        self.lines = deque(maxlen=limit)
+        self.total = 0
+        self.spill_path = spill_path
+        self._spill = None
+
+    @staticmethod
+    def split(messages):
+        """多行消息拆成单行，便于列表按行显示"""
+        lines = []
+        for message in messages:
+            lines.extend(str(message).split('\n'))
+        return lines
+
+    def overflow(self, count):
+        """追加 count 行后需要丢弃的最早行数"""
+        return max(0, len(self.lines) + min(count, self.limit) - self.limit)
+
+    def discard_oldest(self, count):
+        for _ in range(min(count, len(self.lines))):
+            self.lines.popleft()
+
+    def append(self, lines):
+        """追加已拆分的单行日志"""
+        if not lines:
+            return
+        self.total += len(lines)
+        self.lines.extend(lines)
+        if self.spill_path:
+            try:
+                if self._spill is None:
+                    self._spill = open(self.spill_path, 'a', encoding='utf-8')
+                self._spill.write('\n'.join(lines) + '\n')
+            except OSError as e:
+                # 写日志文件失败不影响处理，之后只保留内存中的日志
+                print(f'写入日志文件失败: {e}')
+                self.spill_path = None
+
+    def flush(self):
+        if self._spill is not None:
+            self._spill.flush()
+
+    def export(self, target_path):
+        """导出完整日志；没有日志文件时导出内存中的最近记录"""
+        if self.spill_path and self._spill is not None:
+            self.flush()
+            with open(self.spill_path, 'rb') as src, open(target_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            return
+        with open(target_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.lines))
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
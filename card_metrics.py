@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 运行统计
+记录每个阶段的耗时、吞吐量和单个文件复制延迟，生成界面摘要和 JSON 运行报告，
+便于对比不同版本、不同存储上的性能
+"""
+
+import heapq
+import json
+import os
+import platform
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from card_fileio import atomic_write
+
+
+# 报告中列出的最慢文件数
+SLOWEST_FILES = 10
+REPORT_PREFIX = '处理报告'
+REPORT_VERSION = 1
+
+
+def percentile(sorted_values, p):
+    """最近秩法百分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class RunMetrics:
+    """一次处理的统计数据（只应在调用线程中更新）
+
+    phase() 统计各阶段耗时，同名阶段累加；record_copy() 记录单个文件的复制耗时；
+    record_transform() 记录缩小/压缩后的图片大小。
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.phases = OrderedDict()
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self._latencies = array('d')
+        self._slowest = []  # 小顶堆 (耗时, 源文件, 大小)
+        self.transformed = 0
+        self.transform_failed = 0
+        self.transform_bytes_before = 0
+        self.transform_bytes_after = 0
+        self.transform_largest = 0
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record_copy(self, src_file, size, seconds):
+        self.files += 1
+        self.bytes += size or 0
+        self._latencies.append(seconds)
+        item = (seconds, src_file, size)
+        if len(self._slowest) < SLOWEST_FILES:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def record_transform(self, before, after):
+        self.transformed += 1
+        self.transform_bytes_before += before
+        self.transform_bytes_after += after
+        self.transform_largest = max(self.transform_largest, after)
+
+    def latency_percentiles(self):
+        """复制延迟的 p50/p95/p99（秒）"""
+        values = sorted(self._latencies)
+        return OrderedDict((f'p{p}', percentile(values, p)) for p in (50, 95, 99))
+
+    def slowest_files(self):
+        return sorted(self._slowest, reverse=True)
+
+    def throughput(self):
+        """复制阶段的 (文件/秒, MB/秒)"""
+        seconds = self.phases.get('复制', 0.0)
+        if seconds <= 0:
+            return 0.0, 0.0
+        return self.files / seconds, self.bytes / seconds / (1024 * 1024)
+
+    def summary_lines(self):
+        lines = ['各阶段耗时：' + '，'.join(f'{name} {seconds:.2f}s'
+                                         for name, seconds in self.phases.items())]
+        files_per_second, mb_per_second = self.throughput()
+        lines.append(f'复制 {self.files} 个文件：{files_per_second:.1f} 个/秒，{mb_per_second:.1f} MB/秒')
+        latencies = self.latency_percentiles()
+        if latencies['p50'] is not None:
+            lines.append('单个文件复制耗时：' + '，'.join(
+                f'{name} {seconds * 1000:.1f}ms' for name, seconds in latencies.items()))
+        slowest = self.slowest_files()[:3]
+        if slowest:
+            lines.append('最慢的文件：' + '，'.join(
+                f'{os.path.basename(path)} {seconds * 1000:.0f}ms' for seconds, path, _ in slowest))
+        if self.transformed or self.transform_failed:
+            line = (f'压缩图片 {self.transformed} 张：{self.transform_bytes_before / 1024 / 1024:.1f} MB'
+                    f' -> {self.transform_bytes_after / 1024 / 1024:.1f} MB')
+            if self.transformed:
+                line += (f'，平均 {self.transform_bytes_after / self.transformed / 1024:.0f} KB'
+                         f'，最大 {self.transform_largest / 1024:.0f} KB')
+            if self.transform_failed:
+                line += f'，{self.transform_failed} 张失败'
+            lines.append(line)
+        return lines
+
+    def to_dict(self, **extra):
+        files_per_second, mb_per_second = self.throughput()
+        report = OrderedDict()
+        report['report_version'] = REPORT_VERSION
+        report['started'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started))
+        report['python'] = sys.version.split()[0]
+        report['platform'] = platform.platform()
+        report.update(extra)
+        report['phases_s'] = OrderedDict((name, round(seconds, 6))
+                                         for name, seconds in self.phases.items())
+        report['files'] = self.files
+        report['failed'] = self.failed
+        report['bytes'] = self.bytes
+        report['files_per_s'] = round(files_per_second, 3)
+        report['mb_per_s'] = round(mb_per_second, 3)
+        report['copy_latency_s'] = OrderedDict(
+            (name, None if seconds is None else round(seconds, 6))
+            for name, seconds in self.latency_percentiles().items())
+        report['slowest_files'] = [{'src': path, 'size': size, 'seconds': round(seconds, 6)}
+                                   for seconds, path, size in self.slowest_files()]
+        if self.transformed or self.transform_failed:
+            report['transform'] = OrderedDict([
+                ('files', self.transformed),
+                ('failed', self.transform_failed),
+                ('bytes_before', self.transform_bytes_before),
+                ('bytes_after', self.transform_bytes_after),
+                ('largest_bytes', self.transform_largest),
+            ])
+        return report
+
+    def write_report(self, directory, **extra):
+        """在 directory 下写入 JSON 运行报告，返回报告路径
+
+        同一秒内已有报告（例如取消后立即继续处理）时文件名加上 _2、_3……，不覆盖之前的报告。
+        """
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started))
+        number = 1
+        while True:
+            suffix = f'_{number}' if number > 1 else ''
+            path = os.path.join(directory, f'{REPORT_PREFIX}_{stamp}{suffix}.json')
+            try:
+                # 先独占创建文件占用该名称，多个进程同时写报告时也不会重名
+                os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+                break
+            except FileExistsError:
+                number += 1
+        try:
+            atomic_write(path, json.dumps(self.to_dict(**extra), ensure_ascii=False, indent=2))
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 命名格式
+命名格式中可以有多个占位符，例如 图片 {n}、IMG_{n:04}、{date}_{station}_{n}；
+每种格式只编译一次，得到匹配文件名的正则和提取各字段的排序键（按占位符顺序组成的元组）
+"""
+
+import functools
+import re
+
+
+# 占位符：{名称} 或 {名称:类型}；{{ 和 }} 表示字面的大括号
+_PLACEHOLDER = re.compile(r'\{\{|\}\}|\{(\w*)(?::([^{}]*))?\}|[{}]')
+# 序号字段的名称，每个命名格式必须有且只有一个
+SEQUENCE_FIELD = 'n'
+# 按名称确定类型的字段（未指定类型时）：正则、是否按整数比较、示例值
+_NAMED_FIELDS = {
+    'n': (r'\d+', True, 1),
+    'date': (r'\d{8}', False, '20240101'),
+    'time': (r'\d{6}', False, '120000'),
+}
+# 其他字段默认为文本（至少一个字符）
+_TEXT_FIELD = (r'.+?', False, 'A')
+# 文本中大括号的写法说明，用于错误提示
+_BRACE_HINT = '大括号须成对出现，字面的大括号写作 {{ 或 }}'
+
+
+class NamingFormatError(ValueError):
+    """命名格式无效，消息可直接展示给用户"""
+
+
+class NamingTemplate:
+    """编译后的命名格式
+
+    sort_key(文件名去掉扩展名) 返回按占位符顺序排列的字段值元组（整数字段为 int），不匹配时返回 None；
+    与原来只有 {n} 时一样从文件名开头匹配，格式以文本字段结尾时要求匹配到文件名末尾。
+    """
+
+    def __init__(self, naming_format):
+        self.naming_format = naming_format
+        self.fields = []  # [(名称, 是否按整数比较, 最小位数, 示例值)]
+        self._pieces = []  # 字面文本或字段下标，用于 format()
+        pattern = []
+        position = 0
+        ends_with_text = False
+        for match in _PLACEHOLDER.finditer(naming_format):
+            literal = naming_format[position:match.start()]
+            position = match.end()
+            if literal:
+                pattern.append(re.escape(literal))
+                self._pieces.append(literal)
+                ends_with_text = False
+            token = match.group(0)
+            if token in ('{{', '}}'):
+                pattern.append(re.escape(token[0]))
+                self._pieces.append(token[0])
+                ends_with_text = False
+                continue
+            name = match.group(1)
+            if token == '{}' or token.startswith('{:'):
+                raise NamingFormatError(f'命名格式中的 “{token}” 缺少占位符名称')
+            if not name:
+                raise NamingFormatError(f'命名格式中的 “{token}” 无效：{_BRACE_HINT}')
+            if any(field[0] == name for field in self.fields):
+                raise NamingFormatError(f'命名格式中的 {{{name}}} 重复')
+            regex, numeric, width, example = self._field_type(name, match.group(2))
+            pattern.append(f'({regex})')
+            self._pieces.append(len(self.fields))
+            self.fields.append((name, numeric, width, example))
+            ends_with_text = regex == _TEXT_FIELD[0]
+        literal = naming_format[position:]
+        if literal:
+            pattern.append(re.escape(literal))
+            self._pieces.append(literal)
+            ends_with_text = False
+        if not any(field[0] == SEQUENCE_FIELD for field in self.fields):
+            raise NamingFormatError('命名格式必须包含 {n}')
+        if ends_with_text:
+            pattern.append('$')
+        self.pattern = re.compile(''.join(pattern))
+        self.sort_key = self._build_extractor()
+
+    @staticmethod
+    def _field_type(name, spec):
+        """返回 (正则, 是否按整数比较, 最小位数, 示例值)"""
+        if spec is None or spec == '':
+            regex, numeric, example = _NAMED_FIELDS.get(name, _TEXT_FIELD)
+            return regex, numeric, 0, example
+        if spec == 'd':
+            return r'\d+', True, 0, 1
+        if spec == 's':
+            return _TEXT_FIELD[0], False, 0, _TEXT_FIELD[2]
+        if spec.isdigit():
+            # {n:04}：至少 4 位数字（补零），超过后自然变长
+            width = int(spec)
+            return (r'\d{%d,}' % width if width > 1 else r'\d+'), True, width, 1
+        raise NamingFormatError(f'命名格式中 {{{name}:{spec}}} 的类型无效，'
+                                f'可用：d 数字、s 文本、04 等补零位数')
+
+    def _build_extractor(self):
+        match = self.pattern.match
+        numeric = [field[1] for field in self.fields]
+        if numeric == [True]:
+            # 只有序号（最常见）：不逐个字段判断类型
+            def sort_key(base_name):
+                m = match(base_name)
+                return (int(m.group(1)),) if m else None
+            return sort_key
+
+        def sort_key(base_name):
+            m = match(base_name)
+            if not m:
+                return None
+            return tuple(int(value) if is_int else value
+                         for value, is_int in zip(m.groups(), numeric))
+        return sort_key
+
+    def format(self, **values):
+        """按格式生成文件名（不含扩展名），未给出的字段使用示例值"""
+        parts = []
+        for piece in self._pieces:
+            if isinstance(piece, str):
+                parts.append(piece)
+                continue
+            name, numeric, width, example = self.fields[piece]
+            value = values.get(name, example)
+            parts.append(f'{int(value):0{width}d}' if numeric else str(value))
+        return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=32)
+def compile_naming_format(naming_format):
+    """编译命名格式（按格式缓存），格式无效时抛出 NamingFormatError"""
+    return NamingTemplate(naming_format)
+
+
+def naming_format_error(naming_format):
+    """检查命名格式，无效时返回原因，有效时返回 None"""
+    try:
+        template = compile_naming_format(naming_format)
+    except NamingFormatError as e:
+        return str(e)
+    # 生成的示例文件名应能被自身匹配，且不能含路径分隔符
+    example = template.format()
+    if '/' in example or '\\' in example:
+        return '命名格式中不能包含 / 或 \\'
+    if template.sort_key(example) is None:
+        return '命名格式无法匹配按该格式命名的文件，请检查相邻的占位符之间是否有分隔符'
+    return None
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 人员名单
+姓名+身份证号的校验，以及从 txt/CSV/TSV 文件流式导入名单（逐行解析校验，只保留每人一条记录）
+"""
+
+import csv
+import os
+
+# NumPy 导入较慢（约 0.1 秒），启动时不导入，第一次需要向量化校验时由 load_numpy() 导入
+np = None
+_numpy_checked = False
+
+
+class RosterError(Exception):
+    """名单文件无法读取或列设置无效"""
+
+
+# GB 11643 / ISO 7064 MOD 11-2：前17位的加权系数，以及 (加权和 % 11) 对应的校验码
+_ID_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_ID_CHECK_CODES = '10X98765432'
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# 批量校验超过该数量且安装了 NumPy 时使用向量化校验
+VECTORIZE_THRESHOLD = 2000
+
+
+def id_check_code(first17):
+    """根据前17位计算校验码"""
+    total = sum(int(c) * w for c, w in zip(first17, _ID_WEIGHTS))
+    return _ID_CHECK_CODES[total % 11]
+
+
+def id_number_error(id_num, check_digit=True):
+    """返回身份证号不合格的原因，合格时返回 None"""
+    # 身份证号必须是18位
+    if len(id_num) != 18:
+        return f'身份证号应为18位（实际{len(id_num)}位）'
+
+    # 前17位必须是数字
+    if not (id_num[:17].isascii() and id_num[:17].isdigit()):
+        return '身份证号前17位必须是数字'
+
+    # 最后一位可以是数字或X（大写或小写）
+    last_char = id_num[17].upper()
+    if last_char not in '0123456789X':
+        return '身份证号最后一位必须是数字或X'
+
+    # 验证出生日期部分（第7-14位），年份范围 1900-2100
+    year = int(id_num[6:10])
+    month = int(id_num[10:12])
+    day = int(id_num[12:14])
+    if year < 1900 or year > 2100 or month < 1 or month > 12 or day < 1:
+        return '身份证号中的出生日期无效'
+    days = _DAYS_IN_MONTH[month]
+    if month == 2 and ((year % 4 == 0 and year % 100 != 0) or year % 400 == 0):
+        days = 29
+    if day > days:
+        return '身份证号中的出生日期无效'
+
+    # 校验码
+    if check_digit and id_check_code(id_num[:17]) != last_char:
+        return '身份证号校验码错误'
+
+    return None
+
+
+def is_valid_id_number(id_num, check_digit=True):
+    """验证身份证号格式（长度、出生日期、校验码）"""
+    return id_number_error(id_num, check_digit) is None
+
+
+def load_numpy():
+    """导入并返回 NumPy，未安装时返回 None（只尝试一次）"""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # 可选依赖，未安装时逐个校验
+            np = None
+        _numpy_checked = True
+    return np
+
+
+def find_invalid_id_numbers(id_numbers, check_digit=True):
+    """批量校验身份证号，返回全部不合格的 [(下标, 原因)]
+
+    数量较多且安装了 NumPy 时向量化校验，否则逐个校验。
+    """
+    if len(id_numbers) >= VECTORIZE_THRESHOLD and load_numpy() is not None:
+        return _find_invalid_id_numbers_numpy(id_numbers, check_digit)
+    failures = []
+    for i, id_num in enumerate(id_numbers):
+        reason = id_number_error(id_num, check_digit)
+        if reason is not None:
+            failures.append((i, reason))
+    return failures
+
+
+def _valid_id_matrix(raw, check_digit):
+    """(n, 18) 的 uint8 字节矩阵，每行一个号码，返回每个号码是否合格"""
+    # uint8 减法会回绕，小于 '0' 的字符变成很大的值
+    ok = ((raw[:, :17] - 48) <= 9).all(axis=1)
+    last = raw[:, 17]
+    last = np.where(last == ord('x'), ord('X'), last)
+    ok &= ((last - 48) <= 9) | (last == ord('X'))
+
+    def number(start, end):
+        value = np.zeros(len(raw), dtype=np.int32)
+        for col in range(start, end):
+            value = value * 10 + (raw[:, col].astype(np.int32) - 48)
+        return value
+
+    year = number(6, 10)
+    month = number(10, 12)
+    day = number(12, 14)
+    month_ok = (month >= 1) & (month <= 12)
+    days = np.asarray(_DAYS_IN_MONTH, dtype=np.int32)[np.where(month_ok, month, 0)]
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    days = days + ((month == 2) & leap)
+    ok &= (year >= 1900) & (year <= 2100) & month_ok & (day >= 1) & (day <= days)
+
+    if check_digit:
+        total = np.zeros(len(raw), dtype=np.int32)
+        for col, weight in enumerate(_ID_WEIGHTS):
+            total += (raw[:, col].astype(np.int32) - 48) * weight
+        codes = np.frombuffer(_ID_CHECK_CODES.encode('ascii'), dtype=np.uint8)
+        ok &= codes[total % 11] == last
+    return ok
+
+
+def _find_invalid_id_numbers_numpy(id_numbers, check_digit):
+    """向量化校验：18位的号码拼成 (n, 18) 的字节矩阵整体计算，只对不合格的逐个给出原因"""
+    count = len(id_numbers)
+    lengths = np.fromiter(map(len, id_numbers), dtype=np.int64, count=count)
+    candidates = np.flatnonzero(lengths == 18)
+    suspect = np.ones(count, dtype=bool)
+
+    if candidates.size:
+        if candidates.size == count:
+            joined = ''.join(id_numbers)
+        else:
+            joined = ''.join([id_numbers[i] for i in candidates])
+        # 非 ASCII 字符替换为 '?'，保证每个号码正好 18 字节
+        raw = np.frombuffer(joined.encode('ascii', 'replace'), dtype=np.uint8).reshape(-1, 18)
+        suspect[candidates[_valid_id_matrix(raw, check_digit)]] = False
+
+    failures = []
+    for i in np.flatnonzero(suspect).tolist():
+        reason = id_number_error(id_numbers[i], check_digit)
+        if reason is not None:
+            failures.append((i, reason))
+    return failures
+
+
+def normalize_id_number(id_num):
+    """标准化身份证号，将小写x转换为大写X"""
+    if len(id_num) == 18 and id_num[17].lower() == 'x':
+        return id_num[:17] + 'X'
+    return id_num
+
+
+def is_valid_name_id_format(line):
+    """验证姓名+身份证号格式
+    输入格式：姓名+身份证号
+    例如：李四+110101199001011237
+    返回: True 如果格式正确，False 如果格式不正确
+    """
+    line = line.strip()
+    if not line:
+        return False
+
+    # 检查是否包含+
+    if '+' not in line:
+        return False
+
+    # 用+分割
+    parts = line.split('+', 1)
+    name = parts[0].strip()
+    id_num = parts[1].strip()
+
+    # 检查姓名和身份证号是否为空
+    if not name or not id_num:
+        return False
+
+    # 验证身份证号格式
+    return is_valid_id_number(id_num)
+
+
+def split_roster_text(text):
+    """将多行文本拆分为姓名+身份证号列表（去除空行）"""
+    return [line.strip() for line in text.split('\n') if line.strip()]
+
+
+def describe_name_id_error(line, check_digit=True):
+    """返回姓名+身份证号不合格的原因，合格时返回 None"""
+    line = line.strip()
+    if '+' not in line:
+        return '缺少“+”分隔符'
+    name, id_num = (part.strip() for part in line.split('+', 1))
+    if not name:
+        return '姓名为空'
+    if not id_num:
+        return '身份证号为空'
+    return id_number_error(id_num, check_digit)
+
+
+def find_invalid_roster_lines(lines, check_digit=True):
+    """批量校验 姓名+身份证号 列表，一次返回全部不合格的 [(下标, 原文, 原因)]
+
+    数量较多且安装了 NumPy 时向量化校验，否则逐行校验。
+    """
+    if len(lines) >= VECTORIZE_THRESHOLD and load_numpy() is not None:
+        suspects = _find_roster_suspects_numpy(lines, check_digit)
+    else:
+        suspects = range(len(lines))
+    failures = []
+    for i in suspects:
+        reason = describe_name_id_error(lines[i], check_digit)
+        if reason is not None:
+            failures.append((i, lines[i], reason))
+    return failures
+
+
+# 开头是这些字节时，第一个字符可能是空白（ASCII 空白、控制字符，
+# 或 UTF-8 编码的 U+0085、U+00A0、U+1680、U+2000~U+205F、U+3000），姓名可能为空
+_NAME_START_SUSPECT = bytes(range(0x21)) + b'+\xc2\xe1\xe2\xe3'
+
+
+def _find_roster_suspects_numpy(lines, check_digit):
+    """不逐行拆分：整份名单编码为一段字节，按行尾位置取出每行末尾的 18 字节整体校验，
+    返回需要逐行给出原因的下标（可能含合格的行）
+
+    只有“非空白开头的姓名+18位身份证号”且只有一个“+”的行直接判为合格，其他写法（含空格等）都交给逐行校验。
+    """
+    joined = '\n'.join(lines).encode('utf-8', 'surrogatepass')
+    raw = np.frombuffer(joined, dtype=np.uint8)
+    newlines = np.flatnonzero(raw == ord('\n'))
+    if len(newlines) != len(lines) - 1:  # 有的行内含换行符，无法按行尾定位
+        return range(len(lines))
+    starts = np.empty(len(lines), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = newlines + 1
+    ends = np.empty(len(lines), dtype=np.int64)
+    ends[:-1] = newlines
+    ends[-1] = len(raw)
+
+    # 每行“+”的个数：按各个“+”所在的行计数
+    plus_lines = np.searchsorted(newlines, np.flatnonzero(raw == ord('+')))
+    plus_count = np.bincount(plus_lines, minlength=len(lines))
+    # 姓名至少一个字节，后面紧跟“+”和 18 字节的身份证号
+    ok = (ends - starts >= 20) & (plus_count == 1)
+    rows = np.flatnonzero(ok)
+    ok[rows] = raw[ends[rows] - 19] == ord('+')
+    rows = np.flatnonzero(ok)
+    suspect_start = np.zeros(256, dtype=bool)
+    suspect_start[np.frombuffer(_NAME_START_SUSPECT, dtype=np.uint8)] = True
+    ok[rows] = ~suspect_start[raw[starts[rows]]]
+    rows = np.flatnonzero(ok)
+    id_matrix = raw[ends[rows, None] - 18 + np.arange(18)]
+    ok[rows] = _valid_id_matrix(id_matrix, check_digit)
+    return np.flatnonzero(~ok).tolist()
+
+
+def format_roster_failures(failures, limit=10):
+    """将 find_invalid_roster_lines 的结果整理为提示文字（行号从 1 开始）"""
+    example = '正确格式：姓名+身份证号，例如：李四+110101199001011237'
+    if len(failures) == 1:
+        i, line, reason = failures[0]
+        return f'第{i+1}行格式不正确（{reason}）：{line}\n{example}'
+    lines = [f'共 {len(failures)} 行格式不正确：']
+    lines += [f'第{i+1}行：{reason}：{line}' for i, line, reason in failures[:limit]]
+    if len(failures) > limit:
+        lines.append('……')
+    lines.append(example)
+    return '\n'.join(lines)
+
+
+class RosterImport:
+    """名单导入结果
+
+    entries 为 姓名+身份证号 字符串列表（与手工输入的每行相同）；
+    errors 为 (行号, 原文, 原因)，最多保留 MAX_REPORTED_ERRORS 条，error_count 为总数。
+    """
+
+    MAX_REPORTED_ERRORS = 1000
+
+    def __init__(self, path, encoding):
+        self.path = path
+        self.encoding = encoding
+        self.entries = []
+        self.errors = []
+        self.error_count = 0
+
+    def add_error(self, line_no, text, reason):
+        self.error_count += 1
+        if len(self.errors) < self.MAX_REPORTED_ERRORS:
+            self.errors.append((line_no, text, reason))
+
+    def error_report(self, limit=20):
+        """前 limit 条错误的文字说明"""
+        lines = [f'第{line_no}行：{reason}：{text}' for line_no, text, reason in sorted(self.errors)[:limit]]
+        if self.error_count > limit:
+            lines.append(f'…… 共 {self.error_count} 行有错误')
+        return '\n'.join(lines)
+
+
+# 按扩展名推断分隔符，txt 默认整行为一条 姓名+身份证号
+_DELIMITERS = {'.csv': ',', '.tsv': '\t'}
+# 导入时每累计这么多行校验一次
+VALIDATE_CHUNK = 65536
+# 未指定编码时依次尝试（Excel 导出的中文 CSV 常为 GBK）
+_ENCODINGS = ('utf-8-sig', 'gb18030')
+
+
+def _column_index(ref, header):
+    """列号（从 1 开始）或表头名称 -> 从 0 开始的下标"""
+    if isinstance(ref, int) or str(ref).strip().isdigit():
+        index = int(ref) - 1
+        if index < 0:
+            raise RosterError(f'列号必须从 1 开始：{ref}')
+        return index
+    if header is None or ref not in header:
+        raise RosterError(f'名单文件中找不到列：{ref}')
+    return header.index(ref)
+
+
+def _is_column_name(ref):
+    return ref is not None and not (isinstance(ref, int) or str(ref).strip().isdigit())
+
+
+def read_header(path, delimiter=None, encoding=None):
+    """读取 CSV/TSV 的首行，用于让用户选择列"""
+    if delimiter is None:
+        delimiter = _DELIMITERS.get(os.path.splitext(path)[1].lower())
+    if delimiter is None:
+        return []
+    for enc in ((encoding,) if encoding else _ENCODINGS):
+        try:
+            with open(path, 'r', encoding=enc, newline='') as f:
+                return [cell.strip() for cell in next(csv.reader(f, delimiter=delimiter), [])]
+        except UnicodeDecodeError:
+            continue
+    return []
+
+
+def import_roster(path, column=None, name_column=None, id_column=None,
+                  delimiter=None, encoding=None):
+    """流式读取名单文件并逐行校验，返回 RosterImport
+
+    column 指定 姓名+身份证号 所在列；或用 name_column、id_column 分别指定姓名列和身份证号列。
+    列可以是列号（从 1 开始）或表头名称，使用表头名称时首行视为表头。
+    未指定列时使用第 1 列；首行不合格且不含数字时视为表头并跳过。
+    """
+    if (name_column is None) != (id_column is None):
+        raise RosterError('姓名列和身份证号列需要同时指定')
+    if delimiter is None:
+        delimiter = _DELIMITERS.get(os.path.splitext(path)[1].lower())
+    if delimiter is None and (column not in (None, 1, '1') or name_column is not None):
+        raise RosterError('文本名单按整行读取，选择列时请指定分隔符或使用 CSV/TSV 文件')
+
+    for enc in ((encoding,) if encoding else _ENCODINGS):
+        try:
+            return _import_roster(path, enc, column, name_column, id_column, delimiter)
+        except UnicodeDecodeError:
+            continue
+        except OSError as e:
+            raise RosterError(f'读取名单文件失败：{e}') from e
+    raise RosterError('无法识别名单文件编码（支持 UTF-8、GBK）')
+
+
+def _import_roster(path, encoding, column, name_column, id_column, delimiter):
+    result = RosterImport(path, encoding)
+
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        if delimiter is None:
+            rows = ((line_no, [line.rstrip('\r\n')]) for line_no, line in enumerate(f, 1))
+        else:
+            reader = csv.reader(f, delimiter=delimiter)
+            # line_num 为当前记录结束处的物理行号（带引号的字段可能跨行）
+            rows = ((reader.line_num, row) for row in reader)
+
+        named = _is_column_name(column) or _is_column_name(name_column) or _is_column_name(id_column)
+        header = None
+        first = next(rows, None)
+        if first is None:
+            return result
+        if named:
+            header = [cell.strip() for cell in first[1]]
+
+        if name_column is not None:
+            name_index = _column_index(name_column, header)
+            id_index = _column_index(id_column, header)
+            needed = max(name_index, id_index) + 1
+
+            def cell_text(row):
+                name = row[name_index].strip()
+                id_num = row[id_index].strip()
+                return f'{name}+{id_num}' if name or id_num else ''
+        else:
+            index = _column_index(1 if column is None else column, header)
+            needed = index + 1
+
+            def cell_text(row):
+                return row[index].strip()
+
+        pending = []
+
+        def validate_pending():
+            """成批校验，数量大时走向量化路径"""
+            failed = {i: reason for i, _, reason in
+                      find_invalid_roster_lines([text for _, text in pending])}
+            for i, (line_no, text) in enumerate(pending):
+                if i not in failed:
+                    result.entries.append(text)
+                elif line_no == first[0] and header is None \
+                        and not any(ch.isdigit() for ch in text):
+                    # 首行不合格且不含数字，视为表头
+                    continue
+                else:
+                    result.add_error(line_no, text, failed[i])
+            pending.clear()
+
+        def handle(line_no, row):
+            if not any(cell.strip() for cell in row):
+                return
+            if len(row) < needed:
+                result.add_error(line_no, delimiter.join(row) if delimiter else row[0],
+                                 f'缺少第{needed}列')
+                return
+            text = cell_text(row)
+            if text:
+                pending.append((line_no, text))
+                if len(pending) >= VALIDATE_CHUNK:
+                    validate_pending()
+
+        if header is None:
+            handle(*first)
+        for line_no, row in rows:
+            handle(line_no, row)
+        validate_pending()
+
+    return result
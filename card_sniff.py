@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 文件内容识别
+扫描时只按扩展名筛选文件；预检时再读取每个文件开头的几十个字节（魔数）确认真实格式，
+顺带从 JPEG/PNG/WebP 等文件头读出像素尺寸（不解码），找出空文件、未写完的文件和扩展名不符的文件
+"""
+
+import os
+from collections import OrderedDict, namedtuple
+
+
+# 读取的文件头字节数：足够识别格式和读出 PNG/WebP/GIF/BMP 的尺寸
+HEADER_SIZE = 32
+# 检查结束标记时读取的文件末尾字节数
+TAIL_SIZE = 64
+# 查找 JPEG 尺寸（SOF 段）时最多跳过的段数
+JPEG_MAX_SEGMENTS = 64
+
+FORMAT_NAMES = OrderedDict([
+    ('jpeg', 'JPEG'), ('png', 'PNG'), ('gif', 'GIF'), ('bmp', 'BMP'), ('tiff', 'TIFF'),
+    ('webp', 'WebP'), ('heif', 'HEIF'), ('cr2', 'CR2'), ('ico', 'ICO'),
+])
+# 扩展名对应的格式；NEF/ARW 是 TIFF 结构；.raw 各厂商格式不同，不校验内容
+EXTENSION_FORMATS = {
+    '.jpg': 'jpeg', '.jpeg': 'jpeg', '.jfif': 'jpeg', '.pjpeg': 'jpeg', '.pjp': 'jpeg',
+    '.png': 'png', '.gif': 'gif', '.bmp': 'bmp', '.tif': 'tiff', '.tiff': 'tiff',
+    '.webp': 'webp', '.heic': 'heif', '.heif': 'heif', '.cr2': 'cr2',
+    '.nef': 'tiff', '.arw': 'tiff', '.ico': 'ico', '.raw': None,
+}
+# HEIF/AVIF 的 ftyp 品牌；主品牌不在其中时再看文件头中的兼容品牌
+_HEIF_BRANDS = frozenset([b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'hevm', b'hevs',
+                          b'mif1', b'mif2', b'msf1', b'miaf', b'MiHE', b'MiHA', b'MiHB', b'MiPr',
+                          b'avif', b'avis'])
+# 有多种容器变体、文件头可能识别不了的格式：识别不了时只提示，不阻止处理
+_VARIANT_FORMATS = frozenset(['tiff', 'heif', 'cr2'])
+# JPEG 中带尺寸的帧头（SOF0-SOF15，不含 DHT/JPG/DAC）
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# size/mtime_ns 来自打开后的 fstat；format 为 FORMAT_NAMES 的键，无法识别时为 None；
+# dimensions 为 (宽, 高) 或 None；problem 为会导致处理出错的问题（空文件、内容全为 0、内容无法识别）；
+# 以下两项只提示：incomplete 为文件末尾缺少结束标记等可能未写完的说明（结束标记后另有数据的
+# 正常文件也会如此，例如填充、厂商附加数据、动态照片），mismatch 为内容与扩展名不符的说明
+# （TIFF/HEIF 等有多种变体的格式按文件头识别不了时也记在这里）
+SniffResult = namedtuple('SniffResult',
+                         'path size mtime_ns format dimensions problem incomplete mismatch')
+
+
+def sniff_format(header):
+    """按文件头识别格式，无法识别时返回 None"""
+    if header[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if header[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if header[:2] == b'BM':
+        return 'bmp'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    if header[4:8] == b'ftyp' and _is_heif_ftyp(header):
+        return 'heif'
+    if header[:4] == b'II*\x00':
+        return 'cr2' if header[8:10] == b'CR' else 'tiff'
+    if header[:4] in (b'MM\x00*', b'II+\x00', b'MM\x00+'):  # 后两种为 BigTIFF
+        return 'tiff'
+    if header[:4] == b'\x00\x00\x01\x00':
+        return 'ico'
+    return None
+
+
+def _is_heif_ftyp(header):
+    """ftyp 的主品牌或文件头内的兼容品牌（第 16 字节起，每个 4 字节）是否为 HEIF/AVIF"""
+    if header[8:12] in _HEIF_BRANDS:
+        return True
+    box_end = min(int.from_bytes(header[:4], 'big'), len(header))
+    return any(header[i:i + 4] in _HEIF_BRANDS for i in range(16, box_end - 3, 4))
+
+
+def header_dimensions(image_format, header):
+    """从文件头读出 PNG/GIF/BMP/WebP 的 (宽, 高)，其他格式或文件头不完整时返回 None"""
+    if image_format == 'png' and len(header) >= 24 and header[12:16] == b'IHDR':
+        return int.from_bytes(header[16:20], 'big'), int.from_bytes(header[20:24], 'big')
+    if image_format == 'gif' and len(header) >= 10:
+        return int.from_bytes(header[6:8], 'little'), int.from_bytes(header[8:10], 'little')
+    if image_format == 'bmp' and len(header) >= 26:
+        return (int.from_bytes(header[18:22], 'little', signed=True),
+                abs(int.from_bytes(header[22:26], 'little', signed=True)))
+    if image_format == 'webp' and len(header) >= 30:
+        chunk = header[12:16]
+        if chunk == b'VP8 ' and header[23:26] == b'\x9d\x01\x2a':
+            return (int.from_bytes(header[26:28], 'little') & 0x3FFF,
+                    int.from_bytes(header[28:30], 'little') & 0x3FFF)
+        if chunk == b'VP8L' and header[20] == 0x2F:
+            bits = int.from_bytes(header[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return (int.from_bytes(header[24:27], 'little') + 1,
+                    int.from_bytes(header[27:30], 'little') + 1)
+    return None
+
+
+def jpeg_dimensions(f):
+    """依次跳过 JPEG 的各个段找到帧头，返回 (宽, 高)；找不到时返回 None
+
+    EXIF 等段可能有几十 KB，只读取每个段的段头，不读取段的内容。
+    """
+    f.seek(2)
+    for _ in range(JPEG_MAX_SEGMENTS):
+        marker = f.read(2)
+        # 段之间允许有填充的 0xFF
+        while marker[:1] == b'\xff' and marker[1:2] == b'\xff':
+            marker = marker[1:] + f.read(1)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code in (0xD9, 0xDA):  # 结束或扫描数据开始，之后不会再有帧头
+            return None
+        if 0xD0 <= code <= 0xD7 or code == 0x01:  # 没有长度的标记
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = int.from_bytes(length_bytes, 'big')
+        if code in _JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            return int.from_bytes(frame[3:5], 'big'), int.from_bytes(frame[1:3], 'big')
+        f.seek(length - 2, os.SEEK_CUR)
+    return None
+
+
+def _truncation(image_format, header, tail, size):
+    """检查文件是否完整（只检查有结束标记或记录了总长度的格式），可能不完整时返回说明
+
+    只读取文件末尾 TAIL_SIZE 字节，结束标记之后另有较多数据的正常文件也会返回说明，因此只用于提示。
+    """
+    if image_format == 'jpeg' and b'\xff\xd9' not in tail:
+        return '末尾没有 JPEG 结束标记，可能未写完（或结束标记后另有数据）'
+    if image_format == 'png' and b'IEND' not in tail:
+        return '末尾没有 PNG 结束块，可能未写完（或结束块后另有数据）'
+    if image_format == 'gif' and not tail.endswith(b'\x3b'):
+        return '末尾没有 GIF 结束标记，可能未写完（或结束标记后另有数据）'
+    if image_format == 'webp' and int.from_bytes(header[4:8], 'little') + 8 > size:
+        return '文件比 WebP 文件头记录的长度短，可能未写完'
+    if image_format == 'bmp' and int.from_bytes(header[2:6], 'little') > size:
+        return '文件比 BMP 文件头记录的长度短，可能未写完'
+    return None
+
+
+def sniff_file(path):
+    """读取文件头和文件尾识别格式、尺寸并检查完整性，返回 SniffResult；无法打开时抛出 OSError"""
+    expected = EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        if size == 0:
+            return SniffResult(path, size, st.st_mtime_ns, None, None, '文件为空（0 字节）',
+                               None, None)
+        header = f.read(HEADER_SIZE)
+        image_format = sniff_format(header)
+        if image_format is None:
+            problem = mismatch = None
+            if expected is not None and not header.strip(b'\x00'):
+                problem = '内容全为 0，可能未写完'
+            elif expected in _VARIANT_FORMATS:
+                mismatch = f'无法按文件头确认为 {FORMAT_NAMES[expected]}（可能是少见的变体）'
+            elif expected is not None:
+                problem = '无法识别的文件内容，不是图片或已损坏'
+            return SniffResult(path, size, st.st_mtime_ns, None, None, problem, None, mismatch)
+        if size > len(header):
+            f.seek(max(size - TAIL_SIZE, 0))
+            tail = f.read(TAIL_SIZE)
+        else:
+            tail = header
+        incomplete = _truncation(image_format, header, tail, size)
+        if image_format == 'jpeg':
+            dimensions = jpeg_dimensions(f)
+        else:
+            dimensions = header_dimensions(image_format, header)
+    mismatch = None
+    if expected is not None and image_format != expected:
+        mismatch = f'内容为 {FORMAT_NAMES[image_format]}，扩展名为 {os.path.splitext(path)[1]}'
+    return SniffResult(path, size, st.st_mtime_ns, image_format, dimensions, None, incomplete,
+                       mismatch)
+
+
+def format_sniff_summary(results):
+    """各格式的文件数及尺寸范围，例如：JPEG 120，PNG 2；尺寸 1600x1200 ~ 4000x3000"""
+    counts = OrderedDict()
+    for result in results:
+        name = FORMAT_NAMES.get(result.format, '未识别')
+        counts[name] = counts.get(name, 0) + 1
+    summary = '，'.join(f'{name} {count}' for name, count in counts.items())
+    dimensions = [result.dimensions for result in results if result.dimensions]
+    if dimensions:
+        smallest = min(dimensions, key=lambda d: d[0] * d[1])
+        largest = max(dimensions, key=lambda d: d[0] * d[1])
+        summary += f'；尺寸 {smallest[0]}x{smallest[1]} ~ {largest[0]}x{largest[1]}'
+    return summary
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 界面样式
+主窗口所有控件共用的一份样式表，启动时设置到 QApplication 上只解析一次，
+控件通过 objectName 或 role 属性选择样式，不再逐个设置样式表
+"""
+
+APP_STYLE_SHEET = """
+/* 列表上方的小按钮：蓝色（全选、新增等）、红色（删除）、绿色（设为默认） */
+QPushButton[role="tool"], QPushButton[role="toolDanger"], QPushButton[role="toolConfirm"] {
+    border-radius: 6px;
+    padding: 5px 10px;
+    background-color: #007AFF;
+    color: white;
+    border: none;
+    font-family: SimSun;
+    font-size: 14pt;
+}
+QPushButton[role="tool"]:hover { background-color: #0062CC; }
+QPushButton[role="tool"]:pressed { background-color: #004999; }
+QPushButton[role="toolDanger"] { background-color: #FF3B30; }
+QPushButton[role="toolDanger"]:hover { background-color: #CC2F26; }
+QPushButton[role="toolDanger"]:pressed { background-color: #991F1C; }
+QPushButton[role="toolConfirm"] { background-color: #34C759; }
+QPushButton[role="toolConfirm"]:hover { background-color: #28A745; }
+QPushButton[role="toolConfirm"]:pressed { background-color: #1E7E34; }
+
+/* 浅色按钮：浏览、导入名单、导出日志 */
+QPushButton[role="secondary"] {
+    border-radius: 10px;
+    padding: 5px 15px;
+    background-color: #F2F2F7;
+    color: #007AFF;
+    border: 1px solid #E5E5EA;
+    font-family: SimSun;
+    font-size: 14pt;
+}
+QPushButton[role="secondary"]:hover {
+    background-color: #E5E5EA;
+    color: #0062CC;
+}
+QPushButton[role="secondary"]:pressed {
+    background-color: #D1D1D6;
+    color: #004999;
+}
+QPushButton#exportLogButton { border-radius: 20px; }
+
+/* 开始处理 */
+QPushButton[role="primary"] {
+    border-radius: 20px;
+    background-color: #007AFF;
+    color: white;
+    border: none;
+    font-family: SimSun;
+    font-size: 14pt;
+}
+QPushButton[role="primary"]:hover { background-color: #0062CC; }
+QPushButton[role="primary"]:pressed { background-color: #004999; }
+
+QLabel[role="title"] {
+    font-family: SimSun;
+    font-size: 14pt;
+    color: #333333;
+    padding-left: 5px;
+}
+QLabel[role="hint"] {
+    font-family: SimSun;
+    font-size: 12pt;
+    color: #666666;
+    padding-left: 5px;
+}
+
+QCheckBox[role="option"] {
+    font-family: SimSun;
+    font-size: 14pt;
+    color: #333333;
+}
+
+/* 搜索框 */
+QLineEdit[role="search"] {
+    border: 1px solid #E5E5EA;
+    border-radius: 15px;
+    padding: 5px 10px;
+    background-color: white;
+    font-family: SimSun;
+    font-size: 12pt;
+    margin: 5px 0px;
+}
+QLineEdit[role="search"]:focus { border: 2px solid #007AFF; }
+
+/* 源文件夹、目标文件夹 */
+QLineEdit[role="path"] {
+    border-radius: 10px;
+    border: 1px solid #E5E5EA;
+    padding: 5px 10px;
+    background-color: white;
+    font-family: SimSun;
+    font-size: 14pt;
+    color: #8E8E93;
+}
+QLineEdit[role="path"]:hover { border: 1px solid #007AFF; }
+QLineEdit[role="path"]:focus {
+    border: 2px solid #007AFF;
+    background-color: #FFFFFF;
+}
+
+QLineEdit#namingFormatEdit {
+    border: 1px solid #E5E5EA;
+    border-radius: 6px;
+    padding: 5px 10px;
+    background-color: white;
+    font-family: SimSun;
+    font-size: 14pt;
+    min-height: 35px;
+    margin: 5px 0px;
+}
+QLineEdit#namingFormatEdit:focus { border: 2px solid #007AFF; }
+
+QTextEdit#idNumbersEdit {
+    border: 1px solid #E5E5EA;
+    border-radius: 10px;
+    padding: 10px;
+    background-color: white;
+    font-family: SimSun;
+    font-size: 14pt;
+    min-height: 120px;
+}
+QTextEdit#idNumbersEdit:focus { border: 2px solid #007AFF; }
+
+/* 输出方式、打包输出 */
+QComboBox[role="choice"] {
+    border-radius: 10px;
+    border: 1px solid #E5E5EA;
+    padding: 5px 10px;
+    background-color: white;
+    font-family: SimSun;
+    font-size: 14pt;
+}
+QComboBox[role="choice"]:hover { border: 1px solid #007AFF; }
+
+/* 压缩图片的最长边、大小上限 */
+QSpinBox[role="number"] {
+    border-radius: 10px;
+    border: 1px solid #E5E5EA;
+    padding: 5px 10px;
+    background-color: white;
+    font-family: SimSun;
+    font-size: 14pt;
+}
+QSpinBox[role="number"]:hover { border: 1px solid #007AFF; }
+QSpinBox[role="number"]:disabled { color: #8E8E93; }
+
+/* 证件类型列表（左侧留出行号的位置）和命名格式列表 */
+QListWidget#cardTypesList, QListWidget#namingList {
+    border: 1px solid #E5E5EA;
+    border-radius: 10px;
+    background-color: white;
+    padding: 10px;
+    font-family: SimSun;
+    font-size: 14pt;
+    margin-top: 5px;
+}
+QListWidget#cardTypesList::item, QListWidget#namingList::item {
+    height: 35px;
+    padding-left: 10px;
+    border-radius: 5px;
+    border: 1px solid transparent;
+    margin: 2px 0px;
+    background-color: #F7F7F7;
+}
+QListWidget#cardTypesList::item { padding-left: 40px; }
+QListWidget#cardTypesList::item:hover:!selected, QListWidget#namingList::item:hover:!selected {
+    background-color: #E5E5EA;
+}
+QListWidget#cardTypesList::item:selected, QListWidget#namingList::item:selected {
+    background-color: #007AFF;
+    color: white;
+    border: 1px solid #007AFF;
+}
+"""
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+照片分类工具 - 监视文件夹
+边扫描边归档：监视源文件夹（Linux 上使用 inotify，其他系统定时轮询），
+文件大小和修改时间稳定后视为扫描完成，凑齐一个人的全部证件类型即复制到该人的目录，
+复制与扫描同时进行，不必等整批扫描结束
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+
+from card_copy import Copier, DEFAULT_COPY_MODE
+from card_engine import (BatchError, BatchPlan, BatchResult, DEFAULT_COPY_WORKERS,
+                         DEFAULT_NAMING_FORMAT, execute_batch, filename_error, next_output_dir,
+                         naming_format_error, normalize_path, scan_source_dir)
+from card_metrics import RunMetrics
+from card_roster import find_invalid_roster_lines, format_roster_failures
+
+
+# 文件大小和修改时间保持不变超过该秒数，视为扫描仪已写完
+STABLE_SECONDS = 2.0
+# 轮询间隔（秒）；使用 inotify 时为检查文件是否稳定的最长间隔
+POLL_INTERVAL = 0.5
+
+# inotify 事件（linux/inotify.h）
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+
+class FolderWatcher:
+    """等待目录内容变化：Linux 上使用 inotify，不可用时退化为按 POLL_INTERVAL 轮询"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._fd = None
+        if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+            return
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd < 0:
+                return
+            mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+            if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+                os.close(fd)
+                return
+            self._fd = fd
+        except (OSError, AttributeError):
+            self._fd = None
+
+    @property
+    def mode(self):
+        return 'inotify' if self._fd is not None else '轮询'
+
+    def wait(self, timeout=POLL_INTERVAL):
+        """最多等待 timeout 秒，目录有变化时提前返回 True"""
+        if self._fd is None:
+            time.sleep(timeout)
+            return False
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return False
+        # 读空事件队列，具体变化由调用方重新扫描目录得到
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class StabilityTracker:
+    """记录每个文件最近一次的 (大小, 修改时间) 及其保持不变的起始时间"""
+
+    def __init__(self, stable_seconds=STABLE_SECONDS):
+        self.stable_seconds = stable_seconds
+        self._seen = {}  # 路径 -> (大小, 修改时间, 起始时间)
+
+    def update(self, sources, now=None):
+        """用最新一次扫描结果更新，返回其中已稳定的路径集合"""
+        now = time.monotonic() if now is None else now
+        seen = {}
+        stable = set()
+        for source in sources:
+            previous = self._seen.get(source.path)
+            if previous is not None and previous[:2] == (source.size, source.mtime_ns):
+                since = previous[2]
+            else:
+                since = now
+            seen[source.path] = (source.size, source.mtime_ns, since)
+            if now - since >= self.stable_seconds:
+                stable.add(source.path)
+        self._seen = seen
+        return stable
+
+
+def _check_inputs(card_types, name_id_pairs):
+    """开始监视前校验证件类型和名单（监视过程中无法再修改），失败时抛出 BatchError"""
+    if not card_types:
+        raise BatchError('请选择至少一种证件类型')
+    if not name_id_pairs:
+        raise BatchError('请输入至少一个姓名+身份证号')
+    failures = find_invalid_roster_lines(name_id_pairs)
+    if failures:
+        raise BatchError(format_roster_failures(failures))
+    problems = []
+    for name in list(card_types) + list(name_id_pairs):
+        reason = filename_error(name)
+        if reason:
+            problems.append(f'“{name}” {reason}')
+    for label, names in (('证件类型', card_types), ('姓名+身份证号', name_id_pairs)):
+        folded = [name.casefold() for name in names]
+        repeated = sorted({name for name, key in zip(names, folded) if folded.count(key) > 1})
+        if repeated:
+            problems.append(f'{label}重复：' + '，'.join(repeated))
+    if problems:
+        raise BatchError('处理前检查未通过：\n' + '\n'.join(problems))
+
+
+def watch_batch(src_dir, base_dst_dir, card_types, name_id_pairs,
+                naming_format=DEFAULT_NAMING_FORMAT, log=print, progress=None, is_cancelled=None,
+                copy_mode=DEFAULT_COPY_MODE, workers=DEFAULT_COPY_WORKERS,
+                stable_seconds=STABLE_SECONDS, idle_timeout=None):
+    """监视源文件夹，按名单顺序逐人归档，返回 card_engine.BatchResult
+
+    已稳定的图片按序号排序后依次分给名单中的人，每凑齐一个人的 len(card_types) 张即复制；
+    已归档之后又出现序号更小的图片时无法再按顺序分配，停止监视并报错；
+    is_cancelled() 返回 True 或超过 idle_timeout 秒没有新图片时停止，返回未完成的结果。
+    """
+    src_dir = normalize_path(src_dir)
+    base_dst_dir = normalize_path(base_dst_dir)
+    if not src_dir or not base_dst_dir:
+        raise BatchError('请选择源文件夹和目标文件夹')
+    if not os.path.isdir(src_dir):
+        raise BatchError('源文件夹不存在')
+    if not os.path.isdir(base_dst_dir):
+        raise BatchError('目标文件夹不存在')
+    _check_inputs(card_types, name_id_pairs)
+    naming_error = naming_format_error(naming_format)
+    if naming_error:
+        raise BatchError(naming_error)
+
+    card_types = list(card_types)
+    name_id_pairs = list(name_id_pairs)
+    per_person = len(card_types)
+    output_dir = next_output_dir(base_dst_dir)
+    metrics = RunMetrics()
+    copier = Copier(copy_mode)
+    tracker = StabilityTracker(stable_seconds)
+    watcher = FolderWatcher(src_dir)
+
+    filed_files = []
+    filed_set = set()
+    last_filed_seq = None
+    processed = 0
+    cancelled = False
+    warned_extra = False
+    last_change = time.monotonic()
+    known_count = 0
+    log(f'开始监视 {src_dir}（{watcher.mode}），共 {len(name_id_pairs)} 人，'
+        f'每人 {per_person} 张，输出到 {output_dir}')
+
+    try:
+        while len(filed_files) < len(name_id_pairs) * per_person:
+            if is_cancelled and is_cancelled():
+                cancelled = True
+                break
+            with metrics.phase('扫描'):
+                sources = scan_source_dir(src_dir, naming_format, with_stat=True)
+                sources.sort()
+                stable = tracker.update(sources)
+            if len(sources) != known_count:
+                known_count = len(sources)
+                last_change = time.monotonic()
+
+            # 已归档的图片之前又出现新图片，按顺序分配会错位
+            if last_filed_seq is not None:
+                late = [source.path for source in sources
+                        if source.seq <= last_filed_seq and source.path not in filed_set]
+                if late:
+                    raise BatchError('已归档之后出现了序号更靠前的图片，无法继续按顺序分配：\n'
+                                     + '\n'.join(late[:10]))
+
+            # 从未归档的图片中取出按序号连续稳定的部分
+            pending = [source for source in sources if source.path not in filed_set]
+            ready = []
+            for source in pending:
+                if source.path not in stable:
+                    break
+                ready.append(source)
+
+            person_index = len(filed_files) // per_person
+            while len(ready) >= per_person and person_index < len(name_id_pairs):
+                person_sources, ready = ready[:per_person], ready[per_person:]
+                files = [source.path for source in person_sources]
+                plan = BatchPlan(src_dir, output_dir, card_types, [name_id_pairs[person_index]],
+                                 files, person_sources, base_dst_dir=base_dst_dir)
+                plan.metrics = metrics
+                offset = processed
+                result = execute_batch(
+                    plan, log=log, is_cancelled=is_cancelled, workers=workers,
+                    copy_mode=copy_mode, journal=False, report=False, copier=copier,
+                    progress=(lambda count: progress(offset + count)) if progress else None)
+                processed += result.processed
+                filed_files.extend(files)
+                filed_set.update(files)
+                last_filed_seq = person_sources[-1].seq
+                person_index += 1
+                last_change = time.monotonic()
+                if result.cancelled:
+                    cancelled = True
+                    break
+            if cancelled:
+                break
+
+            if not warned_extra and len(sources) > len(name_id_pairs) * per_person:
+                warned_extra = True
+                log(f'源文件夹中的图片已超过名单所需的 {len(name_id_pairs) * per_person} 张，'
+                    f'多出的图片不会处理')
+            if idle_timeout and time.monotonic() - last_change >= idle_timeout:
+                log(f'超过 {idle_timeout} 秒没有新的图片，停止监视')
+                break
+            if len(filed_files) < len(name_id_pairs) * per_person:
+                watcher.wait(POLL_INTERVAL)
+    finally:
+        watcher.close()
+
+    plan = BatchPlan(src_dir, output_dir, card_types, name_id_pairs, filed_files,
+                     base_dst_dir=base_dst_dir)
+    plan.metrics = metrics
+    report_path = None
+    if filed_files:
+        try:
+            report_path = metrics.write_report(
+                output_dir, src_dirs=[src_dir], output_dir=output_dir, copy_mode=copy_mode,
+                workers=workers, total=plan.total, processed=processed, skipped=0,
+                cancelled=cancelled, watch=True, copy_methods=dict(copier.counts))
+        except OSError as e:
+            log(f'写入运行报告出错: {str(e)}')
+    return BatchResult(plan, processed, cancelled, copier.summary(), 0, metrics, report_path)